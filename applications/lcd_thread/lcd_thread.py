@@ -8,6 +8,15 @@
     if queue_data_read attribute is exist with correct data ({'cmd': 'routine' or 
     'keypad', 'payload'=[firstline_data, secondline_data]}) else it will print the 
     lastest data from queue_data_read attribute.
+        Queued messages are coalesced: LCD thread drains the queue and draws only the
+    latest message of each priority class (timed messages with 'hold' secs and normal
+    messages), so it doesn't fall behind fast keypad entry. A timed message stays on
+    LCD for its hold time before a newer message is drawn.
+        Static screens are sent as ids (LcdData attributes, see media_data.py), they are
+    compiled to LCD bytes once at startup.
+        With 'backend = virtual' in [lcd] section of config.ini, LCD is a VirtualLcdBus
+    (virtual_lcd.py, no i2c device), every drawn message is recorded as a frame for
+    performance metrics (see 'virtual_lcd' attribute).
         
         Attributes:
             queue_data_read (mp.Queue)  : Queue data to read from other thread.
@@ -36,19 +45,28 @@
 import multiprocessing as mp
 import configparser
 import os
+import queue
 import sys
 import threading
+import time
 
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.append(os.path.join(parent_dir,'drivers/lcd'))
+sys.path.append(os.path.join(parent_dir,'utils'))
 
 full_path_config_file = os.path.join(parent_dir, 'conf/config.ini')
 
-from lcd import Lcd
+from lcd import Lcd, compile_screen
+from virtual_lcd import VirtualLcdBus
+from media_data import LcdData
+import log
 
 DEV_ADDR = 0x27
 DEV_BUS = 0
 
+LCD_BACKEND_I2C = 'i2c'
+LCD_BACKEND_VIRTUAL = 'virtual'
+
 class LcdThread:
     '''
         This class is used for create a LCD thread.
@@ -56,10 +74,19 @@ class LcdThread:
     '''
     def __init__(self)-> None:
         self.queue_data_read = mp.Queue()
-        self._lcd = Lcd(DEV_ADDR, DEV_BUS)
+        start_time = time.monotonic()
+        self.virtual_lcd = self._create_virtual_lcd()
+        self._lcd = Lcd(DEV_ADDR, DEV_BUS, self._get_batch_i2c(), self.virtual_lcd)
         self._lock = threading.Lock()
+        # newer normal message read together with a timed one, drawn after its hold
+        self._pending_frames = []
+        self._hold_until = 0.0
+        # render cache: static screen id -> compiled screen
+        self._compiled_screens = {screen_id: compile_screen(screen['payload'])
+                                  for screen_id, screen in LcdData.SCREENS.items()}
         self._lcd.init_lcd()
         self._welcome_display()
+        self._commit_frame(start_time)
 
 
     def _welcome_display(self)->None:
@@ -71,6 +98,39 @@ class LcdThread:
         self._lcd.write_text(1, f"----{version}----") 
 
 
+    def _create_virtual_lcd(self)-> VirtualLcdBus:
+        '''
+            VirtualLcdBus if 'backend' in [lcd] section of config.ini is 'virtual',
+            otherwise None (i2c LCD).
+
+            Raises:
+                ValueError : unknown backend.
+        '''
+        parser_lcd = configparser.ConfigParser()
+        parser_lcd.read(full_path_config_file)
+        backend = parser_lcd.get('lcd', 'backend', fallback=LCD_BACKEND_I2C)
+
+        if backend == LCD_BACKEND_VIRTUAL:
+            return VirtualLcdBus(DEV_ADDR)
+        if backend != LCD_BACKEND_I2C:
+            raise ValueError("Unrecognised LCD backend: \"%s\"" % backend)
+        return None
+
+
+    def _commit_frame(self, start_time: float)-> None:
+        if self.virtual_lcd is not None:
+            self.virtual_lcd.commit_frame(start_time)
+
+
+    def _get_batch_i2c(self)-> bool:
+        '''
+            Get 'batch_i2c' from [lcd] section of config.ini file (default: yes).
+        '''
+        parser_lcd = configparser.ConfigParser()
+        parser_lcd.read(full_path_config_file)
+        return parser_lcd.getboolean('lcd', 'batch_i2c', fallback=True)
+
+
     def _get_device_version(self)-> str:
         '''
             Get device version from config.ini file. It will print error info in lcd if
@@ -109,6 +169,58 @@ class LcdThread:
         return self.queue_data_read.get()
 
 
+    def _wait_hold(self)-> None:
+        remaining = self._hold_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+    def _get_frame_data(self, frame)-> dict:
+        '''
+            Message dict of a frame, static screen ids are looked up in LcdData.SCREENS.
+
+            Raises:
+                ValueError  : unknown static screen id.
+        '''
+        if not isinstance(frame, str):
+            return frame
+        if frame not in LcdData.SCREENS:
+            raise ValueError("Unknown LCD screen id: \"%s\"" % frame)
+        return LcdData.SCREENS[frame]
+
+
+    def _read_latest_frame(self)-> dict:
+        '''
+            Block until a message comes (or take the pending one), wait the hold time of
+            the displayed message and drain the queue. Only the latest message of each
+            priority class is kept, a normal message older than the kept timed message
+            is stale.
+
+            Returns:
+                the message to draw (dict or static screen id).
+        '''
+        frames = self._pending_frames or [self._read_queue_data()]
+        self._pending_frames = []
+        # messages coming in the hold time are coalesced too
+        self._wait_hold()
+        while True:
+            try:
+                frames.append(self.queue_data_read.get_nowait())
+            except queue.Empty:
+                break
+
+        timed = [frame for frame in frames if self._get_frame_data(frame).get('hold')]
+        latest_normal = frames[-1] if not self._get_frame_data(frames[-1]).get('hold') \
+            else None
+        kept = timed[-1:] + ([latest_normal] if latest_normal is not None else [])
+
+        if len(frames) > len(kept):
+            log.logger.debug(f"LCD: {len(frames) - len(kept)} stale frames are skipped")
+
+        self._pending_frames = kept[1:]
+        return kept[0]
+
+
     def set_queue_data(self, queue_data :mp.Queue):
         '''
             Set queue data from shared resource to be read.
@@ -143,17 +255,30 @@ class LcdThread:
         '''
         # default value of cmd
         cmd = None
-        # read queue data from thread opt
-        queue_data = self._read_queue_data()
+        # read queue data from thread opt (latest message only)
+        frame = self._read_latest_frame()
+        start_time = time.monotonic()
+        queue_data = self._get_frame_data(frame)
         cmd, display_data = self.parse_dict_data(queue_data)
 
         # print data to lcd if cmd is match
         if cmd in ('routine', 'keypad'):
             first_line   = display_data[0]
             second_line = display_data[1]
-            self._lcd.clear_lcd()
-            self._lcd.write_text(0, first_line)
-            self._lcd.write_text(1, second_line)
+            # only changed cells are sent (no clear per message)
+            if isinstance(frame, str):
+                self._lcd.render_compiled(self._compiled_screens[frame])
+            else:
+                self._lcd.render([first_line, second_line])
+            self._commit_frame(start_time)
+
+            if queue_data.get('hold'):
+                self._hold_until = time.monotonic() + queue_data['hold']
+
+        # key_time is time.monotonic() of the key event (keypad cmd only)
+        if 'key_time' in queue_data:
+            latency = time.monotonic() - queue_data['key_time']
+            log.logger.debug(f"Key to LCD latency: {latency * 1000:.1f} ms")
 
 
     def run(self)->None:
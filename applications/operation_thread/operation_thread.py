@@ -40,6 +40,20 @@ full_photo_folder = os.path.join(parent_dir, 'assets/photos/')
 KEYPAD_TIMEOUT = 15
 DOOR_TIMEOUT = 15
 NETWORK_TIMEOUT = 5
+# Max. wait for a key event, loops keep servicing network queue and LCD meanwhile
+KEYPAD_POLL_INTERVAL = 0.1
+# Max. time for one weight read inside door loops (weight sensor can be unhealthy)
+WEIGHT_READ_TIMEOUT = 2
+# Max. time to wait for the weight to be stable after the door is closed
+WEIGHT_SETTLE_TIMEOUT = 3
+# Max. sleep while the door is open, door session checks DOOR_TIMEOUT after it
+DOOR_POLL_INTERVAL = 0.05
+# Pause between "pose" and "taking picture" prompts (courier gets ready)
+POSE_PROMPT_PAUSE = 1.0
+# Shutter fires this long after "taking picture" prompt starts (or when it ends)
+SHUTTER_DELAY = 0.3
+# Max. length of "pose" prompt, shutter doesn't wait longer for the prompts thread
+POSE_PROMPT_TIMEOUT = 5
 # Compesate error read by weight sensor due to electrical issue
 WEIGHT_OFFSET = 1.0
 
@@ -60,6 +74,9 @@ class ThreadOperation:
         self.keypad_session_ok = False
         self.taking_item_ok = False  # state for user taking the item inside the box
         self.latest_items_data = self.temp_storage_data
+        # courier's photo of this session (JPEG bytes in memory) and its file name
+        self.photo = None
+        self.photo_name = None
         self.lock = threading.Lock()
         self.periph = PeripheralOperations()
         self.network = NetworkThread()
@@ -242,38 +259,27 @@ class ThreadOperation:
 
         start_time_keypad_session = time.time()
 
-        flag_send_to_lcd = 0
-
         while True:
             current_time = time.time()
-            keypad_data_input = self.periph.read_input_keypad()
+            # all keys typed since the last loop (fast typing burst)
+            key_events = self.periph.get_key_events(KEYPAD_POLL_INTERVAL)
 
             if current_time - start_time_keypad_session > KEYPAD_TIMEOUT:
                 self.st_msg_has_not_displayed = True
+                # LCD thread keeps it visible for the user (hold)
                 self._send_data_queue(self.queue_data_to_lcd, LcdData.TIMEOUT)
-                time.sleep(2.0)  # make LCD data display visible for user
                 break
 
-            # Send input user from keypad to LCD thread. Neglect if user input is 'D' char
-            # Because it will be delete-command.
-            if keypad_data_input is not None and keypad_data_input != 'D':
-                self.keypad_buffer = self.keypad_buffer + \
-                    str(keypad_data_input)
-                flag_send_to_lcd = 1
-
-            # Delete single char command
-            if keypad_data_input == 'D':
-                self.keypad_buffer = self.keypad_buffer[:-1] 
-                flag_send_to_lcd = 1
+            self.apply_keys(key_events)
 
-            # Send data to LCD thread
-            if flag_send_to_lcd == 1:
+            # Send data to LCD thread once for the whole batch of keys
+            if len(key_events) != 0:
                 data_lcd = self._create_payload(
                     'lcd', method='keypad', first_line='Masukan resi:', 
                     second_line=self.keypad_buffer)
+                # LCD thread logs key-to-LCD latency (of the oldest key)
+                data_lcd['key_time'] = key_events[0].timestamp
                 self._send_data_queue(self.queue_data_to_lcd, data_lcd)
-                #reset flag
-                flag_send_to_lcd = 0
 
 
             # Perform validation when keypad entered 4 times.
@@ -293,29 +299,42 @@ class ThreadOperation:
                     self._send_data_queue(
                         self.queue_data_to_lcd, LcdData.RESI_FAILED)
                     self.keypad_session_ok = False
-                    time.sleep(2.0)  # make LCD data display visible for user
                     break
 
             self.st_msg_has_not_displayed = True
 
+    def apply_keys(self, key_events: list)-> None:
+        '''
+            Apply keys to keypad_buffer in order. 'D' deletes a single char, other keys
+            are appended. It stops when the buffer has 4 chars (validation), the rest
+            of keys are dropped.
+        '''
+        for index, key_event in enumerate(key_events):
+            if key_event.key == 'D':
+                self.keypad_buffer = self.keypad_buffer[:-1]
+            else:
+                self.keypad_buffer = self.keypad_buffer + str(key_event.key)
+
+            if len(self.keypad_buffer) == 4:
+                if index + 1 < len(key_events):
+                    log.logger.warning(
+                        f"Keypad: {len(key_events) - index - 1} keys after 4 chars are dropped")
+                break
+
     def taking_item_routine(self):
         self.periph.unlock_door()
         self._send_data_queue(self.queue_data_to_lcd, LcdData.TAKING_ITEM)
         self.periph.play_sound(SoundData.TAKING_ITEM)
-        start_time_door_session = time.time()
-        door_pos = self.periph.sense_door()
         is_warned = False
         #create a sound warning thread
         sound_warning_thread = mp.Process(target= self.sound_warning_thd,)
-        while door_pos != 1:
-            current_time = time.time()
-            door_pos = self.periph.sense_door()
-
-            if current_time - start_time_door_session > DOOR_TIMEOUT and is_warned == False:
-                is_warned = True
-                self._send_data_queue(
-                    self.queue_data_to_lcd, LcdData.DOOR_ERROR)
-                sound_warning_thread.start()
+        # Sleep until the door is closed (door monitor), warn once after DOOR_TIMEOUT.
+        if not self.periph.wait_door_closed(DOOR_TIMEOUT):
+            is_warned = True
+            self._send_data_queue(
+                self.queue_data_to_lcd, LcdData.DOOR_ERROR)
+            sound_warning_thread.start()
+            self.periph.wait_door_closed(None)
 
         self.periph.lock_door()
         # kill the sound warning thread 
@@ -327,7 +346,10 @@ class ThreadOperation:
         # get the latest weight of empty box.
         self.periph.set_power_up_weight()
         time.sleep(0.1)
-        self.latest_weight = self.periph.get_weight()
+        read_weight = self.periph.get_weight_with_timeout(WEIGHT_READ_TIMEOUT)
+        # keep previous weight if weight sensor doesn't respond
+        if read_weight is not None:
+            self.latest_weight = read_weight
         self.periph.set_power_down_weight()
 
         self._send_data_queue(self.queue_data_to_lcd,
@@ -340,21 +362,60 @@ class ThreadOperation:
         log.logger.info("Berat barang : " + str(self.latest_weight))
         log.logger.info("Barang telah diambil pemilik")
 
+    def _play_photo_prompts(self, taking_picture_started: threading.Event):
+        # A sound error is logged and the next prompt is still played, the shutter
+        # is released whatever happens to the prompt.
+        try:
+            self.periph.play_sound(SoundData.POSE_COURIRER)
+            time.sleep(POSE_PROMPT_PAUSE)
+        except OSError as error_message:
+            log.logger.error(f"Pose prompt: {error_message}")
+        finally:
+            taking_picture_started.set()
+
+        try:
+            self.periph.play_sound(SoundData.TAKING_PICTURE)
+        except OSError as error_message:
+            log.logger.error(f"Taking picture prompt: {error_message}")
+
+    def take_photo_with_prompts(self) -> threading.Thread:
+        '''
+            Voice prompts are played in a thread while the camera is warmed up. Shutter
+            fires SHUTTER_DELAY secs after "taking picture" prompt starts (or when the
+            prompt ends, if it is shorter), never before the prompt.
+
+            Returns:
+                prompts thread, sound is busy until it ends.
+        '''
+        taking_picture_started = threading.Event()
+        prompts_thread = threading.Thread(target=self._play_photo_prompts,
+                                          args=(taking_picture_started,), daemon=True)
+        prompts_thread.start()
+
+        # no-op if the capture engine is already streaming
+        self.periph.init_camera()
+        if not taking_picture_started.wait(POSE_PROMPT_PAUSE + POSE_PROMPT_TIMEOUT):
+            log.logger.error("Pose prompt is too long, photo is taken without waiting")
+        prompts_thread.join(SHUTTER_DELAY)
+
+        #taking a photo (in memory, no photo file is read back)
+        self.photo = self.periph.capture_bytes()
+        self.photo_name = self.periph.get_last_photo_name()
+        return prompts_thread
+
     def door_session(self):
-        self.periph.play_sound(SoundData.POSE_COURIRER)
-        time.sleep(1)
-        self.periph.play_sound(SoundData.TAKING_PICTURE)
-
-        #taking a photo
-        self.periph.capture_photo()
-        # check photo, if photo doesn't exist, log it as an error
-        is_photo = len(self.periph.get_photo_name())
-        if is_photo == 0:
+        start_time_session = time.monotonic()
+        prompts_thread = self.take_photo_with_prompts()
+        # if photo doesn't exist, log it as an error
+        if self.photo is None:
              log.logger.error("Camera is error !")  
 
-        time.sleep(0.8)
-
+        # door is opened as soon as the photo is taken (prompt can still be playing)
         self.periph.unlock_door()
+        log.logger.info(f"Door unlock latency: {time.monotonic() - start_time_session:.2f} s")
+
+        # one sound at a time
+        prompts_thread.join()
         self.periph.play_sound(SoundData.PUT_ITEM)
 
         # wake up sensor weight
@@ -372,11 +433,27 @@ class ThreadOperation:
         while True:
             current_time = time.time()
 
-            read_weight = self.periph.get_weight()
             door_pos = self.periph.sense_door()
+            read_weight = None
+
+            # Door is closed, wait for the weight to be settled (no transients when
+            # the courier slams the door). Fall back to a single read if it isn't.
+            if door_pos == 1:
+                settled = self.periph.wait_weight_settled(
+                    self.latest_weight, WEIGHT_SETTLE_TIMEOUT)
+                if settled is not None:
+                    read_weight = settled[0]
+                else:
+                    read_weight = self.periph.get_weight_with_timeout(WEIGHT_READ_TIMEOUT)
+            else:
+                self.periph.wait_door_closed(DOOR_POLL_INTERVAL)
+
+            # Door is open or weight sensor doesn't respond (read_weight is None): keep
+            # servicing the door (warning signs)
 
             # Item received
-            if read_weight > self.latest_weight + WEIGHT_OFFSET and door_pos == 1:
+            if read_weight is not None and read_weight > self.latest_weight + WEIGHT_OFFSET \
+                    and door_pos == 1:
                 self.periph.lock_door()
                 # we should kill (brute force) the thread not terminate it !
                 if process_sound_warning.is_alive() == True:
@@ -391,7 +468,8 @@ class ThreadOperation:
                 break
 
             # No item received
-            elif read_weight < self.latest_weight + WEIGHT_OFFSET and door_pos == 1:
+            elif read_weight is not None and read_weight < self.latest_weight + WEIGHT_OFFSET \
+                    and door_pos == 1:
                 self.periph.lock_door()
                 # we should kill (brute force) the thread not terminate it !
                 if process_sound_warning.is_alive() == True:
@@ -434,15 +512,14 @@ class ThreadOperation:
         time.sleep(2)
         self.periph.play_sound(SoundData.ACCEPTED_ITEM)
 
-        # get all photos file names
-        list_of_photos_file_name = self.periph.get_photo_name()
-        # check if photo is exist
-        if len(list_of_photos_file_name) != 0:
-            photo_file_name = list_of_photos_file_name[0]
-            # data photo has to be in binary type
-            last_foto_path = os.path.join(full_photo_folder, photo_file_name)
-            with open(last_foto_path, 'rb') as f:
-                bin_photo = f.read()
+        # check if photo is exist (captured in door session)
+        if self.photo is not None:
+            photo_file_name = self.photo_name
+            # data photo has to be in binary type, one photo for server and telegram
+            upload_photo = self.periph.prepare_upload_photo(self.photo)
+            bin_photo = upload_photo.photo
+            log.logger.info(f"Upload photo: {upload_photo.size} bytes, "
+                            f"{upload_photo.original_size - upload_photo.size} bytes saved")
         else:
             bin_photo = ""
             photo_file_name = "tidak ada photo"
@@ -482,12 +559,9 @@ class ThreadOperation:
         self.keypad_session_ok = False
         self.item_is_stored = None
         self.taking_item_ok = None
-
-        # only delete when photo is exist in 'photos' folder
-        len_photo_file_name = len(self.periph.get_photo_name())
-        if len_photo_file_name != 0:
-            self.periph.delete_photo()
-            log.logger.info("Foto berhasil dihapus!")
+        # photo is only in memory (copy on disk is kept for audit)
+        self.photo = None
+        self.photo_name = None
 
     def run(self):
         '''
@@ -510,17 +584,32 @@ class ThreadOperation:
         self.latest_weight = self.periph.get_weight()
         self.periph.set_power_down_weight()  # make weight sensor sleep!
         log.logger.info("Berat barang : " + str(self.latest_weight))
+        # track zero drift while no session is active
+        self.periph.resume_auto_zero(self.latest_weight)
 
         while True:
-            keypad_is_pressed = self.periph.read_input_keypad()
+            # doesn't block on serial port, key is read by keypad reader thread
+            keypad_is_pressed = self.periph.get_key_event(KEYPAD_POLL_INTERVAL)
             # listening to network thread
             self.network_routine()
 
+            # Weight sensor was re-tared in background, read the empty box weight again.
+            if self.periph.is_weight_recalibrated():
+                self.periph.pause_auto_zero()
+                self.periph.set_power_up_weight()
+                time.sleep(0.1)
+                self.latest_weight = self.periph.get_weight()
+                self.periph.set_power_down_weight()
+                log.logger.info("Berat barang (kalibrasi ulang): " + str(self.latest_weight))
+                self.periph.resume_auto_zero(self.latest_weight)
+
             if self.st_msg_has_not_displayed:
                 self.st_msg_has_not_displayed = False
                 self._send_data_queue(self.queue_data_to_lcd, LcdData.ST_MSG)
 
             if keypad_is_pressed is not None:
+                # session is active, weight sensor belongs to this thread
+                self.periph.pause_auto_zero()
                 self.keypad_routine(UNIVERSAL_PASSWORD)
 
             # These processes is determined by keypad_routine !
@@ -535,3 +624,6 @@ class ThreadOperation:
                 self.final_session()
 
             self.clean_all_global_var_and_photo()
+
+            if keypad_is_pressed is not None:
+                self.periph.resume_auto_zero(self.latest_weight)
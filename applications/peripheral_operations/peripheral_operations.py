@@ -14,6 +14,8 @@
 import configparser
 import os
 import sys
+import threading
+import time
 
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 
@@ -26,14 +28,17 @@ sys.path.append(os.path.join(parent_dir, 'utils'))
 
 #Should put here
 from usb_camera import UsbCamera
+from photo_pipeline import PhotoPipeline, PhotoResult
 from sound import Sound
-from hx711 import Hx711
-from door import Door
-from keypad import Keypad
+from hx711 import Hx711, HX711TimeoutError, AutoZeroTracker
+from door import Door, DoorMonitor
+from keypad import Keypad, KeypadReader
 from pins_config import PinsConfig
+import log
 
 REFERENCE_UNIT_WEIGHT = 142  # Calibration unit for weight sensor
 SAMPLES = 9  #  frequency of sampling weight sensor data
+STARTUP_DELAY_WEIGHT = 1.0  # secs, only needed when weight sensor has to be tared
 
 full_path_config_file = os.path.join(parent_dir, 'conf/config.ini')
 
@@ -50,9 +55,23 @@ class PeripheralOperations:
         self.sound_files_dir = ''
 
         self.keypad = None
+        self.keypad_reader = None
         self.weight = None
+        # Adaptive sample count options (None = fixed SAMPLES), see init_weight()
+        self.adaptive_sampling = None
+        self.weight_samples_used = SAMPLES
+        # Settle detection options, see init_weight() and wait_weight_settled()
+        self.weight_settle = {'window': 5, 'max_std': 0.3}
+        self.auto_zero = None
         self.door = None
+        self.door_monitor = None
         self.camera = None
+        self.photo_pipeline = None
+
+    def _get_calibration_file_weight(self)-> str:
+        relative_calibration_file = self._get_data_from_config_file(
+            'weight', 'calibration_file')
+        return os.path.join(parent_dir, relative_calibration_file)
 
     def _set_weight_pins(self, pd_out, sck)-> None:
         self.pin_dout_weight = pd_out
@@ -68,6 +87,12 @@ class PeripheralOperations:
         data = parser_data.get(section, var)
         return data
 
+    def _get_bool_from_config_file(self, section: str, var: str) -> bool:
+        parser_data = configparser.ConfigParser()
+        parser_data.read(full_path_config_file)
+        data = parser_data.getboolean(section, var, fallback=False)
+        return data
+
     def _set_dir_saved_photo(self)-> None:
         # get from config.ini
         relative_photos_folder = self._get_data_from_config_file(
@@ -96,28 +121,175 @@ class PeripheralOperations:
     def init_weight(self)-> None:
         self.weight.set_reading_format("MSB", "MSB")
         self.weight.set_reference_unit(REFERENCE_UNIT_WEIGHT)
-        self.weight.reset()
-        self.weight.tare()
+
+        # Skip tare at startup if calibration file is valid, check it in background.
+        calibration_file = self._get_calibration_file_weight()
+        if self.weight.load_calibration(calibration_file):
+            parser_data = configparser.ConfigParser()
+            parser_data.read(full_path_config_file)
+            self.weight.start_calibration_check(
+                calibration_file,
+                parser_data.getfloat('weight', 'calibration_max_age'),
+                parser_data.getfloat('weight', 'calibration_zero_tolerance'))
+        else:
+            self.weight.reset()
+            self.weight.tare()
+            self.weight.save_calibration(calibration_file)
+
+        self._set_weight_filter()
+        self._set_adaptive_sampling()
+        self._set_weight_settle()
+
+    def _set_adaptive_sampling(self)-> None:
+        # Read once, get_weight() is called in loops.
+        parser_data = configparser.ConfigParser()
+        parser_data.read(full_path_config_file)
+        if not parser_data.getboolean('weight', 'adaptive_sampling', fallback=False):
+            self.adaptive_sampling = None
+            return
+
+        self.adaptive_sampling = {
+            'tolerance': parser_data.getfloat('weight', 'adaptive_tolerance'),
+            'min_samples': parser_data.getint('weight', 'adaptive_min_samples'),
+            'max_samples': parser_data.getint('weight', 'adaptive_max_samples'),
+        }
+
+    def _set_weight_settle(self)-> None:
+        # Read once, wait_weight_settled() is called in door session loop.
+        parser_data = configparser.ConfigParser()
+        parser_data.read(full_path_config_file)
+        self.weight_settle = {
+            'window': parser_data.getint('weight', 'settle_window', fallback=5),
+            'max_std': parser_data.getfloat('weight', 'settle_max_std', fallback=0.3),
+        }
+
+    def init_auto_zero(self)-> None:
+        # 'auto_zero' in [weight], tracker steps are skipped until resume_auto_zero().
+        parser_data = configparser.ConfigParser()
+        parser_data.read(full_path_config_file)
+        if not parser_data.getboolean('weight', 'auto_zero', fallback=False):
+            return
+
+        self.auto_zero = AutoZeroTracker(
+            self.weight,
+            is_door_closed=self.door_monitor.is_closed,
+            calibration_file=self._get_calibration_file_weight(),
+            interval=parser_data.getfloat('weight', 'auto_zero_interval'),
+            max_slew=parser_data.getfloat('weight', 'auto_zero_max_slew'),
+            capture_band=parser_data.getfloat('weight', 'auto_zero_band'),
+            samples=SAMPLES)
+        self.auto_zero.start()
+
+    def pause_auto_zero(self)-> None:
+        # Returns at once, a running auto-zero step throws its read away.
+        if self.auto_zero is not None:
+            self.auto_zero.pause()
+
+    def resume_auto_zero(self, reference_weight: float)-> None:
+        if self.auto_zero is not None:
+            self.auto_zero.resume(reference_weight)
+
+    def is_weight_recalibrated(self)-> bool:
+        '''
+            True once after the weight sensor was re-tared in background. The reference
+            weight (empty box) should be read again.
+        '''
+        if self.weight.recalibrated.is_set():
+            self.weight.recalibrated.clear()
+            return True
+        return False
+
+    def _set_weight_filter(self)-> None:
+        parser_data = configparser.ConfigParser()
+        parser_data.read(full_path_config_file)
+        self.weight.set_filter(
+            parser_data.get('weight', 'filter', fallback='median'),
+            parser_data.getint('weight', 'filter_window', fallback=SAMPLES),
+            ema_alpha=parser_data.getfloat('weight', 'ema_alpha', fallback=0.3),
+            kalman_process_variance=parser_data.getfloat(
+                'weight', 'kalman_process_variance', fallback=100.0),
+            kalman_measurement_variance=parser_data.getfloat(
+                'weight', 'kalman_measurement_variance', fallback=10000.0))
+
+    def init_weight_sampler(self)-> None:
+        # 'background_sampling' in [weight]. Started after tare, so the ring buffer
+        # holds tared samples only.
+        if self._get_bool_from_config_file('weight', 'background_sampling'):
+            buffer_size = int(self._get_data_from_config_file(
+                'weight', 'sampler_buffer_size'))
+            self.weight.start_sampler(buffer_size)
 
     def init_all(self)-> None:
         self.set_all_pins_periphs()
         self._set_hw_usb_camera()
-        self.keypad = Keypad()
+        self.keypad = Keypad(self._get_data_from_config_file('keypad', 'port'),
+                             int(self._get_data_from_config_file('keypad', 'baudrate')))
+        self.init_keypad_reader()
+        is_calibrated = os.path.exists(self._get_calibration_file_weight())
         self.weight = Hx711(self.pin_dout_weight,
-                            self.pin_sck_weight)
+                            self.pin_sck_weight,
+                            ready_mode=self._get_data_from_config_file(
+                                'weight', 'ready_mode'),
+                            startup_delay=0 if is_calibrated else STARTUP_DELAY_WEIGHT)
         self.door = Door(self.pin_door_lock,
                          self.pin_door_sense)
-        self.camera = UsbCamera(self.hw_addr_usb_camera)
+        self.camera = UsbCamera(self.hw_addr_usb_camera,
+                                self._get_data_from_config_file('usb_camera', 'capture_backend'),
+                                int(self._get_data_from_config_file('usb_camera', 'burst_frames')),
+                                float(self._get_data_from_config_file(
+                                    'usb_camera', 'burst_time_budget')))
         self.sound = Sound()
         self.init_weight()
+        self.init_weight_sampler()
+        self.init_door_monitor()
+        self.init_auto_zero()
         self._get_dir_sound_files()
         self._set_dir_saved_photo()
         self.camera.set_dir_saved_photo(self.dir_saved_photo)
+        self.init_camera()
+        self.init_photo_pipeline()
+
+    def init_camera(self)-> None:
+        # Warm up the capture engine now, not while the courier waits.
+        try:
+            self.camera.open()
+        except (OSError, TimeoutError) as error:
+            # release the device for fswebcam
+            self.camera.close()
+            log.logger.error(f"Camera capture engine: {error}, fswebcam is used")
+
+    def init_photo_pipeline(self)-> None:
+        # Disabled: final_session uploads the photo as the camera gave it.
+        if self._get_bool_from_config_file('photo_upload', 'enabled'):
+            self.photo_pipeline = PhotoPipeline(
+                int(self._get_data_from_config_file('photo_upload', 'width')),
+                int(self._get_data_from_config_file('photo_upload', 'height')),
+                int(self._get_data_from_config_file('photo_upload', 'quality')),
+                int(self._get_data_from_config_file('photo_upload', 'max_bytes')),
+                int(self._get_data_from_config_file('photo_upload', 'min_quality')))
 
     def read_input_keypad(self)->str:
         read_char = self.keypad.reading_input_char()
         return read_char
 
+    def init_keypad_reader(self)-> None:
+        self.keypad_reader = KeypadReader(self.keypad)
+        self.keypad_reader.start()
+
+    def get_key_event(self, timeout: float = 0):
+        '''
+            Next key event from keypad reader thread (KeyEvent with key and timestamp),
+            or None if no key is pressed in timeout secs.
+        '''
+        return self.keypad_reader.get_event(timeout)
+
+    def get_key_events(self, timeout: float = 0)-> list:
+        '''
+            All pending key events (oldest first), it waits max. timeout secs for the
+            first one. Empty list if no key is pressed.
+        '''
+        return self.keypad_reader.get_events(timeout)
+
     def lock_door(self)-> None:
         self.door.lock_door()
 
@@ -128,12 +300,70 @@ class PeripheralOperations:
         door_state = self.door.sense_door_state()
         return door_state
 
+    def init_door_monitor(self)-> None:
+        debounce = float(self._get_data_from_config_file('door', 'debounce'))
+        self.door_monitor = DoorMonitor(self.door, debounce)
+        self.door_monitor.start()
+
+    def wait_door_closed(self, timeout: float)-> bool:
+        '''
+            Sleep until the door is closed (debounced) or timeout (secs).
+
+            Returns:
+                True if the door is closed, False on timeout.
+        '''
+        return self.door_monitor.wait_for_close(timeout)
+
+    def _read_weight(self, deadline=None)->float:
+        # Adaptive sample count is only for reads without background sampler.
+        if self.adaptive_sampling is not None and self.weight.sampler is None:
+            weight_val, self.weight_samples_used = self.weight.get_weight_adaptive(
+                deadline=deadline, **self.adaptive_sampling)
+            log.logger.debug(f"Weight is read with {self.weight_samples_used} samples")
+            return weight_val
+
+        # get_weight_sampled() equals get_weight() if background sampler is off.
+        return self.weight.get_weight_sampled(SAMPLES, deadline)
+
     def get_weight(self)->float:
-        weight_val = self.weight.get_weight(SAMPLES)
+        weight_val = self._read_weight()
         # Ease us to read the weight value
         rounded_weight_val = round(weight_val, 1)
         return rounded_weight_val
 
+    def get_weight_with_timeout(self, timeout: float):
+        '''
+            Same as get_weight() but it gives up after timeout (secs), so the caller
+            can keep servicing door and keypad when weight sensor is unhealthy.
+
+            Returns:
+                rounded weight (float) or None if weight sensor doesn't respond in time.
+        '''
+        deadline = time.monotonic() + timeout
+        try:
+            weight_val = self._read_weight(deadline)
+        except HX711TimeoutError as error_message:
+            log.logger.error(f"Weight sensor: {error_message}")
+            return None
+
+        rounded_weight_val = round(weight_val, 1)
+        return rounded_weight_val
+
+    def wait_weight_settled(self, reference: float, timeout: float):
+        '''
+            Wait until the weight is stable after a change (eg. door is closed).
+
+            Returns:
+                (settled weight, delta from reference) both rounded, or None if weight
+                isn't settled before timeout (secs).
+        '''
+        settled = self.weight.wait_weight_settled(reference, timeout, **self.weight_settle)
+        if settled is None:
+            return None
+
+        log.logger.info(f"Weight {settled}")
+        return round(settled.value, 1), round(settled.delta, 1)
+
     def set_power_down_weight(self)-> None:
         self.weight.power_down()
 
@@ -143,6 +373,34 @@ class PeripheralOperations:
     def capture_photo(self)-> int:
         return self.camera.capture_photo()
 
+    def capture_bytes(self)-> bytes:
+        '''
+            Photo in memory (JPEG bytes or None if the camera failed). A copy is written
+            to photos folder in background when 'save_photos' in [usb_camera] is on
+            (audit), file name is get_last_photo_name().
+        '''
+        photo = self.camera.capture_bytes()
+        if photo is not None and self._get_bool_from_config_file('usb_camera', 'save_photos'):
+            threading.Thread(target=self.camera.save_photo,
+                             args=(photo, self.camera.last_photo_name),
+                             daemon=True).start()
+        return photo
+
+    def prepare_upload_photo(self, photo: bytes)-> PhotoResult:
+        '''
+            Photo for server and telegram (one encoding for both), see [photo_upload] in
+            config.ini. The captured photo is used if the pipeline is off or fails.
+        '''
+        if self.photo_pipeline is not None:
+            try:
+                return self.photo_pipeline.process(photo)
+            except (OSError, ValueError) as error:
+                log.logger.error(f"Photo pipeline: {error}, captured photo is uploaded")
+        return PhotoResult(photo, len(photo), len(photo))
+
+    def get_last_photo_name(self)-> str:
+        return self.camera.last_photo_name
+
     def delete_photo(self)-> None:
         # Actually, we delete all photos in assets/photos folder
         self.camera.delete_all_photos_in_folder()
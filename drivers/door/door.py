@@ -11,8 +11,14 @@
     HIGH means DOOR IS CLOSED and vice versa (depend on door sense hardware). 
     For more information, see 'test_door.py' file!
 
+    DoorMonitor follows the door state without busy-waiting. It sleeps until a GPIO edge
+    (wiringPiISR) on sense_door pin, debounces it and then sets 'closed'/'opened' events
+    and calls on_close/on_open callbacks. Use wait_for_close(timeout) to block until the
+    door is closed. On native dev (Laptop), edges are scripted with MockWiringPi
+    (set_pin_level() and play_pin_script()).
+
     * Prerequisites *
-    1. wiringOP lib.
+    1. wiringOP lib or libgpiod (see drivers/gpio_backend/gpio_backend.py).
     2. Download or put this library in your working directory project.
     3. Import it to your project file (eg. main.py)
 
@@ -24,17 +30,19 @@
 
 import sys
 import os 
-import platform
+import threading
 
-if platform.machine() == "armv7l":
-    import wiringpi 
-    from wiringpi import GPIO
-    
-else:
-    parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    sys.path.append(os.path.join(parent_dir, 'drivers/mock_wiringpi'))
-    from mock_wiringpi import MockWiringPi, GPIO
-    wiringpi = MockWiringPi()
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(os.path.join(parent_dir, 'drivers/gpio_backend'))
+from gpio_backend import get_backend, GPIO
+
+# wiringpi, gpiod or mock, selected in 'conf/config.ini' ([gpio] section)
+wiringpi = get_backend()
+
+DOOR_OPEN = 0
+DOOR_CLOSED = 1
+DEBOUNCE_TIME = 0.05 # secs, sense_door level must be stable this long
+MONITOR_POLL_INTERVAL = 1.0 # secs, re-check the level if an edge is missed
 
 
 class Door:
@@ -56,4 +64,98 @@ class Door:
         wiringpi.digitalWrite(self._pin_door_solenoid, GPIO.HIGH)
 
     def sense_door_state(self):
-        return wiringpi.digitalRead(self._pin_sense_door)
\ No newline at end of file
+        return wiringpi.digitalRead(self._pin_sense_door)
+
+
+class DoorMonitor(threading.Thread):
+    '''
+        Edge-driven and debounced door state (DOOR_CLOSED or DOOR_OPEN).
+
+        Args:
+            door (Door)           : door with sense_door pin.
+            debounce (float)      : secs, the level must be stable this long.
+            poll_interval (float) : secs, the level is re-checked if no edge comes.
+            on_open, on_close     : callbacks without arguments, called from the monitor
+                                    thread, so keep them short.
+    '''
+    def __init__(self, door, debounce=DEBOUNCE_TIME, poll_interval=MONITOR_POLL_INTERVAL,
+                 on_open=None, on_close=None):
+        super().__init__(daemon=True)
+        self._door = door
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self.on_open = on_open
+        self.on_close = on_close
+
+        self.closed = threading.Event()
+        self.opened = threading.Event()
+        self._edge = threading.Event()
+        self._is_running = True
+
+        self.state = door.sense_door_state()
+        self._set_events(self.state)
+        wiringpi.wiringPiISR(door._pin_sense_door, wiringpi.INT_EDGE_BOTH, self._on_edge)
+
+    def _on_edge(self):
+        # ISR callback, it only wakes the monitor thread up.
+        self._edge.set()
+
+    def _set_events(self, state):
+        if state == DOOR_CLOSED:
+            self.opened.clear()
+            self.closed.set()
+        else:
+            self.closed.clear()
+            self.opened.set()
+
+    def _read_debounced(self):
+        level = self._door.sense_door_state()
+        while self._is_running:
+            self._edge.clear()
+            # another edge in debounce time (contact is bouncing), start again
+            if self._edge.wait(self._debounce):
+                level = self._door.sense_door_state()
+                continue
+
+            new_level = self._door.sense_door_state()
+            if new_level == level:
+                return level
+            level = new_level
+        return self.state
+
+    def run(self):
+        while self._is_running:
+            self._edge.wait(self._poll_interval)
+            if not self._is_running:
+                break
+
+            level = self._read_debounced()
+            if level == self.state:
+                continue
+
+            self.state = level
+            self._set_events(level)
+            callback = self.on_close if level == DOOR_CLOSED else self.on_open
+            if callback is not None:
+                callback()
+
+    def stop(self, timeout=1.0):
+        self._is_running = False
+        self._edge.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def is_closed(self):
+        return self.state == DOOR_CLOSED
+
+    def wait_for_close(self, timeout=None):
+        '''
+            Block until the door is closed or timeout (secs, None = forever).
+
+            Returns:
+                True if the door is closed, False on timeout.
+        '''
+        return self.closed.wait(timeout)
+
+    def wait_for_open(self, timeout=None):
+        return self.opened.wait(timeout)
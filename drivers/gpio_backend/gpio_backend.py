@@ -0,0 +1,228 @@
+'''
+    File           : gpio_backend.py
+    Author         : I Putu Pawesi Siantika, S.T.
+    Year           : Oct, 2026
+    Description    :
+
+    One shared GPIO backend for door.py, keypad.py and hx711.py. Drivers use it like the
+    wiringpi module (wiringPiSetup, pinMode, digitalRead, digitalWrite, pullUpDnControl
+    and wiringPiISR), so the backend is chosen in one place and the hardware is set up
+    once. Backends:
+
+        1. wiringpi  : wiringOP python lib (Orange Pi). Its functions are bound directly,
+                       so bit-banging (hx711.py) has no wrapper call per bit.
+        2. gpiod     : Linux GPIO character device (libgpiod v1 python bindings,
+                       python3-libgpiod). Edges come from kernel line events.
+        3. mock      : MockWiringPi for native dev (Laptop) and tests.
+        4. simulator : MockWiringPi with simulated HX711 on weight sensor pins
+                       (see hx711_simulator.py).
+
+    Backend is selected with 'backend' in [gpio] section of 'conf/config.ini' ('auto' =
+    wiringpi on Orange Pi, mock on other machines).
+
+    * Prerequisites *
+    1. wiringOP lib (wiringpi backend) or python3-libgpiod (gpiod backend).
+
+    License: see 'licenses.txt' file in the root of project
+'''
+
+import configparser
+import os
+import platform
+import sys
+import threading
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(os.path.join(parent_dir, 'drivers/mock_wiringpi'))
+sys.path.append(os.path.join(parent_dir, 'utils'))
+# GPIO constants have the same values as wiringpi's GPIO class
+from mock_wiringpi import MockWiringPi, GPIO
+
+full_path_config_file = os.path.join(parent_dir, 'conf/config.ini')
+
+BACKEND_AUTO = 'auto'
+BACKEND_WIRINGPI = 'wiringpi'
+BACKEND_GPIOD = 'gpiod'
+BACKEND_MOCK = 'mock'
+BACKEND_SIMULATOR = 'simulator'
+
+GPIOD_CONSUMER = 'smart_drop_box'
+GPIOD_EVENT_WAIT = 1 # secs, edge thread checks the stop flag this often
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class WiringPiBackend:
+    def __init__(self):
+        import wiringpi
+        self._wiringpi = wiringpi
+        self._is_setup = False
+        self._setup_lock = threading.Lock()
+
+        self.INT_EDGE_SETUP = wiringpi.INT_EDGE_SETUP
+        self.INT_EDGE_FALLING = wiringpi.INT_EDGE_FALLING
+        self.INT_EDGE_RISING = wiringpi.INT_EDGE_RISING
+        self.INT_EDGE_BOTH = wiringpi.INT_EDGE_BOTH
+
+        self.pinMode = wiringpi.pinMode
+        self.digitalRead = wiringpi.digitalRead
+        self.digitalWrite = wiringpi.digitalWrite
+        self.pullUpDnControl = wiringpi.pullUpDnControl
+        self.wiringPiISR = wiringpi.wiringPiISR
+
+    def wiringPiSetup(self):
+        # Every driver calls it, only the first call touches the hardware.
+        with self._setup_lock:
+            if not self._is_setup:
+                self._wiringpi.wiringPiSetup()
+                self._is_setup = True
+
+
+class GpiodBackend:
+    '''
+        Pins are wiringpi pin numbers (see pins_config.py), line_map converts them to
+        line offsets of the chip. Pins without an item in line_map are used as offsets.
+    '''
+    INT_EDGE_SETUP = 0
+    INT_EDGE_FALLING = 1
+    INT_EDGE_RISING = 2
+    INT_EDGE_BOTH = 3
+
+    def __init__(self, chip='gpiochip0', line_map=None):
+        import gpiod
+        self._gpiod = gpiod
+        self._chip_name = chip
+        self._line_map = line_map or {}
+        self._chip = None
+        self._lines = {}
+        self._pulls = {}
+        self._edge_threads = {}
+        self._lock = threading.Lock()
+
+    def wiringPiSetup(self):
+        with self._lock:
+            if self._chip is None:
+                self._chip = self._gpiod.Chip(self._chip_name)
+
+    def _request(self, pin, request_type, default_value=0):
+        # Caller must hold _lock.
+        line = self._lines.pop(pin, None)
+        if line is not None:
+            line.release()
+
+        flags = 0
+        if request_type != self._gpiod.LINE_REQ_DIR_OUT:
+            pull = self._pulls.get(pin, GPIO.PUD_OFF)
+            if pull == GPIO.PUD_UP:
+                flags = self._gpiod.LINE_REQ_FLAG_BIAS_PULL_UP
+            elif pull == GPIO.PUD_DOWN:
+                flags = self._gpiod.LINE_REQ_FLAG_BIAS_PULL_DOWN
+
+        line = self._chip.get_line(self._line_map.get(pin, pin))
+        if request_type == self._gpiod.LINE_REQ_DIR_OUT:
+            line.request(consumer=GPIOD_CONSUMER, type=request_type,
+                         default_vals=[default_value])
+        else:
+            line.request(consumer=GPIOD_CONSUMER, type=request_type, flags=flags)
+        self._lines[pin] = line
+        return line
+
+    def pinMode(self, pin, mode):
+        with self._lock:
+            if mode == GPIO.OUTPUT:
+                self._request(pin, self._gpiod.LINE_REQ_DIR_OUT)
+            else:
+                self._request(pin, self._gpiod.LINE_REQ_DIR_IN)
+
+    def pullUpDnControl(self, pin, mode):
+        # Bias is a request flag, so the input line is requested again.
+        with self._lock:
+            self._pulls[pin] = mode
+            if pin in self._lines and pin not in self._edge_threads:
+                self._request(pin, self._gpiod.LINE_REQ_DIR_IN)
+
+    def digitalRead(self, pin):
+        return self._lines[pin].get_value()
+
+    def digitalWrite(self, pin, state):
+        self._lines[pin].set_value(int(state))
+
+    def wiringPiISR(self, pin, mode, callback):
+        edge_types = {
+            self.INT_EDGE_FALLING: self._gpiod.LINE_REQ_EV_FALLING_EDGE,
+            self.INT_EDGE_RISING: self._gpiod.LINE_REQ_EV_RISING_EDGE,
+            self.INT_EDGE_BOTH: self._gpiod.LINE_REQ_EV_BOTH_EDGES,
+        }
+        if mode not in edge_types:
+            raise ValueError("Unrecognised edge mode: \"%s\"" % mode)
+
+        with self._lock:
+            line = self._request(pin, edge_types[mode])
+
+        # Kernel queues the edges, the thread sleeps in event_wait() until one comes.
+        def wait_edges():
+            while self._lines.get(pin) is line:
+                if line.event_wait(sec=GPIOD_EVENT_WAIT):
+                    line.event_read()
+                    callback()
+
+        thread = threading.Thread(target=wait_edges, daemon=True)
+        self._edge_threads[pin] = thread
+        thread.start()
+        return 0
+
+
+def _parse_line_map(text):
+    # "9:199, 10:198" -> {9: 199, 10: 198}
+    line_map = {}
+    for item in text.split(','):
+        if item.strip():
+            pin, offset = item.split(':')
+            line_map[int(pin)] = int(offset)
+    return line_map
+
+
+def create_backend(name=BACKEND_AUTO, **options):
+    '''
+        Create a GPIO backend by name.
+
+        Args:
+            name (str) : 'auto', 'wiringpi', 'gpiod', 'mock' or 'simulator'.
+            options    : gpiod_chip and gpiod_line_map (gpiod backend).
+
+        Raises:
+            ValueError : unknown backend name.
+    '''
+    if name == BACKEND_AUTO:
+        name = BACKEND_WIRINGPI if platform.machine() == "armv7l" else BACKEND_MOCK
+
+    if name == BACKEND_WIRINGPI:
+        return WiringPiBackend()
+    if name == BACKEND_GPIOD:
+        return GpiodBackend(options.get('gpiod_chip', 'gpiochip0'),
+                            _parse_line_map(options.get('gpiod_line_map', '')))
+    if name == BACKEND_MOCK:
+        return MockWiringPi()
+    if name == BACKEND_SIMULATOR:
+        from hx711_simulator import Hx711Simulator
+        from pins_config import PinsConfig
+        return Hx711Simulator(PinsConfig.PD_OUT_WEIGHT, PinsConfig.SCK_WEIGHT)
+
+    raise ValueError("Unrecognised GPIO backend: \"%s\"" % name)
+
+
+def get_backend():
+    '''
+        The shared backend, created once from [gpio] section of 'conf/config.ini'.
+    '''
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            parser_data = configparser.ConfigParser()
+            parser_data.read(full_path_config_file)
+            _backend = create_backend(
+                parser_data.get('gpio', 'backend', fallback=BACKEND_AUTO),
+                gpiod_chip=parser_data.get('gpio', 'gpiod_chip', fallback='gpiochip0'),
+                gpiod_line_map=parser_data.get('gpio', 'gpiod_line_map', fallback=''))
+        return _backend
@@ -7,37 +7,284 @@
         1. Changed rpi library to wiringpi library and its methods
         2. Added timeout in readRawByte function (preventing program stuck forever waiting
            DOUT until LOW (_isReady() method)
+        3. Added optional background sampler (Hx711Sampler) which reads continuously into
+           a fixed-size ring buffer, so callers can get the latest weight without waiting
+           for the HX711 conversion.
+        4. Added fast frame reader (_read_frame_unlocked) for MSB format, read_long uses it.
+        5. Added edge-driven readiness (ready_mode='edge'). It sleeps until the DOUT falling
+           edge (wiringPiISR) instead of spinning on is_ready().
+        6. Added deadline-aware reads (read_long_with_deadline, get_weight_with_deadline).
+           They raise HX711TimeoutError instead of waiting forever for the hardware.
+        7. Added pluggable streaming filters (see weight_filter.py), set by set_filter().
+           Fixed float index in read_median for even number of samples.
+        8. Added wait_weight_settled(), it waits until weight is stable (SettleDetector).
+        9. Added persisted calibration (save_calibration, load_calibration) and lazy
+           re-tare in background (start_calibration_check).
+        10. Added adaptive sample count (get_weight_adaptive), it stops reading when the
+            confidence interval of the mean is tight enough.
+        11. Added AutoZeroTracker, it follows slow zero drift while the box is idle.
+        12. GPIO comes from the shared backend (gpio_backend.py) instead of importing
+            wiringpi or MockWiringPi here.
 
     see: 'example/drivers/hx711_ex.py' file
 
     GPL 2.0 Licenses (inherence from code source) 
 
 '''
+import configparser
+import math
 import os
 import sys
 import time
 import threading
-import platform
+import statistics
+from array import array
 
 sys.path.append("utils")
 import log
+from weight_filter import create_filter, SettleDetector
 
-### real hardware
-if platform.machine() == "armv7l":
-    import wiringpi 
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(os.path.join(parent_dir, 'drivers/gpio_backend'))
+from gpio_backend import get_backend
 
-### mock for testing in native pc
-else:
-    parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    sys.path.append(os.path.join(parent_dir,'drivers/mock_wiringpi'))
-    from mock_wiringpi import MockWiringPi 
-    wiringpi = MockWiringPi()
+# wiringpi, gpiod or mock (simulator), selected in 'conf/config.ini' ([gpio] section)
+wiringpi = get_backend()
 
 TIMEOUT_READ_RAW = 5 # secs
+SAMPLER_BUFFER_SIZE = 32 # samples kept by background sampler
+SAMPLER_POLL_INTERVAL = 0.01 # secs, HX711 outputs 10 SPS (80 SPS max)
+
+DEADLINE_POLL_INTERVAL = 0.005 # secs, poll interval of deadline-aware reads
+CALIBRATION_SECTION = 'hx711'
+CONFIDENCE_Z = 1.96 # 95% confidence interval for adaptive sample count
+AUTO_ZERO_INTERVAL = 300 # secs
+AUTO_ZERO_MAX_SLEW = 0.05 # weight unit per step
+AUTO_ZERO_CAPTURE_BAND = 0.5 # weight unit, bigger changes are not drift
+AUTO_ZERO_SAMPLES = 9
+AUTO_ZERO_READ_TIMEOUT = 1.5 # secs, 9 samples at 10 SPS with margin
+POWER_UP_DELAY = 0.1 # secs
+TIMEOUT_BACKGROUND_TARE = 10 # secs
+
+READY_MODE_POLL = 'poll'
+READY_MODE_EDGE = 'edge'
+
+
+class HX711TimeoutError(TimeoutError):
+    '''
+        Raised by deadline-aware reads when HX711 does not give data (or the readLock
+        is busy) before the deadline.
+    '''
+
+
+class RingBuffer:
+    '''
+        Fixed-size ring buffer backed by array ('d' typecode). It is designed for one
+        writer (the sampler thread) and many readers. The writer stores the value first
+        and then publishes it by increasing the counter, so readers never need a lock
+        and never block the writer.
+
+        NOTE: keep the requested window smaller than the buffer size, otherwise the oldest
+              item can be overwritten while it is being read.
+    '''
+    def __init__(self, size=SAMPLER_BUFFER_SIZE):
+        if size <= 0:
+            raise ValueError("RingBuffer::size must be greater than zero!")
+
+        self._size = size
+        self._data = array('d', [0.0] * size)
+        # Total of samples written. Only the writer changes it.
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self._size)
+
+    @property
+    def size(self):
+        return self._size
+
+    def append(self, value):
+        self._data[self._count % self._size] = value
+        self._count += 1
+
+    def clear(self):
+        self._count = 0
+
+    def latest(self):
+        '''
+            Returns the newest sample or None if buffer is empty.
+        '''
+        count = self._count
+        if count == 0:
+            return None
+        return self._data[(count - 1) % self._size]
+
+    def window(self, n):
+        '''
+            Returns list of the newest n samples (oldest first). It can be shorter than n
+            if buffer has not been filled yet.
+        '''
+        count = self._count
+        n = min(n, count, self._size)
+        size = self._size
+        data = self._data
+        return [data[i % size] for i in range(count - n, count)]
+
+
+class Hx711Sampler(threading.Thread):
+    '''
+        Background thread that reads HX711 continuously and stores raw values (signed int,
+        before offset and reference unit) in a RingBuffer. It only reads when DOUT is ready
+        and the sensor is not powered down, so it never waits in readRawBytes.
+        Use Hx711.start_sampler() instead of creating this object directly.
+    '''
+    def __init__(self, hx711, size=SAMPLER_BUFFER_SIZE, poll_interval=SAMPLER_POLL_INTERVAL):
+        super().__init__(daemon=True)
+        self._hx711 = hx711
+        self._poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self.buffer = RingBuffer(size)
+        # Streaming filter updated per sample (None if Hx711 has no filter set)
+        self.weight_filter = hx711._create_filter()
+        # Set by Hx711.wait_weight_settled(), fed with weight values
+        self.settle_detector = None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if not self._hx711._sample_into(self):
+                self._stop_event.wait(self._poll_interval)
+
+    def reset(self):
+        # Caller must hold Hx711.readLock (samples are written under it).
+        self.buffer.clear()
+        if self.weight_filter is not None:
+            self.weight_filter.reset()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def latest(self):
+        return self.buffer.latest()
+
+    def window(self, n):
+        return self.buffer.window(n)
+
+    def filtered_value(self, min_samples=1):
+        '''
+            Current raw value from streaming filter, None if no filter or less than
+            'min_samples' samples since start or last power up.
+        '''
+        if self.weight_filter is None or len(self.buffer) < max(min_samples, 1):
+            return None
+        return self.weight_filter.value
+
+
+class AutoZeroTracker(threading.Thread):
+    '''
+        Low priority background thread that follows slow zero drift of the load cell
+        (temperature) without a full re-tare. Every 'interval' secs, while it is resumed
+        (no session) and the door is closed, it reads the weight and moves the offset
+        towards the reference weight (known content of the box) by max. 'max_slew'.
+        Differences bigger than 'capture_band' are not drift, they are ignored.
+        The new offset is saved to calibration file (if given).
+    '''
+    def __init__(self, hx711, is_door_closed=None, calibration_file=None,
+                 interval=AUTO_ZERO_INTERVAL, max_slew=AUTO_ZERO_MAX_SLEW,
+                 capture_band=AUTO_ZERO_CAPTURE_BAND, samples=AUTO_ZERO_SAMPLES):
+        super().__init__(daemon=True)
+        self._hx711 = hx711
+        self._is_door_closed = is_door_closed
+        self._calibration_file = calibration_file
+        self._interval = interval
+        self._max_slew = max_slew
+        self._capture_band = capture_band
+        self._samples = samples
+        self._stop_event = threading.Event()
+        # pause() doesn't wait for a running read, a step paused in the middle throws
+        # its read away. The lock is only held while a correction is applied, so no
+        # offset is changed after pause() returns.
+        self._apply_lock = threading.Lock()
+        self._enabled = threading.Event()
+        self._reference = None
+
+    def pause(self):
+        with self._apply_lock:
+            self._enabled.clear()
+
+    def resume(self, reference):
+        with self._apply_lock:
+            self._reference = reference
+            if reference is None:
+                self._enabled.clear()
+            else:
+                self._enabled.set()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def _set_low_priority(self):
+        # Linux applies nice value per thread (native id).
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+    def run(self):
+        self._set_low_priority()
+        while not self._stop_event.wait(self._interval):
+            if self._enabled.is_set():
+                self.track_once()
+
+    def track_once(self):
+        '''
+            One tracking step. Returns the applied correction (weight unit) or None if
+            nothing was read.
+        '''
+        hx = self._hx711
+        if not self._enabled.is_set():
+            return None
+        if self._is_door_closed is not None and not self._is_door_closed():
+            return None
+
+        was_powered_down = hx._is_powered_down
+        if was_powered_down:
+            hx.power_up()
+            time.sleep(POWER_UP_DELAY)
+
+        try:
+            deadline = time.monotonic() + AUTO_ZERO_READ_TIMEOUT
+            weight = hx.get_weight_with_deadline(self._samples, deadline)
+        except HX711TimeoutError as error_message:
+            log.logger.warning(f"Auto-zero: {error_message}")
+            return None
+        finally:
+            # paused meanwhile: the session owns the power state now
+            if was_powered_down and self._enabled.is_set():
+                hx.power_down()
+
+        with self._apply_lock:
+            if not self._enabled.is_set():
+                return None
+
+            error = weight - self._reference
+            if abs(error) > self._capture_band:
+                return 0.0
+
+            step = max(-self._max_slew, min(self._max_slew, error))
+            if step != 0:
+                hx.set_offset_A(hx.get_offset_A() + step * hx.get_reference_unit_A())
+                if self._calibration_file is not None:
+                    hx.save_calibration(self._calibration_file, hx.calibrated_at)
+        return step
+
 
 class Hx711:
 
-    def __init__(self, dout, pd_sck, gain=128):
+    def __init__(self, dout, pd_sck, gain=128, ready_mode=READY_MODE_POLL, startup_delay=1.0):
         self.PD_SCK = pd_sck
         self.DOUT = dout
         self.GAIN = 0
@@ -49,6 +296,17 @@ class Hx711:
         wiringpi.pinMode(self.DOUT, 0)
         wiringpi.pinMode(self.PD_SCK, 1)
 
+        # Set by ISR on DOUT falling edge (data ready), only for edge mode.
+        self._ready_event = None
+        # True while a frame is clocked out, its data bits fall on DOUT too.
+        self._is_reading = False
+        if ready_mode == READY_MODE_EDGE:
+            self._ready_event = threading.Event()
+            wiringpi.wiringPiISR(self.DOUT, wiringpi.INT_EDGE_FALLING,
+                                 self._on_dout_falling)
+        elif ready_mode != READY_MODE_POLL:
+            raise ValueError("Unrecognised ready_mode: \"%s\"" % ready_mode)
+
         # The value returned by the hx711 that corresponds to your reference
         # unit AFTER dividing by the SCALE.
         self.REFERENCE_UNIT = 1
@@ -60,13 +318,32 @@ class Hx711:
 
         self.DEBUG_PRINTING = False
 
+        # Optional streaming filter options, see set_filter()
+        self._filter_options = None
+
+        # Optional background sampler, see start_sampler()
+        self.sampler = None
+        self._is_powered_down = False
+
+        # Samples used by the last get_weight_adaptive()
+        self.last_samples_used = 0
+
+        # Persisted calibration, see load_calibration() and start_calibration_check()
+        self.calibrated_at = None
+        self.recalibrated = threading.Event()
+        self._calibration_thread = None
+        self._power_state_lock = threading.Lock()
+        self._is_calibrating = False
+        self._power_down_pending = False
+
         self.byte_format = 'MSB'
         self.bit_format = 'MSB'
 
         self.set_gain(gain)
 
         # Think about whether this is necessary.
-        time.sleep(1)
+        # Edit: it can be skipped (startup_delay=0) when calibration is loaded from file.
+        time.sleep(startup_delay)
 
         
     def convertFromTwosComplement24bit(self, inputValue):
@@ -137,6 +414,73 @@ class Hx711:
         # driving the HX711 serial interface.
         self.readLock.acquire()
 
+        dataBytes = self._read_raw_bytes_unlocked()
+
+        # Release the Read Lock, now that we've finished driving the HX711
+        # serial interface.
+        self.readLock.release()           
+
+        return dataBytes
+
+
+    def _read_raw_bytes_unlocked(self):
+        # Caller must hold readLock.
+        self._wait_ready_unlocked()
+        self._is_reading = True
+        try:
+            return self._read_bytes_unlocked()
+        finally:
+            self._is_reading = False
+
+
+    def _on_dout_falling(self):
+        # ISR callback, DOUT goes LOW when a new conversion is ready. Edges of data
+        # bits are ignored first thing, the callback must not hold the GIL in the
+        # middle of a frame (PD_SCK HIGH > 60 us powers the HX711 down).
+        if self._is_reading:
+            return
+        self._ready_event.set()
+
+
+    def _wait_ready_edge_unlocked(self):
+        # Sleep until DOUT falls instead of spinning on is_ready().
+        while not self.is_ready():
+            self._ready_event.clear()
+
+            # DOUT could fall between is_ready() and clear().
+            if self.is_ready():
+                break
+
+            if not self._ready_event.wait(TIMEOUT_READ_RAW):
+                log.logger.error("No response from HX711 hardware!")
+
+
+    def _wait_ready_deadline_unlocked(self, deadline):
+        # deadline is in time.monotonic() secs.
+        while not self.is_ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HX711TimeoutError("No response from HX711 before deadline!")
+
+            if self._ready_event is not None:
+                self._ready_event.clear()
+                # DOUT could fall between is_ready() and clear().
+                if self.is_ready():
+                    break
+                self._ready_event.wait(remaining)
+            else:
+                time.sleep(min(DEADLINE_POLL_INTERVAL, remaining))
+
+
+    def _wait_ready_unlocked(self, deadline=None):
+        if deadline is not None:
+            self._wait_ready_deadline_unlocked(deadline)
+            return
+
+        if self._ready_event is not None:
+            self._wait_ready_edge_unlocked()
+            return
+
         # Wait until HX711 is ready for us to read a sample.
         # Edit by sian: I added timeout for this proccess. I dont want other processes 
         # stuck in this proccess.
@@ -148,8 +492,9 @@ class Hx711:
                log.logger.error("No response from HX711 hardware!")
                # wait for 3 secs
                time.sleep(3.0)
-    
 
+
+    def _read_bytes_unlocked(self):
         # Read three bytes of data from the HX711.
         firstByte  = self.readNextByte()
         secondByte = self.readNextByte()
@@ -161,10 +506,6 @@ class Hx711:
            # Clock a bit out of the HX711 and throw it away.
            self.readNextBit()
 
-        # Release the Read Lock, now that we've finished driving the HX711
-        # serial interface.
-        self.readLock.release()           
-
         # Depending on how we're configured, return an orderd list of raw byte
         # values.
         if self.byte_format == 'LSB':
@@ -173,11 +514,192 @@ class Hx711:
            return [firstByte, secondByte, thirdByte]
 
 
+    def _read_frame_unlocked(self):
+        '''
+            Fast frame reader for MSB byte and bit format. It clocks out 24 data bits plus
+            GAIN bits in one loop and builds the signed value directly. wiringpi functions
+            and pins are bound to locals once, so there is no method call or MSB/LSB branch
+            per bit (readNextByte + readNextBit path).
+            Caller must hold readLock and HX711 must be ready.
+        '''
+        write = wiringpi.digitalWrite
+        read = wiringpi.digitalRead
+        pd_sck = self.PD_SCK
+        dout = self.DOUT
+
+        value = 0
+        for _ in range(24):
+            write(pd_sck, True)
+            write(pd_sck, False)
+            value = (value << 1) | read(dout)
+
+        # HX711 Channel and gain factor are set by number of bits read
+        # after 24 data bits.
+        for _ in range(self.GAIN):
+            write(pd_sck, True)
+            write(pd_sck, False)
+
+        # Convert from 24bit twos-complement to a signed value.
+        signedIntValue = -(value & 0x800000) + (value & 0x7fffff)
+        self.lastVal = signedIntValue
+        return signedIntValue
+
+
+    def _read_long_unlocked(self, deadline=None):
+        # Caller must hold readLock.
+        self._wait_ready_unlocked(deadline)
+
+        self._is_reading = True
+        try:
+            # Fast path only supports MSB format (the HX711 datasheet format).
+            if self.byte_format == 'MSB' and self.bit_format == 'MSB' \
+                    and not self.DEBUG_PRINTING:
+                return self._read_frame_unlocked()
+
+            dataBytes = self._read_bytes_unlocked()
+        finally:
+            self._is_reading = False
+        return self._convert_raw_bytes(dataBytes)
+
+
     def read_long(self):
-        # Get a sample from the HX711 in the form of raw bytes.
-        dataBytes = self.readRawBytes()
+        # Wait for and get the Read Lock, incase another thread is already
+        # driving the HX711 serial interface.
+        self.readLock.acquire()
+
+        value = self._read_long_unlocked()
 
+        self.readLock.release()
+
+        return value
+
+
+    def read_long_with_deadline(self, deadline):
+        '''
+            Same as read_long() but it gives up at deadline (time.monotonic() secs). The
+            readLock is never held past the deadline.
+
+            Raises:
+                HX711TimeoutError : readLock is busy or HX711 is not ready before deadline.
+        '''
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not self.readLock.acquire(timeout=remaining):
+            raise HX711TimeoutError("HX711 readLock is busy until deadline!")
+
+        try:
+            value = self._read_long_unlocked(deadline)
+        finally:
+            self.readLock.release()
+
+        return value
+
+
+    def get_weight_with_deadline(self, times=3, deadline=None):
+        '''
+            Deadline-aware get_weight() (channel A). Median of 'times' samples, all of them
+            must be read before deadline (time.monotonic() secs). No deadline means
+            blocking get_weight().
+
+            Raises:
+                HX711TimeoutError : see read_long_with_deadline().
+        '''
+        if deadline is None and self._filter_options is None:
+            return self.get_weight(times)
+
+        if times <= 0:
+            raise ValueError("HX711::get_weight_with_deadline(): times must be greater than zero!")
+
+        if deadline is None:
+            values = [self.read_long() for _ in range(times)]
+        else:
+            values = [self.read_long_with_deadline(deadline) for _ in range(times)]
+
+        value = self._filter_samples(values) - self.get_offset_A()
+        return value / self.REFERENCE_UNIT
+
+
+    def read_adaptive(self, tolerance, min_samples=3, max_samples=15, deadline=None):
+        '''
+            Sequential sampling. It reads samples until the 95% confidence interval of the
+            mean is not wider than +/- tolerance (weight unit) or max_samples is reached.
+            Quiet signal stops after min_samples, noisy signal gets more samples.
+
+            Returns:
+                (mean raw value, samples used)
+
+            Raises:
+                HX711TimeoutError : deadline (time.monotonic() secs) is passed.
+        '''
+        if min_samples < 2 or max_samples < min_samples:
+            raise ValueError("HX711::read_adaptive(): needs 2 <= min_samples <= max_samples!")
+
+        tolerance_raw = tolerance * abs(self.get_reference_unit_A())
+        count = 0
+        mean = 0.0
+        sum_sq_diff = 0.0
+
+        while count < max_samples:
+            if deadline is None:
+                value = self.read_long()
+            else:
+                value = self.read_long_with_deadline(deadline)
+
+            # Welford's online mean and variance
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            sum_sq_diff += delta * (value - mean)
+
+            if count >= min_samples:
+                std_error = math.sqrt(sum_sq_diff / (count - 1) / count)
+                if CONFIDENCE_Z * std_error <= tolerance_raw:
+                    break
+
+        self.last_samples_used = count
+        return mean, count
 
+
+    def get_weight_adaptive(self, tolerance, min_samples=3, max_samples=15, deadline=None):
+        '''
+            Weight (channel A) with adaptive sample count, see read_adaptive().
+
+            Returns:
+                (weight, samples used)
+        '''
+        value, count = self.read_adaptive(tolerance, min_samples, max_samples, deadline)
+        return self._convert_to_weight(value), count
+
+
+    def set_filter(self, name, window=9, **options):
+        '''
+            Select streaming filter for get_weight_with_deadline() and the sampler. See
+            create_filter() in weight_filter.py for names and options. Set it before
+            start_sampler().
+        '''
+        # Make sure the filter can be created (raise ValueError early).
+        create_filter(name, window, **options)
+        self._filter_options = (name, window, options)
+
+
+    def _create_filter(self):
+        if self._filter_options is None:
+            return None
+        name, window, options = self._filter_options
+        return create_filter(name, window, **options)
+
+
+    def _filter_samples(self, values):
+        # Median of values if no filter is set (same as read_median).
+        weight_filter = self._create_filter()
+        if weight_filter is None:
+            return statistics.median(values)
+
+        for value in values:
+            weight_filter.update(value)
+        return weight_filter.value
+
+
+    def _convert_raw_bytes(self, dataBytes):
         if self.DEBUG_PRINTING:
             print(dataBytes,)
         
@@ -198,7 +720,223 @@ class Hx711:
         # Return the sample value we've read from the HX711.
         return int(signedIntValue)
 
-    
+
+    def _sample_into(self, sampler):
+        '''
+            Read one sample into sampler (buffer, filter and settle detector) only if HX711
+            is powered up and DOUT is ready. Returns True if a sample was stored.
+        '''
+        is_sampled = False
+        self.readLock.acquire()
+
+        if not self._is_powered_down and self.is_ready():
+            value = self._read_long_unlocked()
+            sampler.buffer.append(value)
+            if sampler.weight_filter is not None:
+                sampler.weight_filter.update(value)
+            settle_detector = sampler.settle_detector
+            if settle_detector is not None:
+                settle_detector.update(self._convert_to_weight(value))
+            is_sampled = True
+
+        self.readLock.release()
+        return is_sampled
+
+
+    def start_sampler(self, size=SAMPLER_BUFFER_SIZE, poll_interval=SAMPLER_POLL_INTERVAL):
+        '''
+            Start background sampler (opt-in). Call it after tare(), the sampler and tare
+            share the readLock.
+        '''
+        if self.sampler is not None:
+            return self.sampler
+
+        self.sampler = Hx711Sampler(self, size, poll_interval)
+        self.sampler.start()
+        return self.sampler
+
+
+    def stop_sampler(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+
+
+    def get_weight_sampled(self, times=3, deadline=None):
+        '''
+            Non-blocking version of get_weight(). It takes the streaming filter value of the
+            sampler, or the median of the newest 'times' samples from the sampler buffer if
+            no filter is set. It falls back to get_weight_with_deadline()
+            when the sampler is not running or has less than 'times' samples (eg. right
+            after power_up, the first samples are not settled), so it blocks only if
+            deadline is None.
+        '''
+        if self.sampler is None:
+            return self.get_weight_with_deadline(times, deadline)
+
+        min_samples = min(times, self.sampler.buffer.size)
+        value = self.sampler.filtered_value(min_samples)
+        if value is None:
+            values = self.sampler.window(times)
+            if len(values) < min_samples:
+                return self.get_weight_with_deadline(times, deadline)
+            value = statistics.median(values)
+
+        value = value - self.get_offset_A()
+        return value / self.REFERENCE_UNIT
+
+
+    def _convert_to_weight(self, value):
+        # Channel A raw value to weight
+        return (value - self.get_offset_A()) / self.REFERENCE_UNIT
+
+
+    def wait_weight_settled(self, reference, timeout, window=5, max_std=0.3):
+        '''
+            Wait until the weight is stable (see SettleDetector in weight_filter.py) or
+            until timeout (secs). With the sampler running it only waits for the settled
+            event, otherwise it reads samples with a deadline.
+
+            Returns:
+                SettleDetector with value and delta (relative to reference) or None if
+                weight isn't settled before timeout.
+        '''
+        detector = SettleDetector(window, max_std, reference)
+        deadline = time.monotonic() + timeout
+
+        sampler = self.sampler
+        if sampler is not None:
+            sampler.settle_detector = detector
+            try:
+                detector.settled.wait(timeout)
+            finally:
+                sampler.settle_detector = None
+        else:
+            try:
+                while not detector.settled.is_set():
+                    value = self.read_long_with_deadline(deadline)
+                    detector.update(self._convert_to_weight(value))
+            except HX711TimeoutError:
+                pass
+
+        if not detector.settled.is_set():
+            return None
+        return detector
+
+
+    def save_calibration(self, file_path, tared_at=None):
+        '''
+            Save tare offset, reference unit and tare time (drift timestamp) of channel A.
+            The file is replaced atomically, so a power cut never leaves half a file.
+            tared_at (epoch secs) keeps the old tare time, eg. for auto-zero updates.
+        '''
+        self.calibrated_at = time.time() if tared_at is None else tared_at
+        parser = configparser.ConfigParser()
+        parser[CALIBRATION_SECTION] = {
+            'offset': repr(float(self.get_offset_A())),
+            'reference_unit': repr(float(self.get_reference_unit_A())),
+            'tared_at': repr(self.calibrated_at),
+        }
+
+        temp_file_path = file_path + '.tmp'
+        with open(temp_file_path, 'w') as f:
+            parser.write(f)
+        os.replace(temp_file_path, file_path)
+
+
+    def load_calibration(self, file_path):
+        '''
+            Load tare offset from calibration file. The reference unit in the file must
+            equal the current one (set_reference_unit() first), else it is ignored.
+
+            Returns:
+                True if calibration is loaded, False if file is missing or invalid.
+        '''
+        parser = configparser.ConfigParser()
+        try:
+            if not parser.read(file_path):
+                return False
+            offset = parser.getfloat(CALIBRATION_SECTION, 'offset')
+            reference_unit = parser.getfloat(CALIBRATION_SECTION, 'reference_unit')
+            tared_at = parser.getfloat(CALIBRATION_SECTION, 'tared_at')
+        except (configparser.Error, ValueError) as error_message:
+            log.logger.warning(f"HX711 calibration file is invalid: {error_message}")
+            return False
+
+        if reference_unit != self.get_reference_unit_A():
+            log.logger.info("HX711 reference unit is changed, calibration file is ignored.")
+            return False
+
+        self.set_offset_A(offset)
+        self.calibrated_at = tared_at
+        return True
+
+
+    def is_calibration_stale(self, max_age, zero_tolerance, timeout=1.0):
+        '''
+            Calibration is stale if it is older than max_age (secs) or the zero reading
+            differs from the stored offset more than zero_tolerance (weight unit).
+            If HX711 doesn't respond in timeout, stored calibration is kept.
+        '''
+        if self.calibrated_at is None or time.time() - self.calibrated_at > max_age:
+            return True
+
+        deadline = time.monotonic() + timeout
+        try:
+            values = [self.read_long_with_deadline(deadline) for _ in range(3)]
+        except HX711TimeoutError:
+            return False
+
+        return abs(self._convert_to_weight(statistics.median(values))) > zero_tolerance
+
+
+    def _tare_with_deadline(self, times, deadline):
+        # Same as tare_A() but it never blocks past deadline (trimmed mean of samples).
+        values = [self.read_long_with_deadline(deadline) for _ in range(times)]
+        trimmed_mean = create_filter('trimmed_mean', times)
+        for value in values:
+            trimmed_mean.update(value)
+        self.set_offset_A(trimmed_mean.value)
+        return trimmed_mean.value
+
+
+    def _check_calibration(self, file_path, max_age, zero_tolerance, times):
+        try:
+            if self.is_calibration_stale(max_age, zero_tolerance):
+                log.logger.info("HX711 calibration is stale, re-tare in background.")
+                self._tare_with_deadline(times, time.monotonic() + TIMEOUT_BACKGROUND_TARE)
+                self.save_calibration(file_path)
+                self.recalibrated.set()
+        except HX711TimeoutError as error_message:
+            log.logger.error(f"HX711 background tare failed: {error_message}")
+        finally:
+            with self._power_state_lock:
+                self._is_calibrating = False
+                is_power_down_pending = self._power_down_pending
+                self._power_down_pending = False
+
+            if is_power_down_pending:
+                self.power_down()
+
+
+    def start_calibration_check(self, file_path, max_age, zero_tolerance, times=15):
+        '''
+            Check loaded calibration in background and re-tare only if it is stale (see
+            is_calibration_stale()). 'recalibrated' event is set after a new tare, the
+            caller should read its reference weight again. power_down() is deferred until
+            the check is finished.
+        '''
+        with self._power_state_lock:
+            self._is_calibrating = True
+
+        self._calibration_thread = threading.Thread(
+            target=self._check_calibration,
+            args=(file_path, max_age, zero_tolerance, times),
+            daemon=True)
+        self._calibration_thread.start()
+        return self._calibration_thread
+
+
     def read_average(self, times=3):
         # Make sure we've been asked to take a rational amount of samples.
         if times <= 0:
@@ -255,8 +993,8 @@ class Hx711:
        else:
           # If times is even we have to take the arithmetic mean of
           # the two middle values.
-          midpoint = len(valueList) / 2
-          return sum(valueList[midpoint:midpoint+2]) / 2.0
+          midpoint = len(valueList) // 2
+          return sum(valueList[midpoint-1:midpoint+1]) / 2.0
 
 
     # Compatibility function, uses channel A version
@@ -413,6 +1151,12 @@ class Hx711:
         
         
     def power_down(self):
+        # Background calibration check needs the HX711, power down after it is finished.
+        with self._power_state_lock:
+            if self._is_calibrating:
+                self._power_down_pending = True
+                return
+
         # Wait for and get the Read Lock, incase another thread is already
         # driving the HX711 serial interface.
         self.readLock.acquire()
@@ -425,12 +1169,20 @@ class Hx711:
 
         time.sleep(0.0001)
 
+        # Samples in sampler buffer are stale from now on.
+        self._is_powered_down = True
+        if self.sampler is not None:
+            self.sampler.reset()
+
         # Release the Read Lock, now that we've finished driving the HX711
         # serial interface.
         self.readLock.release()           
 
 
     def power_up(self):
+        with self._power_state_lock:
+            self._power_down_pending = False
+
         # Wait for and get the Read Lock, incase another thread is already
         # driving the HX711 serial interface.
         self.readLock.acquire()
@@ -441,6 +1193,8 @@ class Hx711:
         # Wait 100 us for the HX711 to power back up.
         time.sleep(0.0001)
 
+        self._is_powered_down = False
+
         # Release the Read Lock, now that we've finished driving the HX711
         # serial interface.
         self.readLock.release()
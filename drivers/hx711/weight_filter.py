@@ -0,0 +1,319 @@
+'''
+    File           : weight_filter.py
+    Author         : I Putu Pawesi Siantika, S.T.
+    Year           : Oct, 2026
+    Description    :
+
+    Streaming filters for weight sensor (HX711) samples. Each filter is updated per sample
+    with update(value) and gives the current estimate in 'value' attribute, so we don't
+    build, sort and slice a list for every read (read_average and read_median in hx711.py).
+
+        1. RollingMedian      : median of the last N samples (two heaps), O(log N) per sample.
+        2. RollingTrimmedMean : mean of the last N samples without 20% lowest and highest
+                                samples (same trimming as read_average in hx711.py),
+                                O(1) sums and O(log N) search per sample.
+        3. Ema                : exponential moving average, O(1) per sample.
+        4. Kalman1D           : 1-D Kalman filter for a constant weight, O(1) per sample.
+
+    SettleDetector is not a filter, it tells when the weight is stable again (eg. after
+    the courier puts an item and closes the door).
+
+    Use create_filter() to make a filter by its name (see [weight] section in
+    'conf/config.ini').
+
+    License: see 'licenses.txt' file in the root of project
+'''
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+
+FILTER_MEDIAN = 'median'
+FILTER_TRIMMED_MEAN = 'trimmed_mean'
+FILTER_EMA = 'ema'
+FILTER_KALMAN = 'kalman'
+
+DEFAULT_WINDOW = 9
+DEFAULT_TRIM_RATIO = 0.2
+DEFAULT_EMA_ALPHA = 0.3
+DEFAULT_KALMAN_PROCESS_VARIANCE = 100.0
+DEFAULT_KALMAN_MEASUREMENT_VARIANCE = 10000.0
+
+DEFAULT_SETTLE_WINDOW = 5
+DEFAULT_SETTLE_MAX_STD = 0.3
+
+
+class RollingMedian:
+    '''
+        Median of the last 'window' samples. Lower half is kept in a max heap and upper
+        half in a min heap. Samples leaving the window are removed lazily (they are
+        dropped when they reach the top of a heap).
+    '''
+    def __init__(self, window=DEFAULT_WINDOW):
+        if window <= 0:
+            raise ValueError("RollingMedian::window must be greater than zero!")
+        self._window = window
+        self.reset()
+
+    def reset(self):
+        self._samples = deque()
+        self._low = []      # max heap (negated values)
+        self._high = []     # min heap
+        self._low_size = 0  # valid items in heaps (without delayed items)
+        self._high_size = 0
+        self._delayed = Counter()
+        self.value = None
+
+    def _prune(self, heap, sign):
+        while heap and self._delayed[sign * heap[0]] > 0:
+            self._delayed[sign * heap[0]] -= 1
+            heapq.heappop(heap)
+
+    def _balance(self):
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, -1)
+        elif self._low_size < self._high_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._low_size += 1
+            self._high_size -= 1
+            self._prune(self._high, 1)
+
+    def _insert(self, value):
+        if not self._low or value <= -self._low[0]:
+            heapq.heappush(self._low, -value)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, value)
+            self._high_size += 1
+        self._balance()
+
+    def _remove(self, value):
+        self._delayed[value] += 1
+        if value <= -self._low[0]:
+            self._low_size -= 1
+            self._prune(self._low, -1)
+        else:
+            self._high_size -= 1
+            self._prune(self._high, 1)
+        self._balance()
+
+    def update(self, value):
+        if len(self._samples) == self._window:
+            self._remove(self._samples.popleft())
+
+        self._samples.append(value)
+        self._insert(value)
+
+        if self._low_size > self._high_size:
+            self.value = -self._low[0]
+        else:
+            self.value = (-self._low[0] + self._high[0]) / 2.0
+        return self.value
+
+
+class RollingTrimmedMean:
+    '''
+        Mean of the last 'window' samples after trimming 'trim_ratio' of samples from
+        the bottom and the top. Sums of the trimmed tails are kept and only adjusted by
+        the samples which cross a trim boundary (O(1)). Samples are kept in a sorted
+        list, the position is found with bisect (O(log N)); list insert and delete move
+        the rest of the window in memory, which is cheaper than a balanced tree for the
+        small windows used here.
+    '''
+    def __init__(self, window=DEFAULT_WINDOW, trim_ratio=DEFAULT_TRIM_RATIO):
+        if window <= 0:
+            raise ValueError("RollingTrimmedMean::window must be greater than zero!")
+        if not 0 <= trim_ratio < 0.5:
+            raise ValueError("RollingTrimmedMean::trim_ratio must be in [0, 0.5)!")
+        self._window = window
+        self._trim_ratio = trim_ratio
+        self.reset()
+
+    def reset(self):
+        self._samples = deque()
+        self._sorted = []
+        self._total = 0
+        self._trim = 0
+        self._low_sum = 0   # sum of _sorted[:_trim]
+        self._high_sum = 0  # sum of _sorted[-_trim:]
+        self.value = None
+
+    def update(self, value):
+        samples = self._sorted
+        trim = self._trim
+        if len(self._samples) == self._window:
+            old_value = self._samples.popleft()
+            index = bisect_left(samples, old_value)
+            del samples[index]
+            self._total -= old_value
+            # next sample inside the window takes the place of the removed one in a tail
+            if index < trim:
+                self._low_sum += samples[trim - 1] - old_value
+            elif index > len(samples) - trim:
+                self._high_sum += samples[len(samples) - trim] - old_value
+
+        self._samples.append(value)
+        index = bisect_right(samples, value)
+        samples.insert(index, value)
+        self._total += value
+        count = len(samples)
+        # new sample pushes the innermost sample of its tail out of it
+        if index < trim:
+            self._low_sum += value - samples[trim]
+        elif index >= count - trim:
+            self._high_sum += value - samples[count - 1 - trim]
+
+        # window is filling up, the tails grow by one sample at most
+        new_trim = int(count * self._trim_ratio)
+        if new_trim > trim:
+            self._low_sum += samples[trim]
+            self._high_sum += samples[count - 1 - trim]
+            self._trim = trim = new_trim
+
+        self.value = (self._total - self._low_sum - self._high_sum) / (count - 2 * trim)
+        return self.value
+
+
+class Ema:
+    '''
+        Exponential moving average. Bigger alpha follows new samples faster.
+    '''
+    def __init__(self, alpha=DEFAULT_EMA_ALPHA):
+        if not 0 < alpha <= 1:
+            raise ValueError("Ema::alpha must be in (0, 1]!")
+        self._alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = float(value)
+        else:
+            self.value += self._alpha * (value - self.value)
+        return self.value
+
+
+class Kalman1D:
+    '''
+        1-D Kalman filter, the weight is modeled as a constant with small process noise.
+        Variances are in raw HX711 units (before offset and reference unit).
+    '''
+    def __init__(self, process_variance=DEFAULT_KALMAN_PROCESS_VARIANCE,
+                 measurement_variance=DEFAULT_KALMAN_MEASUREMENT_VARIANCE):
+        if process_variance < 0 or measurement_variance <= 0:
+            raise ValueError("Kalman1D::variances must be positive!")
+        self._process_variance = process_variance
+        self._measurement_variance = measurement_variance
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self._error_variance = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = float(value)
+            self._error_variance = self._measurement_variance
+            return self.value
+
+        # predict
+        error_variance = self._error_variance + self._process_variance
+        # correct
+        gain = error_variance / (error_variance + self._measurement_variance)
+        self.value += gain * (value - self.value)
+        self._error_variance = (1 - gain) * error_variance
+        return self.value
+
+
+class SettleDetector:
+    '''
+        Change-point/stability detector. Weight is settled when the standard deviation of
+        the last 'window' samples is not bigger than 'max_std'. It happens once: 'settled'
+        event is set, 'value' is the mean of the window and 'delta' is value - reference.
+        Variance is computed from running sums, O(1) per sample.
+    '''
+    def __init__(self, window=DEFAULT_SETTLE_WINDOW, max_std=DEFAULT_SETTLE_MAX_STD,
+                 reference=0.0):
+        if window <= 1:
+            raise ValueError("SettleDetector::window must be greater than one!")
+        self._window = window
+        self._max_variance = max_std * max_std
+        self.settled = threading.Event()
+        self.reset(reference)
+
+    def reset(self, reference=None):
+        if reference is not None:
+            self.reference = reference
+        self._samples = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self.value = None
+        self.delta = None
+        self.settled.clear()
+
+    def update(self, value):
+        '''
+            Returns True only for the sample which makes the weight settled.
+        '''
+        if self.settled.is_set():
+            return False
+
+        if len(self._samples) == self._window:
+            old_value = self._samples.popleft()
+            self._sum -= old_value
+            self._sum_sq -= old_value * old_value
+
+        self._samples.append(value)
+        self._sum += value
+        self._sum_sq += value * value
+
+        count = len(self._samples)
+        if count < self._window:
+            return False
+
+        mean = self._sum / count
+        variance = max(self._sum_sq / count - mean * mean, 0.0)
+        if variance > self._max_variance:
+            return False
+
+        self.value = mean
+        self.delta = mean - self.reference
+        self.settled.set()
+        return True
+
+    def __str__(self):
+        if not self.settled.is_set():
+            return "not settled"
+        return "settled at %.1f (delta %.1f)" % (self.value, self.delta)
+
+
+def create_filter(name=FILTER_MEDIAN, window=DEFAULT_WINDOW, **options):
+    '''
+        Create a streaming filter by name.
+
+        Args:
+            name (str)    : 'median', 'trimmed_mean', 'ema' or 'kalman'.
+            window (int)  : samples window for median and trimmed_mean.
+            options       : trim_ratio, ema_alpha, kalman_process_variance and
+                            kalman_measurement_variance.
+
+        Raises:
+            ValueError : unknown filter name.
+    '''
+    if name == FILTER_MEDIAN:
+        return RollingMedian(window)
+    if name == FILTER_TRIMMED_MEAN:
+        return RollingTrimmedMean(window, options.get('trim_ratio', DEFAULT_TRIM_RATIO))
+    if name == FILTER_EMA:
+        return Ema(options.get('ema_alpha', DEFAULT_EMA_ALPHA))
+    if name == FILTER_KALMAN:
+        return Kalman1D(
+            options.get('kalman_process_variance', DEFAULT_KALMAN_PROCESS_VARIANCE),
+            options.get('kalman_measurement_variance', DEFAULT_KALMAN_MEASUREMENT_VARIANCE))
+
+    raise ValueError("Unrecognised weight filter: \"%s\"" % name)
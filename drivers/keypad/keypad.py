@@ -8,6 +8,10 @@
    for this protocol between keypad and orange pi. The keypad will send a char (in truth is string) 
    with special chars "/r/n". So, we need to decode and strip that data and simply return it as str
    in Python.
+   reading_input_keys() drains every byte waiting in the serial port at once and splits it
+   into keys (fast typing bursts), a partial line is kept for the next read.
+   KeypadReader reads the keypad in its own thread and puts timestamped key events
+   (KeyEvent) on a queue, so callers don't block on the serial timeout.
 
     * Prerequisites *
     1. Download or put this library in your working directory project.
@@ -15,6 +19,7 @@
 
     Example code:
         see: './example/keypad_ex.py' file!
+        Without hardware, use the pty keypad emulator (see keypad_emulator.py).
 
     License: see 'licenses.txt' file in the root of project
 
@@ -24,31 +29,43 @@
 '''
  
 import os
+import queue
 import sys
+import threading
+import time
+from collections import namedtuple
+
 import serial
-import platform
 
-if platform.machine() == 'armv7l':
-    import wiringpi 
-    from wiringpi import GPIO
-    
-else:
-    parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    sys.path.append(os.path.join(parent_dir, 'drivers/mock_wiringpi'))
-    from mock_wiringpi import MockWiringPi, GPIO
-    wiringpi = MockWiringPi()
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(os.path.join(parent_dir, 'drivers/gpio_backend'))
+from gpio_backend import get_backend, GPIO
+
+# wiringpi, gpiod or mock, selected in 'conf/config.ini' ([gpio] section)
+wiringpi = get_backend()
+
+# key (str) and timestamp (time.monotonic() secs) when the key is received
+KeyEvent = namedtuple('KeyEvent', ['key', 'timestamp'])
+
+# A line without '\n' longer than this is noise, it is dropped
+MAX_LINE_LENGTH = 64
+
+KEYPAD_PORT = '/dev/ttyS1'  # UART1 on Orange Pi
+KEYPAD_BAUDRATE = 9600
 
 
 class Keypad:
-    def __init__(self,):
+    def __init__(self, port=KEYPAD_PORT, baudrate=KEYPAD_BAUDRATE):
         self.ser = serial.Serial(
-        port='/dev/ttyS1',  # UART1 on Orange Pi
-        baudrate=9600,
+        port=port,
+        baudrate=baudrate,
         parity=serial.PARITY_NONE,
         stopbits=serial.STOPBITS_ONE,
         bytesize=serial.EIGHTBITS,
         timeout=1
         )       
+        # bytes after the last '\n' (partial line), see reading_input_keys()
+        self._rx_buffer = b''
     
     def reading_input_char(self):
         '''
@@ -66,8 +83,87 @@ class Keypad:
                 if len(char_data) == 0:   
                     char_data = None
             return char_data
-    
-    
 
+    def reading_input_keys(self):
+        '''
+            Read every byte waiting in serial port with one read and split it into keys.
+            If nothing is waiting, it blocks until the first byte (max. serial timeout).
+            A line which can't be decoded is dropped alone, keys around it are kept.
+
+            Returns:
+                list of keys (str), empty if no key is pressed.
+        '''
+        waiting = self.ser.in_waiting
+        data = self.ser.read(waiting or 1)
+        if waiting == 0 and data:
+            # first byte of a burst, take the rest of it too
+            data += self.ser.read(self.ser.in_waiting)
+
+        *lines, self._rx_buffer = (self._rx_buffer + data).split(b'\n')
+        if len(self._rx_buffer) > MAX_LINE_LENGTH:
+            self._rx_buffer = b''
 
+        keys = []
+        for line in lines:
+            try:
+                key = line.decode('utf-8').strip()
+            except UnicodeDecodeError as msg_error:
+                print(f"Error keypad: {msg_error}")
+                continue
+            if key:
+                keys.append(key)
+        return keys
+
+
+class KeypadReader(threading.Thread):
+    '''
+        Reads the keypad continuously and puts KeyEvent items on 'events' queue. Keys of
+        the same burst have the same timestamp.
+        Keypad.reading_input_keys() blocks max. serial timeout, so stop() takes max. the
+        same time.
+    '''
+    def __init__(self, keypad):
+        super().__init__(daemon=True)
+        self._keypad = keypad
+        self._is_running = True
+        self.events = queue.Queue()
+
+    def run(self):
+        while self._is_running:
+            keys = self._keypad.reading_input_keys()
+            timestamp = time.monotonic()
+            for key in keys:
+                self.events.put(KeyEvent(key, timestamp))
+
+    def stop(self, timeout=2.0):
+        self._is_running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def get_event(self, timeout=0):
+        '''
+            Returns the next KeyEvent or None if no key is pressed in timeout secs
+            (0 = don't wait).
+        '''
+        try:
+            if timeout:
+                return self.events.get(timeout=timeout)
+            return self.events.get_nowait()
+        except queue.Empty:
+            return None
+
+    def get_events(self, timeout=0):
+        '''
+            Returns all queued KeyEvent items (oldest first). It waits max. timeout secs
+            for the first one, empty list if no key is pressed.
+        '''
+        event = self.get_event(timeout)
+        if event is None:
+            return []
 
+        events = [event]
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
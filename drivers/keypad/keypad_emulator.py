@@ -0,0 +1,70 @@
+'''
+    File           : keypad_emulator.py
+    Author         : I Putu Pawesi Siantika, S.T.
+    Year           : Oct, 2026
+    Description    :
+
+    Virtual serial keypad. It opens a pseudo-terminal (pty) and writes keys like the
+    keypad hardware does (key + "\r\n"), so Keypad (keypad.py) can open 'port' instead
+    of '/dev/ttyS1'. Keystroke timings can be scripted with play() and the time each
+    key is written is kept in 'sent_times' (for latency benchmarks).
+
+    Usage:
+        emulator = KeypadEmulator()
+        keypad = Keypad(emulator.port)
+        emulator.play([(0.1, '1'), (0.05, '2'), (0.05, '3'), (0.05, '4')])
+
+    Linux only (pty).
+
+    License: see 'licenses.txt' file in the root of project
+'''
+import os
+import threading
+import time
+import tty
+
+LINE_ENDING = b'\r\n'
+
+
+class KeypadEmulator:
+    def __init__(self):
+        self._master_fd, self._slave_fd = os.openpty()
+        # no echo and no line translation, bytes go through as they are
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self.sent_times = []
+        self._write_lock = threading.Lock()
+
+    def press(self, keys):
+        '''
+            Write keys (str, one char per key or a list of keys) in one write, like a
+            burst from the keypad.
+        '''
+        data = b''.join(str(key).encode('utf-8') + LINE_ENDING for key in keys)
+        with self._write_lock:
+            os.write(self._master_fd, data)
+            timestamp = time.monotonic()
+            self.sent_times.extend(timestamp for _ in keys)
+
+    def write_raw(self, data):
+        # For broken or partial lines.
+        with self._write_lock:
+            os.write(self._master_fd, data)
+
+    def play(self, script):
+        '''
+            Press keys from script, a list of (delay secs, key) items, in a background
+            thread. Returns the (started) thread.
+        '''
+        def play_script():
+            for delay, key in script:
+                time.sleep(delay)
+                self.press([key])
+
+        thread = threading.Thread(target=play_script, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
@@ -8,6 +8,20 @@
     . Please find the address of i2c and the bus ( you can use i2c-tools package in linux)
     see test_lcd.py for full documentation!
 
+    render(lines) keeps a shadow of the 2 x 16 display and only sends cells which
+    changed (no clear command), so a keystroke update costs a few bytes instead of
+    clear_lcd() and 32 chars.
+
+    With batch_i2c, bytes of a command or a text (data and EN strobes, see encode_4_bit())
+    are precomputed and sent in one I2C block transfer (i2c_rdwr). Bus clock gives the
+    timing: at 100 kHz one byte takes ~90 us, longer than EN pulse (450 ns) and
+    command execution time (37 us), so only clear and return home commands need a sleep.
+
+    Static screens can be compiled once (compile_screen()) and drawn with
+    render_compiled(), their bytes are not encoded again per display.
+
+    'bus' can be VirtualLcdBus (virtual_lcd.py) to run without the hardware.
+
     * Prerequisites *
     1. SMBus2 lib.
     2. Download or put this library in your working directory project.
@@ -19,7 +33,9 @@
     License: see 'licenses.txt' file in the root of project
 '''
 
-from smbus2 import SMBus
+from collections import namedtuple
+from contextlib import contextmanager
+from smbus2 import SMBus, i2c_msg
 import time
 
 EN_PIN = 0x04
@@ -40,13 +56,71 @@ SET_DISPLAY_CONTROL_NO_CURSOR_BLINKING = 0x00
 SET_LCD_POS_0 = 0x80
 SET_LCD_POS_1 = 0xC0
 
+LCD_LINES = 2
+LCD_COLUMNS = 16
+LINE_POS_CMDS = (SET_LCD_POS_0, SET_LCD_POS_1)
+
+# secs, execution time of clear and return home commands (1.52 ms in datasheet)
+LONG_CMD_TIME = 0.002
+
+
+def encode_4_bit(data_lcd, mode):
+    '''
+        PCF8574 bytes of one LCD command or char in 4 bit mode: per nibble data,
+        data with EN high and data with EN low (backlight on), same as
+        Lcd._send_data_4_bit() writes byte by byte.
+    '''
+    byte_seq = bytearray()
+    for nibble in ((data_lcd & 0xF0), ((data_lcd & 0x0F) << 4)):
+        data = nibble | mode
+        byte_seq += bytes((data | BACKLIGHT_ON,
+                           data | EN_PIN | BACKLIGHT_ON,
+                           (data & ~EN_PIN) | BACKLIGHT_ON))
+    return bytes(byte_seq)
+
+
+def encode_text(text):
+    return b''.join(encode_4_bit(ord(c), MODE_WRITE_LCD) for c in str(text))
+
+
+# lines : padded texts, line_bytes : cursor command and 16 chars per line (encoded)
+CompiledScreen = namedtuple('CompiledScreen', ['lines', 'line_bytes'])
+
+
+def compile_screen(lines):
+    '''
+        Pad and encode a static screen (2 lines) once, see Lcd.render_compiled().
+
+        Raises:
+            ValueError : wrong number of lines or a text exceeds 16 chars.
+    '''
+    if len(lines) != LCD_LINES:
+        raise ValueError("render needs exactly 2 lines!")
+
+    texts = [str(text) for text in lines]
+    if any(len(text) > LCD_COLUMNS for text in texts):
+        raise ValueError("text's length exceeded 16 chars!")
+
+    texts = tuple(text.ljust(LCD_COLUMNS) for text in texts)
+    line_bytes = tuple(encode_4_bit(LINE_POS_CMDS[line], MODE_SETUP_LCD) + encode_text(text)
+                       for line, text in enumerate(texts))
+    return CompiledScreen(texts, line_bytes)
+
+
 class Lcd:
    
-    def __init__(self, dev_addr, bus_line):
+    def __init__(self, dev_addr, bus_line, batch_i2c=False, bus=None):
         self._dev_addr = int(dev_addr)
         self._bus_line = int(bus_line)
-        self.bus = SMBus()
+        self.bus = SMBus() if bus is None else bus
         self.bus.open(self._bus_line) 
+        self.batch_i2c = batch_i2c
+        # bytes waiting for one block transfer (inside _transaction())
+        self._tx_buffer = None
+        # What the display shows (None = unknown, eg. before init_lcd) and where the
+        # LCD address counter points to (line, column).
+        self._shadow = None
+        self._cursor = None
 
     ### low level methods and private
     def _write_byte_data(self, byte_data):
@@ -66,21 +140,99 @@ class Lcd:
     def _set_mode_in_4_bit(self):
         self._send_data_to_reg(MODE_4_BIT | TWO_LINE_BIT)
     
+    def _write_block(self, byte_seq):
+        self.bus.i2c_rdwr(i2c_msg.write(self._dev_addr, byte_seq))
+
+    def _flush(self):
+        if self._tx_buffer:
+            byte_seq = bytes(self._tx_buffer)
+            self._tx_buffer = bytearray()
+            self._write_block(byte_seq)
+
+    @contextmanager
+    def _transaction(self):
+        '''
+            Collect bytes of all commands and chars in the block, send them in one
+            transfer at the end (batch_i2c only). Nested blocks join the outer one.
+        '''
+        if not self.batch_i2c or self._tx_buffer is not None:
+            yield
+            return
+
+        self._tx_buffer = bytearray()
+        try:
+            yield
+            self._flush()
+        finally:
+            self._tx_buffer = None
+
+    def _send_bytes(self, byte_seq):
+        if self._tx_buffer is not None:
+            self._tx_buffer += byte_seq
+        else:
+            self._write_block(byte_seq)
+
     def _send_data_4_bit(self, data_lcd, mode):
         self._mode = mode
-        if self._mode in [MODE_SETUP_LCD, MODE_WRITE_LCD]:
+        if self._mode in [MODE_SETUP_LCD, MODE_WRITE_LCD] and self.batch_i2c:
+            self._send_bytes(encode_4_bit(data_lcd, self._mode))
+        elif self._mode in [MODE_SETUP_LCD, MODE_WRITE_LCD]:
             self._send_data_to_reg((data_lcd & 0xF0) | self._mode) ### higer order
             self._send_data_to_reg(((data_lcd & 0x0F) << 4) | self._mode) ### lower order
         else:
             raise ValueError("mode should be between [0,1]")
 
 
+    def _set_cursor(self, line, column):
+        if self._cursor != (line, column):
+            self._send_data_4_bit(LINE_POS_CMDS[line] | column, MODE_SETUP_LCD)
+        self._cursor = (line, column)
+
+    def _write_cells(self, line, column, text):
+        self._set_cursor(line, column)
+        for c in text:
+            self._send_data_4_bit(ord(c), MODE_WRITE_LCD)
+
+        # address counter increments after every char
+        self._cursor = (line, column + len(text))
+        if self._shadow is not None:
+            self._shadow[line][column:column + len(text)] = list(text)
+
+    def _changed_runs(self, line, text):
+        '''
+            (column, text) runs of cells which differ from the shadow. Runs with one
+            unchanged cell between them are joined (rewriting the cell costs the same
+            as a cursor command).
+        '''
+        old = self._shadow[line]
+        runs = []
+        for column, c in enumerate(text):
+            if c == old[column]:
+                continue
+            if runs and column - runs[-1][1] <= 1:
+                runs[-1][1] = column + 1
+            else:
+                runs.append([column, column + 1])
+        return [(start, text[start:end]) for start, end in runs]
+
+
 ### higher methods and public
     def clear_lcd(self):
         self._send_data_4_bit(CLEAR_LCD_CMD,MODE_SETUP_LCD)
+        self._wait_long_command()
+        self._shadow = [[' '] * LCD_COLUMNS for _ in range(LCD_LINES)]
+        self._cursor = (0, 0)
 
     def return_home(self):
         self._send_data_4_bit(RETURN_HOME_CMD, MODE_SETUP_LCD) 
+        self._wait_long_command()
+        self._cursor = (0, 0)
+
+    def _wait_long_command(self):
+        # per byte writes already sleep longer than LONG_CMD_TIME after the command
+        if self.batch_i2c:
+            self._flush()
+            time.sleep(LONG_CMD_TIME)
 
     def set_display_control_default(self):
         self._send_data_4_bit(DISPLAY_CONTROL_INITIAL | SET_DISPLAY_CONTROL_NO_CURSOR | SET_DISPLAY_CONTROL_NO_CURSOR_BLINKING | SET_DISPLAY_CONTROL_ON, MODE_SETUP_LCD)
@@ -90,22 +242,79 @@ class Lcd:
         self._text = str(text)
 
         if self._line in [0,1] and len(self._text) <= 16:
-            if self._line == 0:
-                self._send_data_4_bit(SET_LCD_POS_0, MODE_SETUP_LCD)
-            
-            elif self._line == 1:
-                self._send_data_4_bit(SET_LCD_POS_1, MODE_SETUP_LCD)
-            
-            ### display text in LCD.
-            ### built-in method: ord --> convert char to unicode-8(utf)
-            for c in self._text:
-                self._send_data_4_bit(ord(c), MODE_WRITE_LCD)
+            with self._transaction():
+                if self._line == 0:
+                    self._send_data_4_bit(SET_LCD_POS_0, MODE_SETUP_LCD)
+                
+                elif self._line == 1:
+                    self._send_data_4_bit(SET_LCD_POS_1, MODE_SETUP_LCD)
+                
+                ### display text in LCD.
+                ### built-in method: ord --> convert char to unicode-8(utf)
+                for c in self._text:
+                    self._send_data_4_bit(ord(c), MODE_WRITE_LCD)
+
+            self._cursor = (self._line, len(self._text))
+            if self._shadow is not None:
+                self._shadow[self._line][:len(self._text)] = list(self._text)
 
         elif self._line not in [0,1]:
             raise ValueError('line should not exceed 1')
         elif len(self._text) > 16:
             raise ValueError("text's length exceeded 16 chars!")
 
+    def render(self, lines, force=False):
+        '''
+            Show 'lines' (first line and second line) on the display. Lines are padded
+            with spaces to 16 chars and only changed cells are written.
+
+            Args:
+                lines (list) : 2 texts, max. 16 chars each.
+                force (bool) : clear the display and write every cell (eg. the display
+                               was reset by a power glitch).
+
+            Raises:
+                ValueError : wrong number of lines or a text exceeds 16 chars.
+        '''
+        if len(lines) != LCD_LINES:
+            raise ValueError("render needs exactly 2 lines!")
+
+        texts = [str(text) for text in lines]
+        if any(len(text) > LCD_COLUMNS for text in texts):
+            raise ValueError("text's length exceeded 16 chars!")
+        texts = [text.ljust(LCD_COLUMNS) for text in texts]
+
+        if force:
+            self.clear_lcd()
+        if self._shadow is None:
+            # unknown content, overwrite every cell (blank cells too)
+            self._shadow = [[None] * LCD_COLUMNS for _ in range(LCD_LINES)]
+
+        # whole frame in one block transfer (batch_i2c)
+        with self._transaction():
+            for line, text in enumerate(texts):
+                for column, run in self._changed_runs(line, text):
+                    self._write_cells(line, column, run)
+
+    def render_compiled(self, screen):
+        '''
+            Show a compiled screen (see compile_screen()). Lines which are already on
+            the display are skipped, others are sent as precompiled bytes (batch_i2c).
+        '''
+        if self._shadow is None:
+            self._shadow = [[None] * LCD_COLUMNS for _ in range(LCD_LINES)]
+
+        with self._transaction():
+            for line, text in enumerate(screen.lines):
+                if self._shadow[line] == list(text):
+                    continue
+                if self.batch_i2c:
+                    self._send_bytes(screen.line_bytes[line])
+                    self._cursor = (line, LCD_COLUMNS)
+                    self._shadow[line] = list(text)
+                else:
+                    self._write_cells(line, 0, text)
+
     def init_lcd(self):
         '''
             Don't change the hierrachy of methods!
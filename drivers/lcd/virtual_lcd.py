@@ -0,0 +1,168 @@
+'''
+    File           : virtual_lcd.py
+    Author         : I Putu Pawesi Siantika, S.T.
+    Year           : Oct, 2026
+    Description    :
+
+    Headless LCD 16x2 with i2c pcf8574. VirtualLcdBus replaces SMBus in Lcd (lcd.py),
+    it decodes the PCF8574 bytes (nibble latched on EN falling edge, RS is bit 0) back
+    to LCD commands and chars and keeps the 2 x 16 chars on 'lines'. So LcdThread and
+    the whole app can run on a laptop or CI.
+
+    Frames are recorded with commit_frame() (LcdThread calls it after each drawn
+    message): timestamp, displayed lines, bytes sent and render time. report() gives
+    bytes per frame and render time for performance regression tests.
+
+    Usage:
+        bus = VirtualLcdBus()
+        lcd = Lcd(0x27, 0, batch_i2c=True, bus=bus)
+        start_time = time.monotonic()
+        lcd.render(['Masukan resi:', '12'])
+        bus.commit_frame(start_time)
+        print(bus.lines, bus.report())
+
+    Select it with 'backend = virtual' in [lcd] section of 'conf/config.ini'.
+
+    License: see 'licenses.txt' file in the root of project
+'''
+import threading
+import time
+from collections import namedtuple
+
+from lcd import EN_PIN, MODE_WRITE_LCD, CLEAR_LCD_CMD, RETURN_HOME_CMD, SET_LCD_POS_0, \
+    LCD_LINES, LCD_COLUMNS
+
+LINE_ADDRESSES = (0x00, 0x40) # DDRAM address of the first char of each line
+LINE_LENGTH = 0x28 # DDRAM chars per line (40), only 16 are visible
+I2C_BITS_PER_BYTE = 9 # 8 data bits + ACK
+
+LcdFrame = namedtuple('LcdFrame', ['timestamp', 'lines', 'byte_count', 'render_time'])
+
+
+class VirtualLcdBus:
+    '''
+        SMBus replacement (open, close, write_byte and i2c_rdwr) with a virtual LCD on
+        'dev_addr'. Writes to other addresses are ignored.
+
+        Args:
+            dev_addr (int)    : i2c address of pcf8574.
+            bus_clock (float) : Hz, transfers take the time of a real bus with this clock
+                                (address byte included). None = no delay.
+    '''
+    def __init__(self, dev_addr=0x27, bus_clock=None):
+        self.dev_addr = dev_addr
+        self.bus_clock = bus_clock
+        self.bus_line = None
+        self.byte_count = 0
+        self.frames = []
+        self._lock = threading.Lock()
+        self._grid = [[' '] * LCD_COLUMNS for _ in range(LCD_LINES)]
+        self._address = 0
+        self._high_nibble = None
+        self._last_value = 0
+        self._frame_byte_count = 0
+
+    @property
+    def lines(self):
+        with self._lock:
+            return [''.join(row) for row in self._grid]
+
+    ### SMBus methods used by Lcd
+    def open(self, bus):
+        self.bus_line = bus
+
+    def close(self):
+        self.bus_line = None
+
+    def write_byte(self, i2c_addr, value, force=None):
+        if i2c_addr == self.dev_addr:
+            self._feed([value])
+
+    def i2c_rdwr(self, *i2c_msgs):
+        for msg in i2c_msgs:
+            if msg.addr == self.dev_addr:
+                self._feed(list(msg))
+
+    ### pcf8574 and LCD controller
+    def _feed(self, values):
+        with self._lock:
+            for value in values:
+                # data is taken when EN goes low
+                if self._last_value & EN_PIN and not value & EN_PIN:
+                    self._latch_nibble(self._last_value)
+                self._last_value = value
+            self.byte_count += len(values)
+            self._frame_byte_count += len(values)
+
+        if self.bus_clock:
+            time.sleep((len(values) + 1) * I2C_BITS_PER_BYTE / self.bus_clock)
+
+    def _latch_nibble(self, value):
+        if self._high_nibble is None:
+            self._high_nibble = value & 0xF0
+            return
+
+        data = self._high_nibble | (value >> 4)
+        self._high_nibble = None
+        if value & MODE_WRITE_LCD:
+            self._write_char(data)
+        else:
+            self._command(data)
+
+    def _command(self, data):
+        if data & SET_LCD_POS_0:
+            self._address = data & 0x7F
+        elif data & 0xFE == RETURN_HOME_CMD: # 0000 001x
+            self._address = 0
+        elif data == CLEAR_LCD_CMD:
+            self._grid = [[' '] * LCD_COLUMNS for _ in range(LCD_LINES)]
+            self._address = 0
+        # display control and others don't change the chars
+
+    def _write_char(self, data):
+        for line, line_address in enumerate(LINE_ADDRESSES):
+            column = self._address - line_address
+            if 0 <= column < LINE_LENGTH:
+                if column < LCD_COLUMNS:
+                    self._grid[line][column] = chr(data)
+                # address counter goes from the end of a line to the next line
+                next_line = (line + 1) % LCD_LINES
+                self._address = self._address + 1 if column + 1 < LINE_LENGTH \
+                    else LINE_ADDRESSES[next_line]
+                return
+
+    ### metrics
+    def commit_frame(self, start_time):
+        '''
+            Record a frame: bytes since the previous frame and render time since
+            'start_time' (time.monotonic()).
+        '''
+        now = time.monotonic()
+        with self._lock:
+            frame = LcdFrame(now, [''.join(row) for row in self._grid],
+                             self._frame_byte_count, now - start_time)
+            self._frame_byte_count = 0
+            self.frames.append(frame)
+        return frame
+
+    def report(self):
+        '''
+            Returns:
+                dict with frames count, bytes per frame (mean and max) and render time
+                in secs (mean, p95 and max).
+        '''
+        with self._lock:
+            frames = list(self.frames)
+        if not frames:
+            return {'frames': 0}
+
+        byte_counts = [frame.byte_count for frame in frames]
+        render_times = sorted(frame.render_time for frame in frames)
+        return {
+            'frames': len(frames),
+            'bytes_per_frame': sum(byte_counts) / len(frames),
+            'max_bytes_per_frame': max(byte_counts),
+            'render_time': sum(render_times) / len(frames),
+            'render_time_p95': render_times[int(0.95 * (len(frames) - 1))],
+            'max_render_time': render_times[-1],
+        }
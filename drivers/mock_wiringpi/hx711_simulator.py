@@ -0,0 +1,255 @@
+'''
+    HX711 signal simulator for native dev (Laptop) and CI.
+
+    Hx711Simulator is a MockWiringPi which talks the HX711 serial protocol on DOUT and
+    PD_SCK pins, so the whole weight pipeline in hx711.py (bit clocking, two's complement,
+    gain bits, filters, settle detection) runs without the hardware:
+
+        1. DOUT goes LOW when a conversion is ready (per sample_rate, or as soon as the
+           host polls DOUT after the frame).
+           The falling edge calls the wiringPiISR() callback (edge ready_mode).
+           With isr_on_data_bits=True falling data bits call it too, like the real
+           DOUT pin does.
+        2. Every PD_SCK rising edge shifts one bit of the 24-bit sample out, MSB first.
+        3. 1, 2 or 3 extra pulses select gain 128, 32 or 64 for the next conversion.
+        4. PD_SCK held HIGH longer than 60 us powers HX711 down, the next LOW powers it
+           up again with gain 128 (see datasheet).
+
+    Samples come from Hx711Signal: a recorded raw trace (see load_trace()) and/or a
+    synthetic weight with gaussian noise, linear drift and step events (item drop).
+
+    Usage:
+        signal = Hx711Signal(offset=8000, reference_unit=100, noise_std=0.05, seed=1)
+        with patch.object(hx711, 'wiringpi', Hx711Simulator(dout, pd_sck, signal)):
+            sensor = Hx711(dout, pd_sck, startup_delay=0)
+            signal.add_step(250.0)  # courier drops a 250 g item
+
+    NOTE: One sample is served per frame read (conversions are not skipped when the
+          caller reads slower than sample_rate).
+    NOTE: Python can stall longer than 60 us between PD_SCK HIGH and LOW on a busy host,
+          it powers the HX711 down in the middle of a frame (the real chip does the same).
+          Use a longer power_down_time for deterministic CI runs.
+'''
+import random
+import threading
+import time
+from bisect import insort
+
+from mock_wiringpi import MockWiringPi
+
+POWER_DOWN_TIME = 0.00006 # secs, PD_SCK HIGH longer than this powers HX711 down
+DATA_BITS = 24
+GAIN_OF_PULSES = {1: 128, 2: 32, 3: 64} # extra pulses after data bits -> gain
+RAW_MAX = 0x7FFFFF
+RAW_MIN = -0x800000
+
+
+def load_trace(file_path):
+    '''
+        Load a recorded trace, one raw (signed) HX711 value per line. Empty lines and
+        lines starting with '#' are skipped.
+    '''
+    trace = []
+    with open(file_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                trace.append(int(line))
+    return trace
+
+
+class Hx711Signal:
+    '''
+        Source of raw HX711 samples (channel A, gain 128).
+
+        raw = offset + (weight + drift * index + noise) * reference_unit + trace[index]
+
+        weight, drift (per sample), noise_std and steps are in weight unit, so offset and
+        reference_unit are the values a calibrated Hx711 would get. The trace is replayed
+        in a loop. Steps are (sample index, weight change) items.
+    '''
+    def __init__(self, weight=0.0, offset=0, reference_unit=1.0, noise_std=0.0, drift=0.0,
+                 steps=None, trace=None, seed=None):
+        if trace is not None and len(trace) == 0:
+            raise ValueError("Hx711Signal::trace must not be empty!")
+        self.weight = weight
+        self.offset = offset
+        self.reference_unit = reference_unit
+        self.noise_std = noise_std
+        self.drift = drift
+        self._steps = sorted(steps or [])
+        self._trace = list(trace) if trace is not None else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.index = 0
+
+    def add_step(self, weight, at=None):
+        '''
+            Change the weight by 'weight' from sample index 'at' (default: next sample).
+        '''
+        with self._lock:
+            insort(self._steps, (self.index if at is None else at, weight))
+
+    def next_value(self):
+        with self._lock:
+            while self._steps and self._steps[0][0] <= self.index:
+                self.weight += self._steps.pop(0)[1]
+
+            weight = self.weight + self.drift * self.index
+            if self.noise_std:
+                weight += self._random.gauss(0.0, self.noise_std)
+
+            raw = self.offset + weight * self.reference_unit
+            if self._trace is not None:
+                raw += self._trace[self.index % len(self._trace)]
+
+            self.index += 1
+        return int(round(raw))
+
+
+class Hx711Simulator(MockWiringPi):
+    '''
+        MockWiringPi with a simulated HX711 on 'dout' and 'pd_sck' pins. Other pins behave
+        like MockWiringPi.
+
+        Args:
+            signal (Hx711Signal) : sample source (default: constant 0).
+            sample_rate (float)  : SPS, None means the next conversion is ready as soon
+                                   as the host polls DOUT after the previous frame (fast,
+                                   for benchmarks).
+            power_down_time (float): secs, PD_SCK HIGH time which powers HX711 down.
+            isr_on_data_bits (bool): data bits falling on DOUT call the ISR callback.
+    '''
+    def __init__(self, dout, pd_sck, signal=None, sample_rate=None,
+                 power_down_time=POWER_DOWN_TIME, isr_on_data_bits=False):
+        super().__init__()
+        self.dout = dout
+        self.pd_sck = pd_sck
+        self.signal = signal if signal is not None else Hx711Signal()
+        self.gain = 128
+        self.frames_served = 0
+        self.last_value = None
+        self.isr_on_data_bits = isr_on_data_bits
+        self.data_bit_edges = 0
+
+        self._sample_period = 1.0 / sample_rate if sample_rate else 0.0
+        self._power_down_time = power_down_time
+        self._frame = 0
+        self._pulses = 0
+        self._sck_high_at = None
+        self._is_polling = False
+        self._timer = None
+        self._ready_at = time.monotonic() + self._sample_period
+        self._pin_levels[dout] = 1
+
+    def is_powered_down(self):
+        return self._sck_high_at is not None \
+            and time.perf_counter() - self._sck_high_at > self._power_down_time
+
+    def wiringPiISR(self, pin, mode, callback):
+        result = super().wiringPiISR(pin, mode, callback)
+        if pin == self.dout and self._pulses == 0 and self._pin_levels[pin] == 1:
+            self._start_timer()
+        return result
+
+    def digitalWrite(self, pin, state):
+        if pin != self.pd_sck:
+            return super().digitalWrite(pin, state)
+
+        if state:
+            if self._sck_high_at is None:
+                self._sck_high_at = time.perf_counter()
+                self._is_polling = False
+                self._clock_pulse()
+        elif self._sck_high_at is not None:
+            if self.is_powered_down():
+                self._power_up()
+            self._sck_high_at = None
+        return pin, state
+
+    def digitalRead(self, pin):
+        if pin != self.dout:
+            return super().digitalRead(pin)
+
+        if self.is_powered_down():
+            return 1
+
+        # DOUT read twice without a clock pulse (after the bit read of the last gain
+        # pulse), the host is polling for the next conversion, so the frame is finished.
+        if self._pulses > DATA_BITS and self._is_polling:
+            self._end_frame()
+        self._is_polling = True
+
+        if self._pulses == 0 and self._pin_levels[pin] == 1 and self._timer is None \
+                and time.monotonic() >= self._ready_at:
+            self._conversion_ready()
+        return self._pin_levels[pin]
+
+    def _clock_pulse(self):
+        if self._pulses >= DATA_BITS + 3:
+            self._end_frame()
+
+        if self._pulses == 0:
+            # clock is ignored while converting (DOUT HIGH)
+            if self._pin_levels[self.dout] == 1:
+                return
+            self._frame = self._next_frame()
+
+        self._pulses += 1
+        if self._pulses <= DATA_BITS:
+            level = (self._frame >> (DATA_BITS - self._pulses)) & 0x01
+        else:
+            # DOUT goes HIGH after the 25th pulse
+            level = 1
+        if not self.isr_on_data_bits:
+            # ISR is called for conversion ready only (_conversion_ready)
+            self._pin_levels[self.dout] = level
+            return
+        if self._pin_levels[self.dout] == 1 and level == 0:
+            self.data_bit_edges += 1
+        self.set_pin_level(self.dout, level)
+
+    def _next_frame(self):
+        value = self.signal.next_value() * self.gain // 128
+        value = max(RAW_MIN, min(RAW_MAX, value))
+        self.last_value = value
+        self.frames_served += 1
+        # 24-bit two's complement
+        return value & 0xFFFFFF
+
+    def _end_frame(self):
+        self.gain = GAIN_OF_PULSES.get(self._pulses - DATA_BITS, 128)
+        self._pulses = 0
+        self._pin_levels[self.dout] = 1
+        self._schedule_conversion()
+
+    def _schedule_conversion(self):
+        self._ready_at = time.monotonic() + self._sample_period
+        if self._sample_period == 0:
+            self._conversion_ready()
+        else:
+            self._start_timer()
+
+    def _start_timer(self):
+        # edge ready_mode sleeps until the falling edge, so make it on time
+        if self.dout not in self._isr_callbacks or self._timer is not None:
+            return
+        delay = max(self._ready_at - time.monotonic(), 0.0)
+        self._timer = threading.Timer(delay, self._conversion_ready)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _conversion_ready(self):
+        self._timer = None
+        if self._pulses == 0 and not self.is_powered_down():
+            self.set_pin_level(self.dout, 0)
+
+    def _power_up(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.gain = 128
+        self._pulses = 0
+        self._pin_levels[self.dout] = 1
+        self._sck_high_at = None
+        self._schedule_conversion()
@@ -1,9 +1,25 @@
 '''
     This is a simple mock for wiringpi library using in native dev
     (Laptop)
+
+    Pin levels can be scripted with set_pin_level(). It also calls the callbacks
+    registered with wiringPiISR() (simulated edge source), so edge-driven code
+    can be tested on x86. play_pin_script() plays timed levels (eg. a bouncing
+    door contact) in a background thread.
 '''
+import threading
+import time
+
 
 class MockWiringPi:
+    INT_EDGE_SETUP = 0
+    INT_EDGE_FALLING = 1
+    INT_EDGE_RISING = 2
+    INT_EDGE_BOTH = 3
+
+    def __init__(self):
+        self._pin_levels = {}
+        self._isr_callbacks = {}
 
     def wiringPiSetup(self):
         return None
@@ -18,11 +34,47 @@ class MockWiringPi:
         '''
             return 0 = LOW || 1 = HIGH
         '''
-        return 0
+        return self._pin_levels.get(pin, 0)
     
     def pullUpDnControl(self, pin, mode):
         return pin, mode
 
+    def wiringPiISR(self, pin, mode, callback):
+        self._isr_callbacks[pin] = (mode, callback)
+        return 0
+
+    def set_pin_level(self, pin, level):
+        '''
+            Simulated edge source. Set the level read by digitalRead() and call the
+            ISR callback of the pin if the edge matches its mode.
+        '''
+        old_level = self._pin_levels.get(pin, 0)
+        self._pin_levels[pin] = level
+
+        if pin not in self._isr_callbacks or old_level == level:
+            return
+
+        mode, callback = self._isr_callbacks[pin]
+        is_falling = old_level == 1 and level == 0
+        if mode == self.INT_EDGE_BOTH \
+                or (mode == self.INT_EDGE_FALLING and is_falling) \
+                or (mode == self.INT_EDGE_RISING and not is_falling):
+            callback()
+
+    def play_pin_script(self, pin, script):
+        '''
+            Set levels from script, a list of (delay secs, level) items, in a background
+            thread. Returns the (started) thread.
+        '''
+        def play():
+            for delay, level in script:
+                time.sleep(delay)
+                self.set_pin_level(pin, level)
+
+        thread = threading.Thread(target=play, daemon=True)
+        thread.start()
+        return thread
+
 class GPIO:
     INPUT = 0
     OUTPUT = 1
@@ -30,4 +82,4 @@ class GPIO:
     HIGH = 1
     PUD_OFF = 0
     PUD_DOWN = 1
-    PUD_UP = 2
\ No newline at end of file
+    PUD_UP = 2
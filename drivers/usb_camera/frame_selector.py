@@ -0,0 +1,114 @@
+'''
+    File           : frame_selector.py
+    Author         : I Putu Pawesi Siantika, S.T.
+    Year           : Oct, 2026
+    Description    :
+
+    Sharpness score for the frames of a burst (usb_camera.py keeps the best one). A
+    single shot often catches the courier mid-motion, motion blur takes away the high
+    frequencies of the picture.
+
+    score_frame() decodes the JPEG at 1/8 scale with Pillow (libjpeg DCT scaling, only
+    the luma plane) and gives the variance of the Laplacian of that plane (Pillow's 3x3
+    kernel filters and image statistics, no pixel loop in python), weighted by the part
+    of pixels which are not clipped (too dark or burnt out). Without Pillow the score is
+    the size of the JPEG scan data: same camera and quantization tables, so a blurred
+    frame has fewer AC coefficients and a smaller scan.
+
+    Scores compare frames of the same burst only.
+
+    * Prerequisites *
+    1. Pillow python lib (see requirements.txt).
+
+    License: see 'licenses.txt' file in the root of project
+'''
+import io
+
+# imported once, a lazy import would take the time of the first burst
+try:
+    from PIL import Image, ImageFilter, ImageStat
+except ImportError:
+    Image = None
+
+LUMA_SCALE = 8 # 640x480 frame -> 80x60 luma plane
+CLIPPED_DARK = 8
+CLIPPED_BRIGHT = 247
+# 4-neighbour Laplacian (-1020 .. 1020). Kernel filters give 8 bit images, so the
+# positive and the negative part are filtered apart and divided by LAPLACIAN_SCALE,
+# strong edges are not clipped.
+LAPLACIAN_KERNEL = (0, 1, 0, 1, -4, 1, 0, 1, 0)
+LAPLACIAN_SCALE = 4
+JPEG_SOS = b'\xff\xda'
+
+if Image is not None:
+    _LAPLACIAN_POSITIVE = ImageFilter.Kernel((3, 3), LAPLACIAN_KERNEL, scale=LAPLACIAN_SCALE)
+    _LAPLACIAN_NEGATIVE = ImageFilter.Kernel(
+        (3, 3), [-weight for weight in LAPLACIAN_KERNEL], scale=LAPLACIAN_SCALE)
+
+
+def laplacian_variance(luma):
+    '''
+        Variance of the 4-neighbour Laplacian of a luma plane.
+
+        Args:
+            luma (PIL.Image.Image) : 'L' mode image, at least 3 x 3 pixels.
+    '''
+    if luma.width < 3 or luma.height < 3:
+        return 0.0
+
+    # border pixels are not filtered, they are left out
+    inner_box = (1, 1, luma.width - 1, luma.height - 1)
+    positive = ImageStat.Stat(luma.filter(_LAPLACIAN_POSITIVE).crop(inner_box))
+    negative = ImageStat.Stat(luma.filter(_LAPLACIAN_NEGATIVE).crop(inner_box))
+
+    # a pixel is in one part only, so the squares of both parts add up
+    count = positive.count[0]
+    mean = (positive.sum[0] - negative.sum[0]) / count
+    mean_square = (positive.sum2[0] + negative.sum2[0]) / count
+    return LAPLACIAN_SCALE ** 2 * (mean_square - mean * mean)
+
+
+def exposure_weight(histogram):
+    '''
+        Part of pixels which are not clipped (0.0 - 1.0).
+
+        Args:
+            histogram (list) : 256 pixel counts of a luma plane (Image.histogram()).
+    '''
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    clipped = sum(histogram[:CLIPPED_DARK + 1]) + sum(histogram[CLIPPED_BRIGHT:])
+    return 1.0 - clipped / total
+
+
+def _decode_luma(frame):
+    if Image is None:
+        return None
+
+    image = Image.open(io.BytesIO(frame))
+    image.draft('L', (image.width // LUMA_SCALE, image.height // LUMA_SCALE))
+    return image.convert('L')
+
+
+def scan_size(frame):
+    '''
+        Bytes of entropy coded data (after the SOS marker) of a JPEG.
+    '''
+    sos_index = frame.find(JPEG_SOS)
+    return len(frame) - sos_index if sos_index >= 0 else 0
+
+
+def score_frame(frame):
+    '''
+        Sharpness score of a JPEG frame, higher is sharper. 0.0 for a frame which
+        can't be decoded.
+    '''
+    try:
+        decoded = _decode_luma(frame)
+    except (OSError, ValueError):
+        return 0.0
+    if decoded is None:
+        return float(scan_size(frame))
+
+    return laplacian_variance(decoded) * exposure_weight(decoded.histogram())
@@ -0,0 +1,149 @@
+'''
+    File           : photo_pipeline.py
+    Author         : I Putu Pawesi Siantika, S.T.
+    Year           : Oct, 2026
+    Description    :
+
+    Photo stage between capture and upload. The courier's photo goes to the API server
+    and Telegram over the cellular uplink, PhotoPipeline makes one smaller JPEG for both:
+
+        1. resize to fit width x height (aspect ratio is kept, never enlarged).
+        2. encode with 'quality', lower it by QUALITY_STEP until the photo fits in
+           max_bytes (not below min_quality).
+        3. strip metadata (EXIF, XMP, comments, ...), only JFIF and Adobe segments
+           which are needed to decode the colors are kept.
+
+    Resize and encoding need Pillow, without it only metadata is stripped. The smaller
+    of the encoded and the original (stripped) photo is used, the stripped original is
+    also kept when the encoding can't be decoded or parsed.
+
+    Usage:
+        pipeline = PhotoPipeline(width=480, height=360, quality=70, max_bytes=40000)
+        result = pipeline.process(jpeg_bytes)
+        print(result.size, result.original_size - result.size)
+
+    * Prerequisites *
+    1. Pillow python lib (see requirements.txt).
+
+    License: see 'licenses.txt' file in the root of project
+'''
+import io
+from collections import namedtuple
+
+DEFAULT_QUALITY = 75
+DEFAULT_MIN_QUALITY = 40
+QUALITY_STEP = 10
+
+JPEG_SOI = b'\xff\xd8'
+MARKER_SOS = 0xDA
+MARKER_APP0 = 0xE0 # JFIF
+MARKER_APP14 = 0xEE # Adobe (color transform)
+MARKER_COM = 0xFE
+# markers without a length field
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+
+PhotoResult = namedtuple('PhotoResult', ['photo', 'original_size', 'size'])
+
+
+def strip_metadata(photo):
+    '''
+        JPEG without APPn (except JFIF and Adobe) and comment segments. Data from the
+        start of scan (SOS) is copied as it is.
+
+        Raises:
+            ValueError : photo is not a JPEG.
+    '''
+    if not photo.startswith(JPEG_SOI):
+        raise ValueError("Photo is not a JPEG")
+
+    stripped = bytearray(JPEG_SOI)
+    index = len(JPEG_SOI)
+    while index + 4 <= len(photo):
+        if photo[index] != 0xFF:
+            raise ValueError("Broken JPEG segment at %d" % index)
+        marker = photo[index + 1]
+        if marker == 0xFF: # fill byte
+            index += 1
+            continue
+        if marker in STANDALONE_MARKERS:
+            stripped += photo[index:index + 2]
+            index += 2
+            continue
+        if marker == MARKER_SOS:
+            break
+
+        end = index + 2 + int.from_bytes(photo[index + 2:index + 4], 'big')
+        is_metadata = (MARKER_APP0 < marker <= 0xEF and marker != MARKER_APP14) \
+            or marker == MARKER_COM
+        if not is_metadata:
+            stripped += photo[index:end]
+        index = end
+
+    stripped += photo[index:]
+    return bytes(stripped)
+
+
+class PhotoPipeline:
+    '''
+        Args:
+            width (int), height (int) : max. size of the uploaded photo (pixels).
+            quality (int)             : JPEG quality (1 - 95) of the first encoding.
+            max_bytes (int)           : target size, 0 = no target.
+            min_quality (int)         : quality is not lowered below it for max_bytes.
+    '''
+    def __init__(self, width=640, height=480, quality=DEFAULT_QUALITY, max_bytes=0,
+                 min_quality=DEFAULT_MIN_QUALITY):
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.min_quality = min(min_quality, quality)
+
+    def _load_image(self, photo):
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+
+        image = Image.open(io.BytesIO(photo))
+        # libjpeg decodes at a smaller scale when the target is 1/2, 1/4 .. of the size
+        image.draft('RGB', (self.width, self.height))
+        image = image.convert('RGB')
+        image.thumbnail((self.width, self.height))
+        return image
+
+    def _encode(self, image, quality):
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=quality, optimize=True)
+        return output.getvalue()
+
+    def _encode_to_target(self, image):
+        quality = self.quality
+        photo = self._encode(image, quality)
+        while self.max_bytes and len(photo) > self.max_bytes and quality > self.min_quality:
+            quality = max(quality - QUALITY_STEP, self.min_quality)
+            photo = self._encode(image, quality)
+        return photo
+
+    def process(self, photo):
+        '''
+            Returns:
+                PhotoResult: photo to upload (bytes), its size and the size of the
+                captured photo.
+
+            Raises:
+                ValueError : photo is not a JPEG.
+        '''
+        stripped = strip_metadata(photo)
+        try:
+            image = self._load_image(photo)
+        except OSError:
+            image = None
+        if image is not None:
+            try:
+                encoded = strip_metadata(self._encode_to_target(image))
+            except (OSError, ValueError):
+                encoded = stripped
+            if len(encoded) < len(stripped):
+                stripped = encoded
+        return PhotoResult(stripped, len(photo), len(stripped))
@@ -1,5 +1,7 @@
 import subprocess
+import sys
 import os
+import time
 
 '''
     Author         : I Putu Pawesi Siantika, S.T.
@@ -12,6 +14,18 @@ import os
     
     Tested on orange pi (armbian jammy 22-11.4) and amd (ubuntu 20.04 , arch linux).
 
+    capture_backend 'v4l2' keeps the camera open and streaming (v4l2_capture.py), a photo
+    is grabbed in milliseconds instead of a fswebcam run per photo (open device, set
+    format and warm up auto exposure). It falls back to fswebcam if the device can't
+    stream or doesn't give a frame.
+
+    capture_bytes() gives the JPEG in memory (no file on SD card), save_photo() writes
+    it when a copy on disk is wanted (eg. audit).
+
+    With burst_frames > 1 the v4l2 backend grabs a short burst from the stream and keeps
+    the sharpest frame (frame_selector.py), the burst ends after burst_time_budget secs
+    whatever the number of frames. fswebcam takes a single shot.
+
     * Prerequisites *
     1. Install ffmpeg package for linux --> " sudo apt install ffmpeg -y " in CLI.
     2. Download or put this library in your working directory project.
@@ -25,21 +39,45 @@ import os
 '''
 
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(os.path.join(parent_dir, 'drivers/usb_camera'))
+from v4l2_capture import V4l2Capture
+from frame_selector import score_frame
+
+CAPTURE_BACKEND_FSWEBCAM = 'fswebcam'
+CAPTURE_BACKEND_V4L2 = 'v4l2'
+PHOTO_NAME_FORMAT = '%Y-%m-%d_%H-%M-%S.jpg'
+DEFAULT_BURST_TIME_BUDGET = 0.3 # secs
 
 class UsbCamera:
-    def __init__(self, dir_hw_addr):
+    def __init__(self, dir_hw_addr, capture_backend=CAPTURE_BACKEND_FSWEBCAM,
+                 burst_frames=1, burst_time_budget=DEFAULT_BURST_TIME_BUDGET):
         '''
             desc    : initialize variable stored hardware's address for USB camera
             params  : dir_hw_addr (str) --> the address of usb cam (eg. /dev/video0)
+                      capture_backend (str) --> 'fswebcam' or 'v4l2'
+                      burst_frames (int) --> frames scored per photo (v4l2 backend)
+                      burst_time_budget (float) --> secs, max time of a burst
             ret     : -
         '''
         self.hw_addr = str(dir_hw_addr)   
+        if capture_backend not in [CAPTURE_BACKEND_FSWEBCAM, CAPTURE_BACKEND_V4L2]:
+            raise ValueError("Unrecognised capture backend: \"%s\"" % capture_backend)
+        self.capture_backend = capture_backend
+        self._capture_engine = None
+        self.last_photo_name = None
+        self.burst_frames = max(1, int(burst_frames))
+        self.burst_time_budget = burst_time_budget
+        self.last_burst_scores = []
    
     def _get_hw_addr(self):
         return self.hw_addr
     
     def _get_cmd_capture_photo(self):
         return ['fswebcam', '-d', str(self.hw_addr), '-r', '640x480', '--save', str(self.get_dir_saved_photo())+('%Y-%m-%d_%H-%M-%S.jpg')]
+
+    def _get_cmd_capture_bytes(self):
+        # '-' writes the JPEG to stdout
+        return ['fswebcam', '-q', '-d', str(self.hw_addr), '-r', '640x480', '--save', '-']
     
 
     def set_dir_saved_photo(self, dir_saved_photo):
@@ -49,12 +87,103 @@ class UsbCamera:
         return self._dir_saved_photo
 
 
+    def open(self):
+        '''
+            desc    : Start the v4l2 capture engine (device stays open and auto exposure
+                      is warmed up). Nothing for fswebcam backend.
+            params  : -
+            ret     : -
+            raises  : OSError, TimeoutError --> camera can't stream.
+        '''
+        if self.capture_backend != CAPTURE_BACKEND_V4L2:
+            return
+        if self._capture_engine is None:
+            self._capture_engine = V4l2Capture(self.hw_addr)
+        self._capture_engine.open()
+
+    def close(self):
+        if self._capture_engine is not None:
+            self._capture_engine.close()
+
+    def _grab_sharpest_frame(self):
+        # First frame is fresh, the next ones are taken as the stream gives them. The
+        # time budget starts after the first frame is scored, the burst stops when the
+        # next frame (grab and score) wouldn't be done within it.
+        best_frame = self._capture_engine.grab_frame()
+        self.last_burst_scores = []
+        if self.burst_frames == 1:
+            return best_frame
+
+        best_score = score_frame(best_frame)
+        self.last_burst_scores.append(best_score)
+        start_time = time.monotonic()
+        deadline = start_time + self.burst_time_budget
+        frame_time = 0.0
+        while len(self.last_burst_scores) < self.burst_frames:
+            now = time.monotonic()
+            if now + frame_time > deadline:
+                break
+            try:
+                frame = self._capture_engine.grab_frame(deadline - now, skip_stale=False)
+            except TimeoutError:
+                break
+            score = score_frame(frame)
+            self.last_burst_scores.append(score)
+            if score > best_score:
+                best_frame, best_score = frame, score
+            frame_time = (time.monotonic() - start_time) / (len(self.last_burst_scores) - 1)
+        return best_frame
+
+    def capture_bytes(self):
+        '''
+            desc    : Capturing a photo in memory (nothing is written to disk). Its file name
+                      (date time) is in last_photo_name.
+            params  : -
+            ret     : photo (bytes) --> JPEG, None if camera failed.
+        '''
+        self.last_photo_name = time.strftime(PHOTO_NAME_FORMAT)
+        if self.capture_backend == CAPTURE_BACKEND_V4L2:
+            try:
+                self.open()
+                return self._grab_sharpest_frame()
+            except (OSError, TimeoutError):
+                self.close()
+
+        _ret_code = subprocess.run(self._get_cmd_capture_bytes(), capture_output=True)
+        if _ret_code.returncode != 0 or len(_ret_code.stdout) == 0:
+            return None
+        return _ret_code.stdout
+
+    def save_photo(self, photo, file_name):
+        '''
+            desc    : Writing a photo (from capture_bytes) to the choosed directory.
+            params  : photo (bytes) --> JPEG, file_name (str) --> eg. 'foto1.jpg'
+            ret     : -
+        '''
+        with open(str(self.get_dir_saved_photo()) + str(file_name), 'wb') as photo_file:
+            photo_file.write(photo)
+
     def capture_photo(self):
         '''
             desc    : Capturing photos and save it to a choosed directory. Resolution of pict is 640x480. Photos name = date time.
             params  : -
             ret     : return_code (int)--> [failed: 0, succeed: 1 ]
         '''
+        if self.capture_backend == CAPTURE_BACKEND_V4L2:
+            try:
+                self.open()
+                photo = self._grab_sharpest_frame()
+            except (OSError, TimeoutError):
+                # release the device for fswebcam
+                self.close()
+            else:
+                # a disk error is not a camera error, the engine stays open
+                try:
+                    self.save_photo(photo, time.strftime(PHOTO_NAME_FORMAT))
+                except OSError:
+                    return 1
+                return 0
+
         _ret_code = subprocess.run(self._get_cmd_capture_photo())
         return _ret_code.returncode
     
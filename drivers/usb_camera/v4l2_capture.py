@@ -0,0 +1,352 @@
+'''
+    File           : v4l2_capture.py
+    Author         : I Putu Pawesi Siantika, S.T.
+    Year           : Oct, 2026
+    Description    :
+
+    Long-lived V4L2 capture for the usb camera. fswebcam opens the device, sets the
+    format and warms up auto exposure for every photo (seconds). V4l2Capture opens the
+    device once, streams MJPEG frames into mmap'd driver buffers and grab_frame() gives
+    a fresh frame in one frame period (~33 ms at 30 fps).
+
+    MJPEG frames are JPEG files already (no encoding), usb cameras often leave out the
+    Huffman tables (DHT), the standard tables are inserted then (see add_huffman_tables()).
+
+    Only python standard lib (ioctl with ctypes structures of linux/videodev2.h).
+
+    Usage:
+        capture = V4l2Capture('/dev/video0')
+        capture.open()
+        jpeg_bytes = capture.grab_frame()
+        capture.close()
+
+    Linux only.
+
+    License: see 'licenses.txt' file in the root of project
+'''
+import ctypes
+import errno
+import fcntl
+import mmap
+import os
+import select
+import threading
+
+DEFAULT_WIDTH = 640
+DEFAULT_HEIGHT = 480
+DEFAULT_BUFFER_COUNT = 4
+DEFAULT_WARMUP_FRAMES = 5 # auto exposure settles on these frames at open()
+GRAB_TIMEOUT = 2.0 # secs
+
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_MEMORY_MMAP = 1
+V4L2_FIELD_ANY = 0
+
+
+def fourcc(code):
+    return ord(code[0]) | (ord(code[1]) << 8) | (ord(code[2]) << 16) | (ord(code[3]) << 24)
+
+
+V4L2_PIX_FMT_MJPEG = fourcc('MJPG')
+
+
+### linux/videodev2.h structures
+class V4l2PixFormat(ctypes.Structure):
+    _fields_ = [
+        ('width', ctypes.c_uint32),
+        ('height', ctypes.c_uint32),
+        ('pixelformat', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('bytesperline', ctypes.c_uint32),
+        ('sizeimage', ctypes.c_uint32),
+        ('colorspace', ctypes.c_uint32),
+        ('priv', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('ycbcr_enc', ctypes.c_uint32),
+        ('quantization', ctypes.c_uint32),
+        ('xfer_func', ctypes.c_uint32),
+    ]
+
+
+class V4l2FormatUnion(ctypes.Union):
+    # v4l2_window has pointers, it aligns the union like a pointer
+    _fields_ = [
+        ('pix', V4l2PixFormat),
+        ('raw_data', ctypes.c_uint8 * 200),
+        ('_align', ctypes.c_void_p),
+    ]
+
+
+class V4l2Format(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('fmt', V4l2FormatUnion),
+    ]
+
+
+class V4l2RequestBuffers(ctypes.Structure):
+    _fields_ = [
+        ('count', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('reserved', ctypes.c_uint32 * 2),
+    ]
+
+
+class Timeval(ctypes.Structure):
+    _fields_ = [
+        ('tv_sec', ctypes.c_long),
+        ('tv_usec', ctypes.c_long),
+    ]
+
+
+class V4l2Timecode(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('frames', ctypes.c_uint8),
+        ('seconds', ctypes.c_uint8),
+        ('minutes', ctypes.c_uint8),
+        ('hours', ctypes.c_uint8),
+        ('userbits', ctypes.c_uint8 * 4),
+    ]
+
+
+class V4l2BufferM(ctypes.Union):
+    _fields_ = [
+        ('offset', ctypes.c_uint32),
+        ('userptr', ctypes.c_ulong),
+        ('planes', ctypes.c_void_p),
+        ('fd', ctypes.c_int32),
+    ]
+
+
+class V4l2Buffer(ctypes.Structure):
+    _fields_ = [
+        ('index', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('bytesused', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('timestamp', Timeval),
+        ('timecode', V4l2Timecode),
+        ('sequence', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('m', V4l2BufferM),
+        ('length', ctypes.c_uint32),
+        ('reserved2', ctypes.c_uint32),
+        ('request_fd', ctypes.c_int32),
+    ]
+
+
+def _ioc(direction, number, size):
+    return (direction << 30) | (size << 16) | (ord('V') << 8) | number
+
+
+def _iow(number, struct_type):
+    return _ioc(1, number, ctypes.sizeof(struct_type))
+
+
+def _iowr(number, struct_type):
+    return _ioc(3, number, ctypes.sizeof(struct_type))
+
+
+VIDIOC_S_FMT = _iowr(5, V4l2Format)
+VIDIOC_REQBUFS = _iowr(8, V4l2RequestBuffers)
+VIDIOC_QUERYBUF = _iowr(9, V4l2Buffer)
+VIDIOC_QBUF = _iowr(15, V4l2Buffer)
+VIDIOC_DQBUF = _iowr(17, V4l2Buffer)
+VIDIOC_STREAMON = _iow(18, ctypes.c_int)
+VIDIOC_STREAMOFF = _iow(19, ctypes.c_int)
+
+
+### standard Huffman tables (JPEG spec. Annex K.3): (class and id, bits, values)
+_HUFFMAN_TABLES = [
+    (0x00, [0, 1, 5, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0], list(range(12))),
+    (0x10, [0, 2, 1, 3, 3, 2, 4, 3, 5, 5, 4, 4, 0, 0, 1, 0x7d], [
+        0x01, 0x02, 0x03, 0x00, 0x04, 0x11, 0x05, 0x12, 0x21, 0x31, 0x41, 0x06, 0x13, 0x51,
+        0x61, 0x07, 0x22, 0x71, 0x14, 0x32, 0x81, 0x91, 0xa1, 0x08, 0x23, 0x42, 0xb1, 0xc1,
+        0x15, 0x52, 0xd1, 0xf0, 0x24, 0x33, 0x62, 0x72, 0x82, 0x09, 0x0a, 0x16, 0x17, 0x18,
+        0x19, 0x1a, 0x25, 0x26, 0x27, 0x28, 0x29, 0x2a, 0x34, 0x35, 0x36, 0x37, 0x38, 0x39,
+        0x3a, 0x43, 0x44, 0x45, 0x46, 0x47, 0x48, 0x49, 0x4a, 0x53, 0x54, 0x55, 0x56, 0x57,
+        0x58, 0x59, 0x5a, 0x63, 0x64, 0x65, 0x66, 0x67, 0x68, 0x69, 0x6a, 0x73, 0x74, 0x75,
+        0x76, 0x77, 0x78, 0x79, 0x7a, 0x83, 0x84, 0x85, 0x86, 0x87, 0x88, 0x89, 0x8a, 0x92,
+        0x93, 0x94, 0x95, 0x96, 0x97, 0x98, 0x99, 0x9a, 0xa2, 0xa3, 0xa4, 0xa5, 0xa6, 0xa7,
+        0xa8, 0xa9, 0xaa, 0xb2, 0xb3, 0xb4, 0xb5, 0xb6, 0xb7, 0xb8, 0xb9, 0xba, 0xc2, 0xc3,
+        0xc4, 0xc5, 0xc6, 0xc7, 0xc8, 0xc9, 0xca, 0xd2, 0xd3, 0xd4, 0xd5, 0xd6, 0xd7, 0xd8,
+        0xd9, 0xda, 0xe1, 0xe2, 0xe3, 0xe4, 0xe5, 0xe6, 0xe7, 0xe8, 0xe9, 0xea, 0xf1, 0xf2,
+        0xf3, 0xf4, 0xf5, 0xf6, 0xf7, 0xf8, 0xf9, 0xfa]),
+    (0x01, [0, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0], list(range(12))),
+    (0x11, [0, 2, 1, 2, 4, 4, 3, 4, 7, 5, 4, 4, 0, 1, 2, 0x77], [
+        0x00, 0x01, 0x02, 0x03, 0x11, 0x04, 0x05, 0x21, 0x31, 0x06, 0x12, 0x41, 0x51, 0x07,
+        0x61, 0x71, 0x13, 0x22, 0x32, 0x81, 0x08, 0x14, 0x42, 0x91, 0xa1, 0xb1, 0xc1, 0x09,
+        0x23, 0x33, 0x52, 0xf0, 0x15, 0x62, 0x72, 0xd1, 0x0a, 0x16, 0x24, 0x34, 0xe1, 0x25,
+        0xf1, 0x17, 0x18, 0x19, 0x1a, 0x26, 0x27, 0x28, 0x29, 0x2a, 0x35, 0x36, 0x37, 0x38,
+        0x39, 0x3a, 0x43, 0x44, 0x45, 0x46, 0x47, 0x48, 0x49, 0x4a, 0x53, 0x54, 0x55, 0x56,
+        0x57, 0x58, 0x59, 0x5a, 0x63, 0x64, 0x65, 0x66, 0x67, 0x68, 0x69, 0x6a, 0x73, 0x74,
+        0x75, 0x76, 0x77, 0x78, 0x79, 0x7a, 0x82, 0x83, 0x84, 0x85, 0x86, 0x87, 0x88, 0x89,
+        0x8a, 0x92, 0x93, 0x94, 0x95, 0x96, 0x97, 0x98, 0x99, 0x9a, 0xa2, 0xa3, 0xa4, 0xa5,
+        0xa6, 0xa7, 0xa8, 0xa9, 0xaa, 0xb2, 0xb3, 0xb4, 0xb5, 0xb6, 0xb7, 0xb8, 0xb9, 0xba,
+        0xc2, 0xc3, 0xc4, 0xc5, 0xc6, 0xc7, 0xc8, 0xc9, 0xca, 0xd2, 0xd3, 0xd4, 0xd5, 0xd6,
+        0xd7, 0xd8, 0xd9, 0xda, 0xe2, 0xe3, 0xe4, 0xe5, 0xe6, 0xe7, 0xe8, 0xe9, 0xea, 0xf2,
+        0xf3, 0xf4, 0xf5, 0xf6, 0xf7, 0xf8, 0xf9, 0xfa]),
+]
+
+
+def _build_dht_segment():
+    payload = b''.join(bytes([table_id] + bits + values)
+                       for table_id, bits, values in _HUFFMAN_TABLES)
+    return b'\xff\xc4' + (len(payload) + 2).to_bytes(2, 'big') + payload
+
+
+DHT_SEGMENT = _build_dht_segment()
+JPEG_SOS = b'\xff\xda'
+JPEG_DHT = b'\xff\xc4'
+
+
+def add_huffman_tables(frame):
+    '''
+        Insert the standard DHT segment before the scan (SOS) of a MJPEG frame without
+        Huffman tables. Other frames are returned as they are.
+    '''
+    scan_start = frame.find(JPEG_SOS)
+    if scan_start < 0 or frame.find(JPEG_DHT, 0, scan_start) >= 0:
+        return frame
+    return frame[:scan_start] + DHT_SEGMENT + frame[scan_start:]
+
+
+class V4l2Capture:
+    '''
+        Args:
+            device (str)        : video device (eg. /dev/video0).
+            width, height (int) : resolution, the driver can choose the nearest one.
+            buffer_count (int)  : mmap'd driver buffers.
+            warmup_frames (int) : frames thrown away at open() (auto exposure).
+
+        Raises (open, grab_frame):
+            OSError      : device can't be opened or doesn't support MJPEG streaming.
+            TimeoutError : no frame in timeout.
+    '''
+    def __init__(self, device, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                 buffer_count=DEFAULT_BUFFER_COUNT, warmup_frames=DEFAULT_WARMUP_FRAMES):
+        self.device = str(device)
+        self.width = width
+        self.height = height
+        self._buffer_count = buffer_count
+        self._warmup_frames = warmup_frames
+        self._fd = None
+        self._buffers = []
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        return self._fd is not None
+
+    def open(self):
+        with self._lock:
+            if self._fd is not None:
+                return
+            self._fd = os.open(self.device, os.O_RDWR | os.O_NONBLOCK)
+            try:
+                self._set_format()
+                self._map_buffers()
+                fcntl.ioctl(self._fd, VIDIOC_STREAMON,
+                            ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+            except OSError:
+                self._release()
+                raise
+
+        for _ in range(self._warmup_frames):
+            self.grab_frame()
+
+    def _set_format(self):
+        v4l2_format = V4l2Format()
+        v4l2_format.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        v4l2_format.fmt.pix.width = self.width
+        v4l2_format.fmt.pix.height = self.height
+        v4l2_format.fmt.pix.pixelformat = V4L2_PIX_FMT_MJPEG
+        v4l2_format.fmt.pix.field = V4L2_FIELD_ANY
+        fcntl.ioctl(self._fd, VIDIOC_S_FMT, v4l2_format)
+
+        if v4l2_format.fmt.pix.pixelformat != V4L2_PIX_FMT_MJPEG:
+            raise OSError(errno.EINVAL, "MJPEG is not supported by " + self.device)
+        # driver writes the resolution it chose
+        self.width = v4l2_format.fmt.pix.width
+        self.height = v4l2_format.fmt.pix.height
+
+    def _map_buffers(self):
+        request = V4l2RequestBuffers()
+        request.count = self._buffer_count
+        request.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        request.memory = V4L2_MEMORY_MMAP
+        fcntl.ioctl(self._fd, VIDIOC_REQBUFS, request)
+
+        for index in range(request.count):
+            buffer = self._new_buffer(index)
+            fcntl.ioctl(self._fd, VIDIOC_QUERYBUF, buffer)
+            self._buffers.append(mmap.mmap(self._fd, buffer.length, mmap.MAP_SHARED,
+                                           mmap.PROT_READ | mmap.PROT_WRITE,
+                                           offset=buffer.m.offset))
+            fcntl.ioctl(self._fd, VIDIOC_QBUF, buffer)
+
+    def _new_buffer(self, index=0):
+        buffer = V4l2Buffer()
+        buffer.index = index
+        buffer.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        buffer.memory = V4L2_MEMORY_MMAP
+        return buffer
+
+    def _dequeue(self):
+        '''
+            Returns a filled buffer (V4l2Buffer) or None if no buffer is ready.
+        '''
+        buffer = self._new_buffer()
+        try:
+            fcntl.ioctl(self._fd, VIDIOC_DQBUF, buffer)
+        except OSError as error:
+            if error.errno == errno.EAGAIN:
+                return None
+            raise
+        return buffer
+
+    def grab_frame(self, timeout=GRAB_TIMEOUT, skip_stale=True):
+        '''
+            Wait for the next frame and return it (JPEG bytes). Frames which were
+            captured before the call are stale (buffers filled while nobody was
+            reading), they are queued again. With skip_stale=False the oldest frame
+            which is ready is returned (next frames of a burst).
+        '''
+        with self._lock:
+            if self._fd is None:
+                raise OSError(errno.EBADF, self.device + " is not open")
+
+            buffer = self._dequeue()
+            while skip_stale and buffer is not None:
+                fcntl.ioctl(self._fd, VIDIOC_QBUF, buffer)
+                buffer = self._dequeue()
+
+            while buffer is None:
+                readable, _, _ = select.select([self._fd], [], [], timeout)
+                if not readable:
+                    raise TimeoutError("No frame from " + self.device)
+                buffer = self._dequeue()
+
+            frame = self._buffers[buffer.index][:buffer.bytesused]
+            fcntl.ioctl(self._fd, VIDIOC_QBUF, buffer)
+        return add_huffman_tables(frame)
+
+    def _release(self):
+        for buffer in self._buffers:
+            buffer.close()
+        self._buffers = []
+        os.close(self._fd)
+        self._fd = None
+
+    def close(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            try:
+                fcntl.ioctl(self._fd, VIDIOC_STREAMOFF,
+                            ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+            finally:
+                self._release()
@@ -1,4 +1,6 @@
+import queue
 import sys
+import time
 import threading
 import configparser
 import multiprocessing as mp
@@ -7,8 +9,11 @@ from unittest.mock import Mock, call, patch
 
 sys.path.append('applications/lcd_thread')
 sys.path.append('drivers/lcd')
+sys.path.append('utils')
 from lcd_thread import LcdThread
-from lcd import Lcd
+from lcd import Lcd, compile_screen
+from virtual_lcd import VirtualLcdBus
+from media_data import LcdData
 
 
 class TestInitMethod:
@@ -248,3 +253,161 @@ class TestDriverClass:
         self.stop_all_patch()
 
 
+
+
+class TestFrameCoalescing:
+    def set_up(self):
+        global lcd_t
+        self.mock_lcd_init       = patch('lcd.Lcd.__init__').start()
+        self.mock_lcd_init_lcd   = patch('lcd.Lcd.init_lcd').start()
+        self.mock_lcd_write_text = patch('lcd.Lcd.write_text').start()
+        self.mock_lcd_render     = patch('lcd.Lcd.render').start()
+        self.mock_lcd_init.return_value = None
+        lcd_t = LcdThread()
+        lcd_t.set_queue_data(queue.Queue(10))
+
+    def tear_down(self):
+        patch.stopall()
+
+    def help_frame(self, second_line, hold=None):
+        frame = {'cmd': 'keypad', 'payload': ['Masukan resi:', second_line]}
+        if hold is not None:
+            frame['hold'] = hold
+        return frame
+
+
+    def test_print_data_should_draw_only_latest_frame(self):
+        self.set_up()
+        for keys in ['1', '12', '123', '1234']:
+            lcd_t.queue_data_read.put(self.help_frame(keys))
+
+        lcd_t.print_data()
+
+        self.mock_lcd_render.assert_called_once_with(['Masukan resi:', '1234'])
+        assert lcd_t.queue_data_read.empty()
+        self.tear_down()
+
+
+    def test_print_data_should_keep_timed_frame_for_its_hold_time(self):
+        self.set_up()
+        hold = 0.1
+        lcd_t.queue_data_read.put(self.help_frame('12'))
+        lcd_t.queue_data_read.put(self.help_frame('FAILED', hold))
+        lcd_t.queue_data_read.put(self.help_frame('1'))
+
+        lcd_t.print_data()
+        start_time = time.monotonic()
+        lcd_t.queue_data_read.put(self.help_frame('12'))
+        lcd_t.print_data()
+        hold_time = time.monotonic() - start_time
+
+        # '12' before the timed frame is stale, '1' is coalesced with the newer '12'
+        self.mock_lcd_render.assert_has_calls([
+            call(['Masukan resi:', 'FAILED']),
+            call(['Masukan resi:', '12']),
+        ])
+        assert self.mock_lcd_render.call_count == 2
+        assert hold_time >= hold * 0.9
+        self.tear_down()
+
+
+    def test_print_data_should_draw_latest_timed_frame(self):
+        self.set_up()
+        lcd_t.queue_data_read.put(self.help_frame('1'))
+        lcd_t.queue_data_read.put(self.help_frame('TIMEOUT', 0.01))
+        lcd_t.queue_data_read.put(self.help_frame('FAILED', 0.01))
+
+        lcd_t.print_data()
+
+        self.mock_lcd_render.assert_called_once_with(['Masukan resi:', 'FAILED'])
+        assert lcd_t._pending_frames == []
+        self.tear_down()
+
+
+class TestStaticScreens:
+    def set_up(self):
+        global lcd_t
+        self.mock_lcd_init            = patch('lcd.Lcd.__init__').start()
+        self.mock_lcd_init_lcd        = patch('lcd.Lcd.init_lcd').start()
+        self.mock_lcd_write_text      = patch('lcd.Lcd.write_text').start()
+        self.mock_lcd_render          = patch('lcd.Lcd.render').start()
+        self.mock_lcd_render_compiled = patch('lcd.Lcd.render_compiled').start()
+        self.mock_lcd_init.return_value = None
+        lcd_t = LcdThread()
+        lcd_t.set_queue_data(queue.Queue(10))
+
+    def tear_down(self):
+        patch.stopall()
+
+
+    def test_init_should_compile_every_static_screen(self):
+        self.set_up()
+        assert set(lcd_t._compiled_screens) == set(LcdData.SCREENS)
+        assert lcd_t._compiled_screens[LcdData.ST_MSG] == \
+            compile_screen(LcdData.SCREENS[LcdData.ST_MSG]['payload'])
+        self.tear_down()
+
+
+    def test_print_data_should_draw_compiled_screen_of_id(self):
+        self.set_up()
+        lcd_t.queue_data_read.put(LcdData.RESI_FAILED)
+
+        lcd_t.print_data()
+
+        self.mock_lcd_render_compiled.assert_called_once_with(
+            lcd_t._compiled_screens[LcdData.RESI_FAILED])
+        self.mock_lcd_render.assert_not_called()
+        # timed screen (hold) from LcdData.SCREENS
+        assert lcd_t._hold_until > time.monotonic() + 1.0
+        self.tear_down()
+
+
+    def test_print_data_should_raise_error_for_unknown_id(self):
+        self.set_up()
+        lcd_t.queue_data_read.put('no_such_screen')
+
+        with pytest.raises(ValueError):
+            lcd_t.print_data()
+        self.tear_down()
+
+
+class TestHeadlessLcd:
+    '''
+        Whole LcdThread with VirtualLcdBus (backend = virtual), only config is patched.
+    '''
+    def set_up(self):
+        global lcd_t
+        patch.object(LcdThread, '_create_virtual_lcd',
+                     return_value=VirtualLcdBus(0x27)).start()
+        patch('time.sleep').start()
+        lcd_t = LcdThread()
+        patch.stopall()
+        lcd_t.set_queue_data(queue.Queue(10))
+
+
+    def test_lcd_thread_should_run_headless(self):
+        self.set_up()
+        assert lcd_t.virtual_lcd.lines[0] == '*Smart Drop Box*'
+
+        lcd_t.queue_data_read.put(LcdData.FISRT_INPUT_KEYPAD)
+        lcd_t.print_data()
+        lcd_t.queue_data_read.put({'cmd': 'keypad', 'payload': ['Masukan resi:', '1']})
+        lcd_t.print_data()
+
+        assert lcd_t.virtual_lcd.lines == ['Masukan resi:   ', '1               ']
+        assert lcd_t.virtual_lcd.report()['frames'] == 3 # with welcome display
+
+
+    def test_benchmark_keypad_entry_frames(self):
+        self.set_up()
+        lcd_t.virtual_lcd.bus_clock = 100000
+        lcd_t.queue_data_read.put(LcdData.FISRT_INPUT_KEYPAD)
+        lcd_t.print_data()
+        for keys in ['1', '12', '123', '1234']:
+            lcd_t.queue_data_read.put({'cmd': 'keypad', 'payload': ['Masukan resi:', keys]})
+            lcd_t.print_data()
+
+        keystrokes = lcd_t.virtual_lcd.frames[-4:]
+        print("\nLCD keystroke frames: " + ", ".join(
+            f"{frame.byte_count} B {frame.render_time * 1000:.2f} ms" for frame in keystrokes))
+        assert all(frame.byte_count <= 12 for frame in keystrokes)
@@ -1,13 +1,19 @@
 import queue
 import sys
 import threading
+import time
 import pytest
 import multiprocessing as mp
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 sys.path.append('applications/operation_thread')
 sys.path.append('applications/network_thread')
+sys.path.append('drivers/keypad')
+import operation_thread
 from operation_thread import ThreadOperation
 from network_thread import NetworkThread
+from peripheral_operations import PeripheralOperations
+from keypad import Keypad
+from keypad_emulator import KeypadEmulator
 
 
 class TestThreadOperation:
@@ -153,4 +159,175 @@ class TestConfig:
         with patch.object(ThreadOperation, '__init__') as mock_init: 
             mock_init.return_value = None 
             opt_t = ThreadOperation()
-            opt_t.check_universal_password("ABC*")
\ No newline at end of file
+            opt_t.check_universal_password("ABC*")
+
+
+
+class TestKeypadLatencyBenchmark:
+    '''
+        Key-to-validation latency through keypad_routine with the pty keypad emulator.
+        Loop load is simulated by CPU-bound threads (GIL contention).
+    '''
+    def set_up(self):
+        global opt_t, emulator
+        emulator = KeypadEmulator()
+        with patch.object(ThreadOperation, '__init__') as mock_init:
+            mock_init.return_value = None
+            opt_t = ThreadOperation()
+
+        opt_t.queue_data_to_lcd = queue.Queue()
+        opt_t.keypad_buffer = ''
+        opt_t.initial_data = {'1234': 0}
+        opt_t.keypad_session_ok = False
+        opt_t.taking_item_ok = False
+        opt_t.st_msg_has_not_displayed = False
+        opt_t.lock = threading.Lock()
+        opt_t.periph = PeripheralOperations()
+        opt_t.periph.keypad = Keypad(emulator.port)
+        opt_t.periph.init_keypad_reader()
+
+    def tear_down(self):
+        opt_t.periph.keypad_reader.stop()
+        opt_t.periph.keypad.ser.close()
+        emulator.close()
+
+    def help_start_load(self, threads, stop_event):
+        def burn_cpu():
+            while not stop_event.is_set():
+                sum(range(1000))
+
+        for _ in range(threads):
+            threading.Thread(target=burn_cpu, daemon=True).start()
+
+
+    def test_benchmark_key_to_validation_latency(self):
+        self.set_up()
+        results = {}
+
+        for load in [0, 2]:
+            stop_load = threading.Event()
+            self.help_start_load(load, stop_load)
+            opt_t.keypad_buffer = ''
+            opt_t.keypad_session_ok = False
+
+            emulator.play([(0.05, '1'), (0.02, '2'), (0.02, '3'), (0.02, '4')])
+            opt_t.keypad_routine('BCA*')
+            results[load] = time.monotonic() - emulator.sent_times[-1]
+            stop_load.set()
+
+            assert opt_t.keypad_session_ok is True
+            assert opt_t.keypad_buffer == '1234'
+
+        print("\nKey to validation: " + ", ".join(
+            f"{load} load threads {latency * 1000:.1f} ms" for load, latency in results.items()))
+        assert all(latency < 1.0 for latency in results.values())
+        self.tear_down()
+
+
+
+class TestDoorSessionPhotoPrompts:
+    '''
+        Photo capture runs concurrently with voice prompts. Sound and camera are mocked,
+        every call is recorded with its time.
+    '''
+    prompt_time = 0.4
+
+    def set_up(self):
+        global opt_t, timeline
+        timeline = []
+        with patch.object(ThreadOperation, '__init__') as mock_init:
+            mock_init.return_value = None
+            opt_t = ThreadOperation()
+
+        opt_t.queue_data_to_lcd = queue.Queue()
+        opt_t.keypad_buffer = '1234'
+        opt_t.latest_weight = 0.0
+        opt_t.item_is_stored = False
+        opt_t.lock = threading.Lock()
+        opt_t.periph = Mock()
+        opt_t.periph.play_sound.side_effect = self.help_play_sound
+        opt_t.periph.capture_bytes.side_effect = \
+            lambda: timeline.append(('capture', time.monotonic())) or b'\xff\xd8jpeg'
+        opt_t.periph.unlock_door.side_effect = \
+            lambda: timeline.append(('unlock', time.monotonic()))
+        opt_t.periph.sense_door.return_value = 1
+        opt_t.periph.wait_weight_settled.return_value = (250.0, 250.0)
+        patch.object(operation_thread, 'POSE_PROMPT_PAUSE', 0.05).start()
+
+    def tear_down(self):
+        patch.stopall()
+
+    def help_play_sound(self, file_name):
+        timeline.append((file_name + ' start', time.monotonic()))
+        time.sleep(self.prompt_time)
+        timeline.append((file_name + ' end', time.monotonic()))
+
+    def help_time_of(self, event):
+        return dict(timeline)[event]
+
+
+    def test_door_session_should_capture_during_taking_picture_prompt(self):
+        self.set_up()
+        start_time = time.monotonic()
+        opt_t.door_session()
+
+        taking_picture_start = self.help_time_of('ambil_foto.wav start')
+        capture = self.help_time_of('capture')
+        unlock = self.help_time_of('unlock')
+
+        assert taking_picture_start <= capture <= \
+            taking_picture_start + operation_thread.SHUTTER_DELAY + 0.1
+        assert capture <= unlock < self.help_time_of('ambil_foto.wav end')
+        # one sound at a time
+        assert self.help_time_of('taruh_paket.wav start') >= self.help_time_of('ambil_foto.wav end')
+        assert opt_t.photo == b'\xff\xd8jpeg'
+        assert opt_t.item_is_stored is True
+
+        # sequential session: pose, pause, taking picture, capture, 0.8 s before unlock
+        sequential_unlock = 2 * self.prompt_time + 0.05 + 0.8
+        print(f"\nDoor unlock latency: {unlock - start_time:.2f} s "
+              f"(sequential {sequential_unlock:.2f} s)")
+        assert unlock - start_time < sequential_unlock
+        self.tear_down()
+
+
+    def test_shutter_should_not_wait_for_failed_prompt(self):
+        self.set_up()
+        opt_t.periph.play_sound.side_effect = FileNotFoundError('aplay')
+        mock_log_error = patch.object(operation_thread.log.logger, 'error').start()
+
+        prompts_thread = opt_t.take_photo_with_prompts()
+        prompts_thread.join()
+
+        assert opt_t.photo == b'\xff\xd8jpeg'
+        # taking picture prompt is still played after pose prompt failed
+        assert opt_t.periph.play_sound.call_count == 2
+        assert mock_log_error.call_count == 2
+        self.tear_down()
+
+
+    @pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+    def test_shutter_should_be_released_on_unexpected_prompt_error(self):
+        self.set_up()
+        opt_t.periph.play_sound.side_effect = ValueError('sound card')
+
+        start_time = time.monotonic()
+        prompts_thread = opt_t.take_photo_with_prompts()
+        prompts_thread.join()
+
+        assert opt_t.photo == b'\xff\xd8jpeg'
+        assert time.monotonic() - start_time < 1.0
+        self.tear_down()
+
+
+    def test_shutter_should_not_wait_for_hanging_prompt(self):
+        self.set_up()
+        patch.object(operation_thread, 'POSE_PROMPT_TIMEOUT', 0.1).start()
+        opt_t.periph.play_sound.side_effect = lambda file_name: time.sleep(1.0)
+
+        start_time = time.monotonic()
+        opt_t.take_photo_with_prompts()
+
+        assert opt_t.photo == b'\xff\xd8jpeg'
+        assert time.monotonic() - start_time < 0.5
+        self.tear_down()
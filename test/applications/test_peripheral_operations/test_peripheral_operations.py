@@ -1,5 +1,6 @@
 import sys
-from unittest.mock import patch
+import threading
+from unittest.mock import Mock, patch
 sys.path.append('drivers/keypad')
 sys.path.append('drivers/hx711')
 sys.path.append('drivers/door')
@@ -11,6 +12,7 @@ from keypad import Keypad
 from door import Door
 from hx711 import Hx711
 from usb_camera import UsbCamera
+from photo_pipeline import PhotoPipeline
 from peripheral_operations import PeripheralOperations
 from sound import Sound
 
@@ -161,6 +163,46 @@ class TestCameraOperations:
             mock_delete.assert_called_once()
 
 
+    def test_init_camera_should_close_device_if_warm_up_fails(self):
+        periph = PeripheralOperations()
+        periph.camera = UsbCamera('/dev/video0', 'v4l2')
+
+        with patch.object(UsbCamera, 'open', side_effect=TimeoutError("No frame")), \
+            patch.object(UsbCamera, 'close') as mock_close:
+            periph.init_camera()
+
+        mock_close.assert_called_once()
+
+
+    def test_capture_bytes_should_save_audit_copy_in_background(self):
+        periph = PeripheralOperations()
+        periph.camera = UsbCamera('/dev/video0')
+        periph.camera.last_photo_name = '2026-10-17_10-00-00.jpg'
+        saved = threading.Event()
+
+        with patch.object(UsbCamera, 'capture_bytes', return_value=b'\xff\xd8jpeg'), \
+            patch.object(UsbCamera, 'save_photo', side_effect=lambda *args: saved.set()) \
+                as mock_save, \
+            patch.object(PeripheralOperations, '_get_bool_from_config_file', return_value=True):
+            photo = periph.capture_bytes()
+            assert saved.wait(1.0)
+
+        assert photo == b'\xff\xd8jpeg'
+        assert periph.get_last_photo_name() == '2026-10-17_10-00-00.jpg'
+        mock_save.assert_called_once_with(b'\xff\xd8jpeg', '2026-10-17_10-00-00.jpg')
+
+
+    def test_prepare_upload_photo_should_use_captured_photo_on_error(self):
+        periph = PeripheralOperations()
+        assert periph.prepare_upload_photo(b'\xff\xd8jpeg').photo == b'\xff\xd8jpeg'
+
+        periph.photo_pipeline = PhotoPipeline()
+        result = periph.prepare_upload_photo(b'not a jpeg')
+
+        assert result.photo == b'not a jpeg'
+        assert result.size == result.original_size == 10
+
+
 
 class TestDoorOpeartions:
     def _help_init_periph(self):
@@ -263,6 +305,19 @@ class TestWeightSensorOperations:
         mock_power_up.assert_called_once()
 
 
+    def test_wait_weight_settled_should_not_read_config_file(self):
+        periph = PeripheralOperations()
+        periph.weight = Mock()
+        periph.weight.wait_weight_settled.return_value = None
+
+        with patch('configparser.ConfigParser.read') as mock_read:
+            assert periph.wait_weight_settled(0.0, 1.0) is None
+
+        mock_read.assert_not_called()
+        periph.weight.wait_weight_settled.assert_called_once_with(
+            0.0, 1.0, window=5, max_std=0.3)
+
+
 class TestSoundOperations:
 
     def _help_init_periph(self):
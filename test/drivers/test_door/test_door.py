@@ -1,8 +1,10 @@
 from unittest.mock import patch, call
 import sys
+import time
 sys.path.append('drivers/door')
 sys.path.append('drivers/mock_wiringpi')
-from door import Door
+import door as door_module
+from door import Door, DoorMonitor
 
 
 test_pin_door = 3
@@ -114,3 +116,58 @@ class TestDoor:
         self.tear_down()
 
 
+
+
+class TestDoorMonitor:
+    '''
+        Door edges are scripted with MockWiringPi (set_pin_level and play_pin_script).
+    '''
+    def set_up(self, **kwargs):
+        global door, monitor
+        door_module.wiringpi.set_pin_level(test_pin_sense_door, 1)
+        door = Door(test_pin_door, test_pin_sense_door)
+        monitor = DoorMonitor(door, **kwargs)
+        monitor.start()
+
+    def tear_down(self):
+        monitor.stop()
+
+
+    def test_monitor_should_call_callbacks_when_door_state_changes(self):
+        events = []
+        self.set_up(debounce=0.01, on_open=lambda: events.append('open'),
+                    on_close=lambda: events.append('close'))
+        assert monitor.is_closed()
+
+        door_module.wiringpi.set_pin_level(test_pin_sense_door, 0)
+        assert monitor.opened.wait(1.0)
+        door_module.wiringpi.set_pin_level(test_pin_sense_door, 1)
+        assert monitor.wait_for_close(1.0)
+
+        assert events == ['open', 'close']
+        self.tear_down()
+
+
+    def test_monitor_should_ignore_bouncing_contact(self):
+        events = []
+        self.set_up(debounce=0.05, on_open=lambda: events.append('open'),
+                    on_close=lambda: events.append('close'))
+
+        # short glitches (shorter than debounce) then the door is open
+        script = [(0.005, 0), (0.005, 1), (0.005, 0), (0.005, 1), (0.005, 0)]
+        door_module.wiringpi.play_pin_script(test_pin_sense_door, script).join()
+
+        assert monitor.wait_for_open(1.0)
+        assert events == ['open']
+        self.tear_down()
+
+
+    def test_wait_for_close_should_return_false_on_timeout(self):
+        self.set_up(debounce=0.01)
+        door_module.wiringpi.set_pin_level(test_pin_sense_door, 0)
+        monitor.wait_for_open(1.0)
+
+        start_time = time.monotonic()
+        assert monitor.wait_for_close(0.05) is False
+        assert time.monotonic() - start_time >= 0.05
+        self.tear_down()
@@ -0,0 +1,94 @@
+from unittest.mock import patch, MagicMock
+import sys
+import threading
+sys.path.append('drivers/gpio_backend')
+sys.path.append('drivers/mock_wiringpi')
+sys.path.append('drivers/door')
+sys.path.append('drivers/hx711')
+import gpio_backend
+from gpio_backend import create_backend, get_backend, WiringPiBackend, GpiodBackend, GPIO
+from mock_wiringpi import MockWiringPi
+from hx711_simulator import Hx711Simulator
+
+
+class TestGpioBackend:
+    def test_create_backend_should_select_by_name_and_machine(self):
+        with patch('platform.machine') as mock_machine:
+            mock_machine.return_value = 'x86_64'
+            assert isinstance(create_backend('auto'), MockWiringPi)
+
+        assert isinstance(create_backend('mock'), MockWiringPi)
+        assert isinstance(create_backend('simulator'), Hx711Simulator)
+
+
+    def test_create_backend_should_raise_error_when_name_is_unknown(self):
+        try:
+            create_backend('rpi')
+        except ValueError as ve:
+            assert str(ve) == 'Unrecognised GPIO backend: "rpi"'
+        else:
+            assert False
+
+
+    def test_get_backend_should_be_shared_by_drivers(self):
+        import door
+        import hx711
+
+        assert get_backend() is door.wiringpi
+        assert get_backend() is hx711.wiringpi
+
+
+class TestWiringPiBackend:
+    def test_wiringpi_setup_should_be_called_once(self):
+        fake_wiringpi = MagicMock()
+        with patch.dict(sys.modules, {'wiringpi': fake_wiringpi}):
+            backend = WiringPiBackend()
+            backend.wiringPiSetup()
+            backend.wiringPiSetup()
+
+            fake_wiringpi.wiringPiSetup.assert_called_once()
+            # bound directly, no wrapper call
+            assert backend.digitalRead is fake_wiringpi.digitalRead
+
+
+class TestGpiodBackend:
+    def set_up(self):
+        global backend, fake_gpiod
+        fake_gpiod = MagicMock()
+        self.patcher = patch.dict(sys.modules, {'gpiod': fake_gpiod})
+        self.patcher.start()
+        backend = GpiodBackend('gpiochip1', gpio_backend._parse_line_map('7:199, 5:198'))
+        backend.wiringPiSetup()
+
+    def tear_down(self):
+        patch.stopall()
+
+
+    def test_pin_mode_should_request_mapped_line_with_pull_up(self):
+        self.set_up()
+        chip = fake_gpiod.Chip.return_value
+
+        backend.pinMode(7, GPIO.INPUT)
+        backend.pullUpDnControl(7, GPIO.PUD_UP)
+
+        fake_gpiod.Chip.assert_called_once_with('gpiochip1')
+        chip.get_line.assert_called_with(199)
+        chip.get_line.return_value.request.assert_called_with(
+            consumer=gpio_backend.GPIOD_CONSUMER, type=fake_gpiod.LINE_REQ_DIR_IN,
+            flags=fake_gpiod.LINE_REQ_FLAG_BIAS_PULL_UP)
+        self.tear_down()
+
+
+    def test_isr_should_call_callback_on_line_event(self):
+        self.set_up()
+        line = fake_gpiod.Chip.return_value.get_line.return_value
+        line.event_wait.side_effect = [True] + [False] * 1000
+        called = threading.Event()
+
+        backend.wiringPiISR(7, backend.INT_EDGE_BOTH, called.set)
+
+        assert called.wait(1.0)
+        line.event_read.assert_called_once()
+        # stop the edge thread
+        backend._lines.pop(7)
+        self.tear_down()
@@ -4,10 +4,14 @@
 '''
 
 from unittest.mock import patch, call
+import itertools
 import sys
+import threading
+import time
 sys.path.append('drivers/hx711')
 sys.path.append('drivers/mock_wiringpi')
-from hx711 import Hx711
+import hx711
+from hx711 import Hx711, RingBuffer, HX711TimeoutError, AutoZeroTracker
 
 
 
@@ -31,6 +35,9 @@ class TestHx711:
         self.mock_time_sleep = self.patcher5.start()
         self.mock_threading_lock = self.patcher6.start()
 
+        # DOUT LOW means HX711 is ready
+        self.mock_wiringpi_digitalRead.return_value = 0
+
 
     def set_up(self):
         global sensor
@@ -41,3 +48,508 @@ class TestHx711:
         patch.stopall()
 
 
+
+
+class TestHx711Read(TestHx711):
+    def test_read_median_should_return_mean_of_middle_values_when_times_is_even(self):
+        self.set_up()
+        with patch.object(Hx711, 'read_long') as mock_read_long:
+            mock_read_long.side_effect = [4, 1, 3, 2]
+            assert sensor.read_median(4) == 2.5
+
+        self.tear_down()
+
+
+    def test_get_weight_with_filter_should_use_streaming_filter(self):
+        self.set_up()
+        sensor.set_filter('ema', ema_alpha=0.5)
+        sensor.set_offset(0)
+        sensor.set_reference_unit(1)
+
+        with patch.object(Hx711, 'read_long') as mock_read_long:
+            mock_read_long.side_effect = [10, 20, 20]
+            assert sensor.get_weight_sampled(3) == 17.5
+
+        self.tear_down()
+
+
+    def test_read_adaptive_should_stop_early_when_signal_is_quiet(self):
+        self.set_up()
+        sensor.set_reference_unit(1)
+        with patch.object(Hx711, 'read_long') as mock_read_long:
+            mock_read_long.side_effect = [100, 100, 100, 100, 100]
+            value, samples_used = sensor.read_adaptive(0.5, min_samples=3, max_samples=5)
+
+        assert value == 100
+        assert samples_used == 3
+        assert sensor.last_samples_used == 3
+        self.tear_down()
+
+
+    def test_read_adaptive_should_use_max_samples_when_signal_is_noisy(self):
+        self.set_up()
+        sensor.set_reference_unit(1)
+        sensor.set_offset(0)
+        with patch.object(Hx711, 'read_long') as mock_read_long:
+            mock_read_long.side_effect = [0, 100, 0, 100, 0, 100]
+            weight, samples_used = sensor.get_weight_adaptive(0.5, min_samples=2, max_samples=6)
+
+        assert weight == 50
+        assert samples_used == 6
+        self.tear_down()
+
+
+    def test_read_adaptive_should_raise_error_when_samples_are_invalid(self):
+        self.set_up()
+        try:
+            sensor.read_adaptive(0.5, min_samples=1, max_samples=5)
+        except ValueError as ve:
+            assert str(ve) == "HX711::read_adaptive(): needs 2 <= min_samples <= max_samples!"
+        else:
+            assert False
+        self.tear_down()
+
+
+class TestHx711Sampler(TestHx711):
+    '''
+        Sampler runs in a real thread, so threading.Lock must not be mocked here.
+    '''
+    def help_mock_wiringpi_methods(self):
+        super().help_mock_wiringpi_methods()
+        self.patcher6.stop()
+
+
+    def test_sampler_should_fill_buffer_and_return_latest_weight(self):
+        '''
+            Sampler reads in background, get_weight_sampled() uses buffered samples.
+        '''
+        self.set_up()
+        sensor.set_reference_unit(2)
+        sensor.set_offset(0)
+
+        sampler = sensor.start_sampler(size=8, poll_interval=0.001)
+        while len(sampler.buffer) < 3:
+            pass
+        sensor.stop_sampler()
+
+        assert sensor.sampler is None
+        assert sampler.latest() == 0
+        assert sensor.get_weight_sampled(3) == 0.0
+
+        self.tear_down()
+
+
+    def test_sampler_should_clear_buffer_when_powered_down(self):
+        self.set_up()
+        sampler = sensor.start_sampler(size=8, poll_interval=0.001)
+        while len(sampler.buffer) == 0:
+            pass
+
+        sensor.power_down()
+        assert sampler.latest() is None
+        assert sensor._sample_into(sampler) is False
+
+        sensor.stop_sampler()
+        self.tear_down()
+
+
+    def test_sampled_weight_should_wait_for_samples_after_power_up(self):
+        self.set_up()
+        sensor.set_filter('ema', ema_alpha=0.5)
+        sampler = sensor.start_sampler(size=8, poll_interval=0.001)
+        sampler.stop()
+        # one unsettled sample right after power up
+        sampler.reset()
+        sampler.buffer.append(1000.0)
+        sampler.weight_filter.update(1000.0)
+
+        with patch.object(Hx711, 'get_weight_with_deadline', return_value=5.0) as mock_read:
+            assert sampler.filtered_value(3) is None
+            assert sensor.get_weight_sampled(3, deadline=1.0) == 5.0
+            mock_read.assert_called_once_with(3, 1.0)
+
+            for _ in range(2):
+                sampler.buffer.append(1000.0)
+                sampler.weight_filter.update(1000.0)
+            sensor.get_weight_sampled(3, deadline=1.0)
+            mock_read.assert_called_once()
+
+        sensor.stop_sampler()
+        self.tear_down()
+
+
+class TestHx711FrameReader(TestHx711):
+    '''
+        Fast frame reader (_read_frame_unlocked) against old path (readRawBytes).
+    '''
+    def help_bits_of_frame(self, value, gain_bits):
+        # 24 data bits (MSB first) and then gain bits (DOUT is ignored)
+        raw = value & 0xFFFFFF
+        return [(raw >> (23 - i)) & 0x01 for i in range(24)] + [0] * gain_bits
+
+
+    def test_fast_frame_reader_should_return_same_value_as_old_path(self):
+        self.set_up()
+        sensor.set_reading_format("MSB", "MSB")
+
+        for test_value in [0, 1, -1, 8388607, -8388608, -12345]:
+            bits = self.help_bits_of_frame(test_value, sensor.GAIN)
+
+            self.mock_wiringpi_digitalRead.side_effect = [0] + bits
+            old_value = sensor._convert_raw_bytes(sensor.readRawBytes())
+
+            self.mock_wiringpi_digitalRead.side_effect = [0] + bits
+            new_value = sensor.read_long()
+
+            assert old_value == test_value
+            assert new_value == test_value
+
+        self.tear_down()
+
+
+    def test_fast_frame_reader_should_clock_pd_sck_for_data_and_gain_bits(self):
+        self.set_up()
+        self.mock_wiringpi_digitalRead.side_effect = itertools.repeat(0)
+        self.mock_wiringpi_digitalWrite.reset_mock()
+
+        sensor._read_frame_unlocked()
+
+        # HIGH and LOW for each bit (gain 128 -> 1 extra bit)
+        assert self.mock_wiringpi_digitalWrite.call_count == (24 + 1) * 2
+
+        self.tear_down()
+
+
+    def test_benchmark_fast_frame_reader_should_be_faster_than_old_path(self):
+        '''
+            Micro-benchmark on MockWiringPi (no patched methods, so mock overhead does not
+            hide the dispatch cost).
+        '''
+        self.set_up()
+        patch.stopall()
+        frames = 2000
+
+        start_time = time.perf_counter()
+        for _ in range(frames):
+            sensor._convert_raw_bytes(sensor._read_raw_bytes_unlocked())
+        old_path_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for _ in range(frames):
+            sensor._read_frame_unlocked()
+        fast_path_time = time.perf_counter() - start_time
+
+        print(f"\nHX711 frame: old path {old_path_time / frames * 1e6:.1f} us, "
+              f"fast path {fast_path_time / frames * 1e6:.1f} us")
+        assert fast_path_time < old_path_time
+
+
+class TestHx711EdgeReady:
+    '''
+        Edge mode uses simulated edge source in MockWiringPi (set_pin_level).
+    '''
+    def set_up(self):
+        global sensor
+        self.patcher = patch('time.sleep')
+        self.patcher.start()
+        hx711.wiringpi.set_pin_level(test_pdo, 0)
+        sensor = Hx711(test_pdo, test_pd_sck, ready_mode='edge')
+
+    def tear_down(self):
+        hx711.wiringpi.set_pin_level(test_pdo, 0)
+        patch.stopall()
+
+
+    def test_edge_mode_should_wait_until_dout_falls(self):
+        self.set_up()
+        # HX711 is busy (DOUT HIGH)
+        hx711.wiringpi.set_pin_level(test_pdo, 1)
+        timer = threading.Timer(0.05, hx711.wiringpi.set_pin_level, args=(test_pdo, 0))
+
+        start_time = time.perf_counter()
+        timer.start()
+        sensor._wait_ready_unlocked()
+        waited_time = time.perf_counter() - start_time
+
+        assert sensor.is_ready()
+        assert waited_time >= 0.04
+        self.tear_down()
+
+
+    def test_init_should_raise_error_when_ready_mode_is_unknown(self):
+        try:
+            Hx711(test_pdo, test_pd_sck, ready_mode='irq')
+        except ValueError as ve:
+            assert str(ve) == 'Unrecognised ready_mode: "irq"'
+        else:
+            assert False
+
+
+class Hx711ScriptedPins:
+    '''
+        Helper (not collected), DOUT is scripted with MockWiringPi.set_pin_level().
+    '''
+    def set_up(self, ready_mode='poll'):
+        global sensor
+        self.patcher = patch('time.sleep')
+        self.patcher.start()
+        hx711.wiringpi.set_pin_level(test_pdo, 0)
+        sensor = Hx711(test_pdo, test_pd_sck, ready_mode=ready_mode)
+
+    def tear_down(self):
+        hx711.wiringpi.set_pin_level(test_pdo, 0)
+        patch.stopall()
+
+
+class TestHx711Deadline(Hx711ScriptedPins):
+    '''
+        Deadline-aware reads.
+    '''
+    def test_read_long_with_deadline_should_raise_timeout_when_hx711_not_ready(self):
+        for ready_mode in ['poll', 'edge']:
+            self.set_up(ready_mode)
+            hx711.wiringpi.set_pin_level(test_pdo, 1)
+
+            start_time = time.monotonic()
+            try:
+                sensor.read_long_with_deadline(start_time + 0.05)
+            except HX711TimeoutError:
+                pass
+            else:
+                assert False
+
+            assert time.monotonic() - start_time < 1.0
+            # lock should be released after timeout
+            assert sensor.readLock.acquire(blocking=False)
+            sensor.readLock.release()
+            self.tear_down()
+
+
+    def test_read_long_with_deadline_should_raise_timeout_when_lock_is_busy(self):
+        self.set_up()
+        sensor.readLock.acquire()
+
+        try:
+            sensor.read_long_with_deadline(time.monotonic() + 0.01)
+        except HX711TimeoutError as error_message:
+            assert str(error_message) == "HX711 readLock is busy until deadline!"
+        else:
+            assert False
+
+        sensor.readLock.release()
+        self.tear_down()
+
+
+    def test_get_weight_with_deadline_should_return_weight_when_hx711_is_ready(self):
+        self.set_up()
+        sensor.set_offset(0)
+        sensor.set_reference_unit(2)
+
+        assert sensor.get_weight_with_deadline(3, time.monotonic() + 1.0) == 0.0
+        self.tear_down()
+
+
+    def test_wait_weight_settled_should_return_settled_weight(self):
+        self.set_up()
+        sensor.set_offset(0)
+        sensor.set_reference_unit(1)
+
+        settled = sensor.wait_weight_settled(reference=-2.0, timeout=1.0, window=3)
+
+        assert settled.value == 0.0
+        assert settled.delta == 2.0
+        self.tear_down()
+
+
+    def test_wait_weight_settled_should_return_none_when_hx711_not_ready(self):
+        self.set_up()
+        hx711.wiringpi.set_pin_level(test_pdo, 1)
+
+        assert sensor.wait_weight_settled(reference=0.0, timeout=0.05) is None
+        self.tear_down()
+
+
+class TestHx711Calibration(Hx711ScriptedPins):
+    '''
+        Persisted calibration (conf/calibration.ini in the app), tmp_path is used here.
+    '''
+    def test_calibration_should_be_saved_and_loaded_correctly(self, tmp_path):
+        calibration_file = str(tmp_path / 'calibration.ini')
+        self.set_up()
+        sensor.set_reference_unit(142)
+
+        assert sensor.load_calibration(calibration_file) is False
+
+        sensor.set_offset(-1234.5)
+        sensor.save_calibration(calibration_file)
+
+        sensor.set_offset(0)
+        assert sensor.load_calibration(calibration_file) is True
+        assert sensor.get_offset() == -1234.5
+        assert sensor.calibrated_at is not None
+
+        # reference unit is changed, calibration must be tared again
+        sensor.set_reference_unit(92)
+        assert sensor.load_calibration(calibration_file) is False
+        self.tear_down()
+
+
+    def test_calibration_should_be_stale_when_old_or_zero_disagrees(self):
+        self.set_up()
+        sensor.set_reference_unit(1)
+        sensor.set_offset(0)
+
+        sensor.calibrated_at = time.time() - 100
+        assert sensor.is_calibration_stale(max_age=10, zero_tolerance=5) is True
+
+        sensor.calibrated_at = time.time()
+        assert sensor.is_calibration_stale(max_age=10, zero_tolerance=5) is False
+
+        # zero reading (0) is far from stored offset
+        sensor.set_offset(100)
+        assert sensor.is_calibration_stale(max_age=10, zero_tolerance=5) is True
+        self.tear_down()
+
+
+    def test_calibration_check_should_retare_in_background_and_defer_power_down(self, tmp_path):
+        calibration_file = str(tmp_path / 'calibration.ini')
+        self.set_up()
+        sensor.set_reference_unit(1)
+        sensor.set_offset(100)
+        sensor.calibrated_at = time.time()
+
+        with patch.object(Hx711, '_tare_with_deadline') as mock_tare:
+            mock_tare.side_effect = lambda times, deadline: sensor.set_offset(0)
+            thread = sensor.start_calibration_check(calibration_file, 10, 5)
+            sensor.power_down()
+            thread.join(2.0)
+
+        mock_tare.assert_called_once()
+        assert sensor.recalibrated.is_set()
+        assert sensor.get_offset() == 0
+        assert sensor.load_calibration(calibration_file) is True
+        # power_down is done after the check
+        assert sensor._is_powered_down is True
+        self.tear_down()
+
+
+class TestAutoZeroTracker(Hx711ScriptedPins):
+    '''
+        Raw reading is 0 (MockWiringPi), the offset sets the reading weight.
+    '''
+    def help_sensor_reading(self, weight):
+        sensor.set_reference_unit(10)
+        sensor.set_offset(-weight * 10)
+
+
+    def test_track_once_should_move_offset_with_bounded_slew(self, tmp_path):
+        calibration_file = str(tmp_path / 'calibration.ini')
+        self.set_up()
+        self.help_sensor_reading(5.3)
+        sensor.calibrated_at = 1000.0
+        tracker = AutoZeroTracker(sensor, lambda: True, calibration_file, max_slew=0.05,
+                                  capture_band=0.5, samples=3)
+        tracker.resume(5.0)
+
+        step = tracker.track_once()
+
+        assert step == 0.05
+        assert abs(sensor.get_weight_with_deadline(3, time.monotonic() + 1) - 5.25) < 1e-9
+        # drift is persisted, tare time is kept
+        sensor.set_offset(0)
+        assert sensor.load_calibration(calibration_file) is True
+        assert sensor.get_offset() == -52.5
+        assert sensor.calibrated_at == 1000.0
+        self.tear_down()
+
+
+    def test_track_once_should_ignore_big_change_and_open_door(self):
+        self.set_up()
+        self.help_sensor_reading(8.0)
+        door_closed = [True]
+        tracker = AutoZeroTracker(sensor, lambda: door_closed[0], samples=3)
+
+        # paused (no reference)
+        assert tracker.track_once() is None
+
+        tracker.resume(5.0)
+        assert tracker.track_once() == 0.0
+        assert sensor.get_offset() == -80
+
+        door_closed[0] = False
+        assert tracker.track_once() is None
+        self.tear_down()
+
+
+    def test_track_once_should_restore_power_down_state(self):
+        self.set_up()
+        self.help_sensor_reading(5.0)
+        tracker = AutoZeroTracker(sensor, samples=3)
+        tracker.resume(5.0)
+        sensor.power_down()
+        hx711.wiringpi.set_pin_level(test_pdo, 0)
+
+        assert tracker.track_once() == 0
+        assert sensor._is_powered_down is True
+        self.tear_down()
+
+
+    def test_pause_should_not_wait_for_running_read(self):
+        self.set_up()
+        self.help_sensor_reading(5.3)
+        tracker = AutoZeroTracker(sensor, samples=3)
+        tracker.resume(5.0)
+        read_started = threading.Event()
+        read_done = threading.Event()
+
+        # time.sleep is patched, the read blocks until the test releases it
+        def help_slow_read(times, deadline):
+            read_started.set()
+            read_done.wait(1.0)
+            return 5.3
+
+        with patch.object(Hx711, 'get_weight_with_deadline', side_effect=help_slow_read):
+            steps = []
+            step_thread = threading.Thread(target=lambda: steps.append(tracker.track_once()))
+            step_thread.start()
+            read_started.wait(1.0)
+
+            start_time = time.monotonic()
+            tracker.pause()
+            pause_time = time.monotonic() - start_time
+            read_done.set()
+            step_thread.join()
+
+        assert pause_time < 0.1
+        # read of the paused step is thrown away
+        assert steps == [None]
+        assert sensor.get_offset() == -53
+        self.tear_down()
+
+
+class TestRingBuffer:
+    def test_ring_buffer_should_return_newest_samples_in_order(self):
+        ring = RingBuffer(4)
+        assert ring.latest() is None
+        assert ring.window(3) == []
+
+        for value in range(6):
+            ring.append(value)
+
+        assert len(ring) == 4
+        assert ring.latest() == 5
+        assert ring.window(3) == [3, 4, 5]
+        # window is limited by buffer size
+        assert ring.window(10) == [2, 3, 4, 5]
+
+        ring.clear()
+        assert len(ring) == 0
+
+
+    def test_ring_buffer_should_raise_error_when_size_is_zero(self):
+        try:
+            RingBuffer(0)
+        except ValueError as ve:
+            assert str(ve) == "RingBuffer::size must be greater than zero!"
+        else:
+            assert False
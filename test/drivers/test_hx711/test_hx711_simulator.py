@@ -0,0 +1,156 @@
+'''
+    Hx711 driver against simulated HX711 (drivers/mock_wiringpi/hx711_simulator.py).
+    No wiringpi method is patched, every bit goes through the simulated protocol.
+'''
+
+from unittest.mock import patch
+import sys
+import time
+sys.path.append('drivers/hx711')
+sys.path.append('drivers/mock_wiringpi')
+import hx711
+from hx711 import Hx711
+from hx711_simulator import Hx711Simulator, Hx711Signal, load_trace
+
+
+
+test_pd_sck = 10
+test_pdo = 9
+# longer than Python stalls on a busy CI host, see NOTE in hx711_simulator.py
+test_power_down_time = 0.005
+
+
+class TestHx711Simulator:
+    def set_up(self, signal, ready_mode='poll', sample_rate=None, isr_on_data_bits=False):
+        global sensor, simulator
+        simulator = Hx711Simulator(test_pdo, test_pd_sck, signal, sample_rate,
+                                   test_power_down_time, isr_on_data_bits)
+        self.patcher = patch.object(hx711, 'wiringpi', simulator)
+        self.patcher.start()
+        sensor = Hx711(test_pdo, test_pd_sck, ready_mode=ready_mode, startup_delay=0)
+
+    def tear_down(self):
+        patch.stopall()
+
+
+    def test_read_long_should_decode_twos_complement_trace(self):
+        trace = [0, 1, -1, 12345, -12345, 8388607, -8388608]
+        self.set_up(Hx711Signal(trace=trace))
+        # first sample is thrown away by set_gain() in __init__
+        values = [sensor.read_long() for _ in range(len(trace))]
+
+        assert values == trace[1:] + trace[:1]
+        assert sensor._convert_raw_bytes(sensor.readRawBytes()) == 1
+        self.tear_down()
+
+
+    def test_read_long_should_saturate_out_of_range_values(self):
+        self.set_up(Hx711Signal(weight=1e7))
+        assert sensor.read_long() == 0x7FFFFF
+        self.tear_down()
+
+
+    def test_gain_pulses_should_set_gain_of_next_conversion(self):
+        self.set_up(Hx711Signal(weight=1000))
+
+        assert sensor.read_long() == 1000
+        sensor.set_gain(64)
+        assert sensor.read_long() == 500
+        assert simulator.gain == 64
+        sensor.set_gain(32)
+        assert sensor.read_long() == 250
+        self.tear_down()
+
+
+    def test_power_down_should_stop_conversions_until_power_up(self):
+        self.set_up(Hx711Signal(weight=1000))
+        sensor.set_gain(64)
+
+        sensor.power_down()
+        time.sleep(test_power_down_time * 2)
+        assert simulator.is_powered_down()
+        assert not sensor.is_ready()
+
+        # power up resets gain to 128, driver reads one sample to set gain 64 again
+        sensor.power_up()
+        assert sensor.read_long() == 500
+        self.tear_down()
+
+
+    def test_edge_mode_should_wake_up_on_simulated_conversion(self):
+        self.set_up(Hx711Signal(weight=42), ready_mode='edge', sample_rate=80)
+
+        start_time = time.perf_counter()
+        values = [sensor.read_long() for _ in range(4)]
+        read_time = time.perf_counter() - start_time
+
+        assert values == [42] * 4
+        assert read_time >= 3 / 80
+        self.tear_down()
+
+
+    def test_edge_mode_should_ignore_data_bit_edges(self):
+        self.set_up(Hx711Signal(trace=[0x555555, 0x2AAAAA, -1]), ready_mode='edge',
+                    sample_rate=20, isr_on_data_bits=True)
+
+        ready_event = sensor._ready_event
+        with patch.object(ready_event, 'set', wraps=ready_event.set) as spy_set:
+            values = [sensor.read_long() for _ in range(3)]
+
+        assert values == [0x2AAAAA, -1, 0x555555]
+        # only conversion ready edges wake the reader up
+        assert simulator.data_bit_edges >= 3 * 10
+        assert spy_set.call_count <= 3
+        self.tear_down()
+
+
+    def test_wait_weight_settled_should_measure_dropped_item(self):
+        # door_session regression: tare, courier drops 250 g, weight settles again
+        signal = Hx711Signal(offset=8000, reference_unit=100, noise_std=0.05, seed=7)
+        self.set_up(signal)
+        sensor.set_reference_unit(100)
+        sensor.tare(15)
+        signal.add_step(250.0, at=signal.index + 4)
+
+        settled = sensor.wait_weight_settled(reference=0.0, timeout=1.0, window=5, max_std=0.3)
+
+        assert settled is not None
+        assert abs(settled.delta - 250.0) < 0.5
+        self.tear_down()
+
+
+    def test_filter_should_follow_drift_and_reject_noise(self):
+        signal = Hx711Signal(weight=100, offset=0, reference_unit=100, noise_std=1.0,
+                             drift=0.01, seed=3)
+        self.set_up(signal)
+        sensor.set_reference_unit(100)
+        sensor.set_offset(0)
+        sensor.set_filter('median', window=9)
+
+        for _ in range(20):
+            weight = sensor.get_weight_with_deadline(9, time.monotonic() + 1.0)
+
+        expected = 100 + 0.01 * (signal.index - 5)
+        assert abs(weight - expected) < 1.0
+        self.tear_down()
+
+
+    def test_load_trace_should_skip_comments(self, tmp_path):
+        trace_file = tmp_path / 'trace.txt'
+        trace_file.write_text("# recorded on device\n8123\n\n-42\n")
+
+        assert load_trace(str(trace_file)) == [8123, -42]
+
+
+    def test_benchmark_weight_read_on_simulator(self):
+        self.set_up(Hx711Signal(weight=10, reference_unit=100, noise_std=0.1, seed=1))
+        frames = 1000
+
+        start_time = time.perf_counter()
+        for _ in range(frames):
+            sensor.read_long()
+        frame_time = (time.perf_counter() - start_time) / frames
+
+        print(f"\nHX711 simulated frame: {frame_time * 1e6:.1f} us")
+        assert simulator.frames_served >= frames
+        self.tear_down()
@@ -0,0 +1,129 @@
+'''
+    Streaming filters are compared with the list-based version (build, sort and slice)
+    for every sample.
+'''
+import random
+import pytest
+import statistics
+import sys
+sys.path.append('drivers/hx711')
+from weight_filter import create_filter, RollingMedian, RollingTrimmedMean, Ema, Kalman1D, \
+    SettleDetector
+
+
+def help_trimmed_mean(values, trim_ratio=0.2):
+    values = sorted(values)
+    trim = int(len(values) * trim_ratio)
+    if trim > 0:
+        values = values[trim:-trim]
+    return sum(values) / len(values)
+
+
+class TestRollingMedian:
+    def test_rolling_median_should_equal_median_of_window(self):
+        rng = random.Random(711)
+        for window in [1, 2, 5, 9]:
+            median_filter = RollingMedian(window)
+            samples = [rng.randint(-50, 50) for _ in range(300)]
+
+            for index, sample in enumerate(samples):
+                ret_val = median_filter.update(sample)
+                expected = statistics.median(samples[max(0, index + 1 - window):index + 1])
+                assert ret_val == expected
+
+    def test_rolling_median_should_reset_correctly(self):
+        median_filter = RollingMedian(3)
+        median_filter.update(10)
+        median_filter.reset()
+
+        assert median_filter.value is None
+        assert median_filter.update(4) == 4
+
+
+class TestRollingTrimmedMean:
+    def test_rolling_trimmed_mean_should_equal_trimmed_mean_of_window(self):
+        rng = random.Random(142)
+        trimmed_filter = RollingTrimmedMean(9)
+        samples = [rng.randint(-1000, 1000) for _ in range(200)]
+
+        for index, sample in enumerate(samples):
+            ret_val = trimmed_filter.update(sample)
+            expected = help_trimmed_mean(samples[max(0, index - 8):index + 1])
+            assert abs(ret_val - expected) < 1e-9
+
+
+    def test_rolling_trimmed_mean_should_keep_tail_sums_with_repeated_samples(self):
+        rng = random.Random(9)
+        for window, trim_ratio in [(1, 0.2), (5, 0.2), (10, 0.25), (32, 0.1), (9, 0.45)]:
+            trimmed_filter = RollingTrimmedMean(window, trim_ratio)
+            # few levels, samples cross the trim boundaries and have many ties
+            samples = [rng.choice([0, 1, 1, 2, 5, 5, 9]) for _ in range(300)]
+
+            for index, sample in enumerate(samples):
+                ret_val = trimmed_filter.update(sample)
+                expected = help_trimmed_mean(samples[max(0, index - window + 1):index + 1],
+                                             trim_ratio)
+                assert abs(ret_val - expected) < 1e-9
+
+
+    def test_rolling_trimmed_mean_should_raise_error_for_wrong_trim_ratio(self):
+        with pytest.raises(ValueError):
+            RollingTrimmedMean(9, 0.5)
+
+
+class TestEmaAndKalman:
+    def test_ema_should_follow_samples_with_alpha(self):
+        ema = Ema(0.5)
+
+        assert ema.update(10) == 10.0
+        assert ema.update(20) == 15.0
+        assert ema.update(20) == 17.5
+
+    def test_kalman_should_converge_to_constant_weight(self):
+        rng = random.Random(9)
+        kalman = Kalman1D(process_variance=1.0, measurement_variance=400.0)
+
+        for _ in range(200):
+            kalman.update(5000 + rng.gauss(0, 20))
+
+        assert abs(kalman.value - 5000) < 10
+
+
+class TestSettleDetector:
+    def test_settle_detector_should_emit_once_after_transients(self):
+        detector = SettleDetector(window=3, max_std=0.3, reference=10.0)
+        # door slammed (transients) then item weight is stable
+        samples = [10.0, 25.0, 8.0, 19.0, 15.1, 15.0, 14.9, 15.0]
+        ret_vals = [detector.update(sample) for sample in samples]
+
+        assert ret_vals == [False] * 6 + [True, False]
+        assert detector.settled.is_set()
+        assert abs(detector.value - 15.0) < 1e-9
+        assert abs(detector.delta - 5.0) < 1e-9
+        assert str(detector) == "settled at 15.0 (delta 5.0)"
+
+    def test_settle_detector_should_reset_correctly(self):
+        detector = SettleDetector(window=2, max_std=0.1)
+        detector.update(1.0)
+        detector.update(1.0)
+        detector.reset(reference=1.0)
+
+        assert not detector.settled.is_set()
+        assert detector.reference == 1.0
+        assert str(detector) == "not settled"
+
+
+class TestCreateFilter:
+    def test_create_filter_should_return_correct_filter(self):
+        assert isinstance(create_filter('median', 9), RollingMedian)
+        assert isinstance(create_filter('trimmed_mean', 9), RollingTrimmedMean)
+        assert isinstance(create_filter('ema', ema_alpha=0.2), Ema)
+        assert isinstance(create_filter('kalman'), Kalman1D)
+
+    def test_create_filter_should_raise_error_when_name_is_unknown(self):
+        try:
+            create_filter('average')
+        except ValueError as ve:
+            assert str(ve) == 'Unrecognised weight filter: "average"'
+        else:
+            assert False
@@ -1,4 +1,5 @@
-from unittest.mock import patch, call
+from unittest.mock import patch, call, Mock
+import itertools
 import time
 import sys
 
@@ -6,7 +7,8 @@ import sys
 sys.path.append('drivers/keypad')
 sys.path.append('drivers/mock_wiringpi')
 
-from keypad import Keypad
+from keypad import Keypad, KeypadReader, KeyEvent
+from keypad_emulator import KeypadEmulator
 
 test_row_pins_array = [2,3,4,5]
 test_column_pins_array = [6,7,8,9]
@@ -133,6 +135,145 @@ class TestKeypad:
     #     mock_time_sleep.assert_called_once_with(0.2)
 
     #     self.tear_down()
-        
 
- 
\ No newline at end of file
+
+
+class TestKeypadReader:
+    def set_up(self, keys):
+        global reader, fake_keypad
+        fake_keypad = Mock()
+        # serial read() times out (no keys) when no key is pressed
+        fake_keypad.reading_input_keys.side_effect = itertools.chain(
+            keys, self.help_idle_reads())
+        reader = KeypadReader(fake_keypad)
+        reader.start()
+
+    def tear_down(self):
+        reader.stop()
+
+    def help_idle_reads(self):
+        while True:
+            time.sleep(0.001)
+            yield []
+
+
+    def test_reader_should_put_timestamped_key_events_in_order(self):
+        start_time = time.monotonic()
+        self.set_up([['1'], [], ['2', 'D']])
+
+        events = [reader.get_event(timeout=1.0) for _ in range(3)]
+
+        assert [event.key for event in events] == ['1', '2', 'D']
+        assert all(isinstance(event, KeyEvent) for event in events)
+        assert start_time <= events[0].timestamp <= events[1].timestamp
+        # same burst, same timestamp
+        assert events[1].timestamp == events[2].timestamp
+        self.tear_down()
+
+
+    def test_get_events_should_return_whole_burst(self):
+        self.set_up([['1', '2', '3']])
+        time.sleep(0.05)
+
+        events = reader.get_events(timeout=1.0)
+
+        assert [event.key for event in events] == ['1', '2', '3']
+        assert reader.get_events() == []
+        self.tear_down()
+
+
+    def test_get_event_should_not_block_when_no_key_is_pressed(self):
+        self.set_up([])
+
+        start_time = time.monotonic()
+        assert reader.get_event() is None
+        assert reader.get_event(timeout=0.05) is None
+        assert time.monotonic() - start_time < 0.5
+        self.tear_down()
+
+
+
+class TestKeypadBulkRead:
+    def set_up(self):
+        global keypad, mock_serial
+        self.patcher = patch('serial.Serial')
+        mock_serial = self.patcher.start().return_value
+        keypad = Keypad()
+
+    def tear_down(self):
+        patch.stopall()
+
+    def help_serial_data(self, chunks):
+        # in_waiting is read before each read() of a chunk
+        type(mock_serial).in_waiting = property(lambda _: len(chunks[0]) if chunks else 0)
+        mock_serial.read.side_effect = lambda size: chunks.pop(0) if chunks else b''
+
+
+    def test_reading_input_keys_should_drain_burst_in_one_read(self):
+        self.set_up()
+        self.help_serial_data([b'1\r\n2\r\n3\r\nD\r\n'])
+
+        assert keypad.reading_input_keys() == ['1', '2', '3', 'D']
+        mock_serial.read.assert_called_once_with(12)
+        self.tear_down()
+
+
+    def test_reading_input_keys_should_keep_partial_line_for_next_read(self):
+        self.set_up()
+        self.help_serial_data([b'1\r\n2\r'])
+        assert keypad.reading_input_keys() == ['1']
+
+        self.help_serial_data([b'\n3\r\n'])
+        assert keypad.reading_input_keys() == ['2', '3']
+        self.tear_down()
+
+
+    def test_reading_input_keys_should_drop_only_the_broken_line(self):
+        self.set_up()
+        self.help_serial_data([b'1\r\n\xff\xfe\r\n2\r\n'])
+
+        assert keypad.reading_input_keys() == ['1', '2']
+        self.tear_down()
+
+
+    def test_reading_input_keys_should_return_empty_list_on_timeout(self):
+        self.set_up()
+        self.help_serial_data([])
+
+        assert keypad.reading_input_keys() == []
+        mock_serial.read.assert_called_once_with(1)
+        self.tear_down()
+
+
+
+class TestKeypadEmulator:
+    def set_up(self):
+        global keypad, emulator
+        emulator = KeypadEmulator()
+        keypad = Keypad(emulator.port)
+
+    def tear_down(self):
+        keypad.ser.close()
+        emulator.close()
+
+
+    def test_keypad_should_read_keys_from_emulator(self):
+        self.set_up()
+        emulator.press(['1'])
+        assert keypad.reading_input_char() == '1'
+
+        emulator.press('23D')
+        time.sleep(0.05)
+        assert keypad.reading_input_keys() == ['2', '3', 'D']
+        assert len(emulator.sent_times) == 4
+        self.tear_down()
+
+
+    def test_keypad_should_join_partial_line_from_emulator(self):
+        self.set_up()
+        emulator.write_raw(b'4\r')
+        assert keypad.reading_input_keys() == []
+
+        emulator.write_raw(b'\n')
+        assert keypad.reading_input_keys() == ['4']
+        self.tear_down()
@@ -5,9 +5,10 @@ import sys
 from smbus2 import SMBus
 import time
 import unittest
+import pytest
 from unittest.mock import patch, call
 sys.path.append('drivers/lcd') #
-from lcd import Lcd
+from lcd import Lcd, encode_4_bit, encode_text, compile_screen
 
 
 test_dev_addr = 0x27
@@ -396,23 +397,233 @@ class TestLcd:
 
 
 
-        
+class TestLcdRender:
+    '''
+        render() with a shadow framebuffer. _send_data_4_bit is mocked, every call is
+        one byte (command or char) sent to LCD.
+    '''
+    def set_up(self):
+        global lcd
+        patch('smbus2.SMBus.open').start()
+        self.mock__send_data_4_bit = patch('lcd.Lcd._send_data_4_bit').start()
+        lcd = Lcd(test_dev_addr, test_bus_line)
 
-        
+    def tear_down(self):
+        patch.stopall()
 
 
+    def test_render_should_write_every_cell_when_display_content_is_unknown(self):
+        self.set_up()
+        lcd.render(['Masukan resi:', ''])
 
-        
+        sent = self.mock__send_data_4_bit.call_args_list
+        assert sent[0] == call(0x80, 0x00)
+        assert sent[17] == call(0xC0, 0x00)
+        assert len(sent) == 2 + 32
+        assert call(0x01, 0x00) not in sent ### no clear
+        self.tear_down()
 
 
+    def test_render_should_write_only_changed_cells(self):
+        self.set_up()
+        lcd.render(['Masukan resi:', '12'])
+        self.mock__send_data_4_bit.reset_mock()
 
+        lcd.render(['Masukan resi:', '123'])
 
+        self.mock__send_data_4_bit.assert_has_calls([
+            call(0xC2, 0x00), ### line 1, column 2
+            call(ord('3'), 0x01),
+        ])
+        assert self.mock__send_data_4_bit.call_count == 2
+        self.tear_down()
 
 
+    def test_render_should_skip_unchanged_frame_and_join_close_cells(self):
+        self.set_up()
+        lcd.render(['abcd', 'wxyz'])
+        self.mock__send_data_4_bit.reset_mock()
+
+        lcd.render(['abcd', 'wxyz'])
+        assert self.mock__send_data_4_bit.call_count == 0
+
+        ### 'b' and 'd' changed, 'c' is rewritten instead of a second cursor command
+        lcd.render(['aBcD', 'wxyz'])
+        self.mock__send_data_4_bit.assert_has_calls([
+            call(0x81, 0x00),
+            call(ord('B'), 0x01),
+            call(ord('c'), 0x01),
+            call(ord('D'), 0x01),
+        ])
+        assert self.mock__send_data_4_bit.call_count == 4
+        self.tear_down()
+
+
+    def test_render_force_should_clear_and_follow_write_text(self):
+        self.set_up()
+        lcd.clear_lcd()
+        lcd.write_text(0, 'sian')
+        self.mock__send_data_4_bit.reset_mock()
+
+        ### shadow knows what write_text displayed
+        lcd.render(['sian', ''])
+        assert self.mock__send_data_4_bit.call_count == 0
+
+        lcd.render(['sian', ''], force=True)
+        self.mock__send_data_4_bit.assert_has_calls([
+            call(0x01, 0x00),
+            call(ord('s'), 0x01), ### cursor is home after clear, no cursor command
+        ])
+        assert self.mock__send_data_4_bit.call_count == 5
+
+        with pytest.raises(ValueError):
+            lcd.render(['this text exceeds 16 chars', ''])
+        with pytest.raises(ValueError):
+            lcd.render(['one line'])
+        self.tear_down()
+
+
+
+class TestLcdBatchI2c:
+    '''
+        batch_i2c: precomputed bytes in i2c_rdwr block transfers.
+    '''
+    def set_up(self, batch_i2c=True):
+        global lcd
+        patch('smbus2.SMBus.open').start()
+        self.mock_i2c_rdwr = patch('smbus2.SMBus.i2c_rdwr').start()
+        self.mock_write_byte = patch('smbus2.SMBus.write_byte').start()
+        lcd = Lcd(test_dev_addr, test_bus_line, batch_i2c=batch_i2c)
+
+    def tear_down(self):
+        patch.stopall()
+
+    def help_sent_blocks(self):
+        return [bytes(msg) for args in self.mock_i2c_rdwr.call_args_list for msg in args.args]
+
+
+    def test_encode_4_bit_should_match_byte_per_byte_writes(self):
+        self.set_up(batch_i2c=False)
+        with patch('time.sleep'):
+            lcd._send_data_4_bit(0x73, 0x01)
+
+        written = bytes(args.args[1] for args in self.mock_write_byte.call_args_list)
+        assert encode_4_bit(0x73, 0x01) == written
+        assert encode_text('s') == written
+        self.tear_down()
+
+
+    def test_write_text_should_send_one_block_without_sleep(self):
+        self.set_up()
+        with patch('time.sleep') as mock_sleep:
+            lcd.write_text(1, 'sian')
+
+        assert self.help_sent_blocks() == [encode_4_bit(0xC0, 0x00) + encode_text('sian')]
+        assert self.mock_i2c_rdwr.call_args.args[0].addr == test_dev_addr
+        self.mock_write_byte.assert_not_called()
+        mock_sleep.assert_not_called()
+        self.tear_down()
+
+
+    def test_render_should_send_frame_in_one_block_and_wait_after_clear(self):
+        self.set_up()
+        with patch('time.sleep') as mock_sleep:
+            lcd.clear_lcd()
+            mock_sleep.assert_called_once_with(0.002)
+
+            lcd.render(['ab', 'c'])
+
+        assert self.help_sent_blocks() == [
+            encode_4_bit(0x01, 0x00),
+            encode_text('ab') + encode_4_bit(0xC0, 0x00) + encode_text('c'),
+        ]
+        self.tear_down()
+
+
+    def test_benchmark_lines_per_second(self):
+        '''
+            i2c_rdwr takes the bus time of a 100 kHz bus (9 clocks per byte), byte per
+            byte writes take their sleeps.
+        '''
+        self.set_up(batch_i2c=False)
+        self.mock_i2c_rdwr.side_effect = lambda msg: time.sleep(msg.len * 9 / 100000)
+        text = 'Masukan resi:123'
+        results = {}
+
+        for batch_i2c, lines in [(False, 3), (True, 30)]:
+            lcd.batch_i2c = batch_i2c
+            start_time = time.perf_counter()
+            for _ in range(lines):
+                lcd.write_text(0, text)
+            results[batch_i2c] = lines / (time.perf_counter() - start_time)
+
+        print(f"\nLCD lines/s: byte per byte {results[False]:.1f}, "
+              f"block transfer {results[True]:.1f}")
+        assert results[True] > results[False] * 2
+        self.tear_down()
+
+
+
+class TestCompiledScreen:
+    def set_up(self):
+        global lcd
+        patch('smbus2.SMBus.open').start()
+        self.mock_i2c_rdwr = patch('smbus2.SMBus.i2c_rdwr').start()
+        lcd = Lcd(test_dev_addr, test_bus_line, batch_i2c=True)
+
+    def tear_down(self):
+        patch.stopall()
+
+    def help_sent_blocks(self):
+        return [bytes(msg) for args in self.mock_i2c_rdwr.call_args_list for msg in args.args]
+
+
+    def test_compile_screen_should_pad_and_encode_lines(self):
+        screen = compile_screen(['INFO:', '-> BRG DIAMBIL!'])
+
+        assert screen.lines == ('INFO:           ', '-> BRG DIAMBIL! ')
+        assert screen.line_bytes[0] == encode_4_bit(0x80, 0x00) + encode_text(screen.lines[0])
+        assert screen.line_bytes[1] == encode_4_bit(0xC0, 0x00) + encode_text(screen.lines[1])
+
+        with pytest.raises(ValueError):
+            compile_screen(['this text exceeds 16 chars', ''])
+
+
+    def test_render_compiled_should_send_only_changed_lines(self):
+        self.set_up()
+        timeout = compile_screen(['INFO:', '-> WAKTU HABIS!'])
+        taking_item = compile_screen(['INFO:', '-> SILAKAN AMBIL'])
+
+        lcd.render_compiled(timeout)
+        lcd.render_compiled(taking_item)
+        lcd.render_compiled(taking_item)
+
+        assert self.help_sent_blocks() == [
+            timeout.line_bytes[0] + timeout.line_bytes[1],
+            taking_item.line_bytes[1],
+        ]
+        ### shadow follows compiled screens
+        self.mock_i2c_rdwr.reset_mock()
+        lcd.render(['INFO:', '-> SILAKAN AMBIl'])
+        assert self.help_sent_blocks() == [encode_4_bit(0xCF, 0x00) + encode_text('l')]
+        self.tear_down()
 
-        
 
+    def test_benchmark_compiled_screen_encoding(self):
+        lines = ['STATUS:', ' RESI DITERIMA!']
+        screen = compile_screen(lines)
+        rounds = 2000
 
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            compile_screen(lines)
+        encode_time = (time.perf_counter() - start_time) / rounds
 
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            b''.join(screen.line_bytes)
+        cached_time = (time.perf_counter() - start_time) / rounds
 
-      
\ No newline at end of file
+        print(f"\nLCD screen bytes: encode {encode_time * 1e6:.1f} us, "
+              f"compiled {cached_time * 1e6:.2f} us")
+        assert cached_time < encode_time
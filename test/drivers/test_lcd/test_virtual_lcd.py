@@ -0,0 +1,88 @@
+'''
+    Lcd driver against the headless LCD (drivers/lcd/virtual_lcd.py). No bus method is
+    patched, every byte goes through the pcf8574 nibble decoder.
+'''
+import sys
+import time
+from unittest.mock import patch
+sys.path.append('drivers/lcd')
+from lcd import Lcd, compile_screen
+from virtual_lcd import VirtualLcdBus
+
+
+test_dev_addr = 0x27
+test_bus_line = 0
+
+
+class TestVirtualLcd:
+    def set_up(self, batch_i2c=True):
+        global lcd, bus
+        bus = VirtualLcdBus(test_dev_addr)
+        lcd = Lcd(test_dev_addr, test_bus_line, batch_i2c=batch_i2c, bus=bus)
+        with patch('time.sleep'):
+            lcd.init_lcd()
+
+
+    def test_virtual_lcd_should_decode_byte_per_byte_writes(self):
+        self.set_up(batch_i2c=False)
+        with patch('time.sleep'):
+            lcd.write_text(0, '*Smart Drop Box*')
+            lcd.write_text(1, '----Ver. 1.1----')
+
+        assert bus.lines == ['*Smart Drop Box*', '----Ver. 1.1----']
+        assert bus.bus_line == test_bus_line
+
+
+    def test_virtual_lcd_should_decode_block_transfers(self):
+        self.set_up()
+        lcd.render(['Masukan resi:', '12'])
+        lcd.render(['Masukan resi:', '123'])
+        assert bus.lines == ['Masukan resi:   ', '123             ']
+
+        lcd.render_compiled(compile_screen(['INFO:', '-> WAKTU HABIS!']))
+        assert bus.lines == ['INFO:           ', '-> WAKTU HABIS! ']
+
+        with patch('time.sleep'):
+            lcd.clear_lcd()
+            lcd.write_text(0, 'sian')
+        assert bus.lines == ['sian            ', '                ']
+
+
+    def test_virtual_lcd_should_ignore_other_devices(self):
+        self.set_up()
+        bus.write_byte(0x3C, 0xFF)
+        assert bus.byte_count == sum(frame.byte_count for frame in bus.frames) + \
+            bus._frame_byte_count
+
+
+    def test_commit_frame_should_record_bytes_and_render_time(self):
+        self.set_up()
+        bus.commit_frame(time.monotonic())
+
+        start_time = time.monotonic()
+        lcd.render(['Masukan resi:', '1'])
+        first = bus.commit_frame(start_time)
+        start_time = time.monotonic()
+        lcd.render(['Masukan resi:', '12'])
+        keystroke = bus.commit_frame(start_time)
+
+        # address counter is already after '1', only the char (6 bytes)
+        assert keystroke.byte_count == 6
+        assert keystroke.lines[1].startswith('12')
+        assert first.byte_count > keystroke.byte_count
+
+        report = bus.report()
+        assert report['frames'] == 3
+        assert report['max_bytes_per_frame'] >= first.byte_count
+        assert report['max_render_time'] >= report['render_time'] >= 0
+
+
+    def test_bus_clock_should_take_transfer_time(self):
+        bus = VirtualLcdBus(test_dev_addr, bus_clock=100000)
+        lcd = Lcd(test_dev_addr, test_bus_line, batch_i2c=True, bus=bus)
+
+        start_time = time.monotonic()
+        lcd.render(['Masukan resi:', '1234'])
+        frame = bus.commit_frame(start_time)
+
+        assert frame.render_time >= frame.byte_count * 9 / 100000
@@ -0,0 +1,128 @@
+'''
+    Sharpness score of burst frames. Laplacian tests need Pillow (requirements.txt),
+    the other ones patch the decoded luma plane.
+'''
+import io
+import statistics
+import sys
+from unittest.mock import Mock, patch
+import pytest
+sys.path.append('drivers/usb_camera')
+import frame_selector
+from frame_selector import laplacian_variance, exposure_weight, scan_size, score_frame
+
+
+test_width = 16
+test_height = 12
+
+
+def help_checkerboard(dark=60, bright=200):
+    return bytes(bright if (x // 2 + y // 2) % 2 else dark
+                 for y in range(test_height) for x in range(test_width))
+
+
+def help_box_blur(luma):
+    # horizontal 3 pixel mean, like a courier moving sideways
+    blurred = bytearray(luma)
+    for y in range(test_height):
+        for x in range(1, test_width - 1):
+            i = y * test_width + x
+            blurred[i] = (luma[i - 1] + luma[i] + luma[i + 1]) // 3
+    return bytes(blurred)
+
+
+def help_laplacian_variance(luma):
+    # pixel by pixel, inner pixels only
+    values = []
+    for y in range(1, test_height - 1):
+        for x in range(1, test_width - 1):
+            i = y * test_width + x
+            values.append(luma[i - 1] + luma[i + 1] + luma[i - test_width]
+                          + luma[i + test_width] - 4 * luma[i])
+    return statistics.pvariance(values)
+
+
+def help_histogram(luma):
+    histogram = [0] * 256
+    for value in luma:
+        histogram[value] += 1
+    return histogram
+
+
+class TestFrameSelector:
+    def test_laplacian_variance_should_be_lower_for_blurred_plane(self):
+        Image = pytest.importorskip('PIL.Image')
+        # small contrast, the filter output stays in 0 - 255
+        sharp = help_checkerboard(dark=100, bright=140)
+
+        sharp_score = laplacian_variance(
+            Image.frombytes('L', (test_width, test_height), sharp))
+        blurred_score = laplacian_variance(
+            Image.frombytes('L', (test_width, test_height), help_box_blur(sharp)))
+        flat_score = laplacian_variance(Image.new('L', (test_width, test_height), 128))
+
+        assert blurred_score < sharp_score
+        assert flat_score == 0.0
+
+
+    def test_laplacian_variance_should_rank_strong_edges_without_clipping(self):
+        Image = pytest.importorskip('PIL.Image')
+        # both frames are sharp, Laplacian of the edges is far out of 0 - 255. Parts are
+        # divided by LAPLACIAN_SCALE, so values are rounded to its multiples (~1%)
+        strong = help_checkerboard(dark=0, bright=255)
+        weak = help_checkerboard(dark=40, bright=215)
+
+        strong_score = laplacian_variance(Image.frombytes('L', (test_width, test_height), strong))
+        weak_score = laplacian_variance(Image.frombytes('L', (test_width, test_height), weak))
+
+        assert strong_score > weak_score
+        assert abs(strong_score - help_laplacian_variance(strong)) < 0.03 * strong_score
+        assert abs(weak_score - help_laplacian_variance(weak)) < 0.03 * weak_score
+
+
+    def test_score_frame_should_prefer_sharp_jpeg(self):
+        Image = pytest.importorskip('PIL.Image')
+        from PIL import ImageFilter
+
+        def help_jpeg(image):
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=85)
+            return output.getvalue()
+
+        image = Image.new('L', (640, 480))
+        image.putdata([200 if (x // 32 + y // 32) % 2 else 60
+                       for y in range(480) for x in range(640)])
+        blurred = image.filter(ImageFilter.GaussianBlur(12))
+
+        assert score_frame(help_jpeg(image)) > score_frame(help_jpeg(blurred)) > 0.0
+
+
+    def test_exposure_weight_should_count_clipped_pixels(self):
+        assert exposure_weight(help_histogram(help_checkerboard())) == 1.0
+        assert exposure_weight(help_histogram(help_checkerboard(dark=0, bright=255))) == 0.0
+        assert exposure_weight(help_histogram(bytes([0, 100, 128, 250]))) == 0.5
+        assert exposure_weight([0] * 256) == 0.0
+
+
+    def test_score_frame_should_use_scan_size_without_pillow(self):
+        frame = b'\xff\xd8\xff\xc0\x00\x02\xff\xda\x00\x02' + bytes(20) + b'\xff\xd9'
+
+        with patch.object(frame_selector, '_decode_luma', return_value=None):
+            assert score_frame(frame) == scan_size(frame) == 26.0
+        assert scan_size(b'\xff\xd8\xff\xd9') == 0
+
+
+    def test_score_frame_should_weight_sharpness_with_exposure(self):
+        luma = Mock()
+        luma.histogram.return_value = help_histogram(help_checkerboard(dark=0, bright=200))
+
+        with patch.object(frame_selector, '_decode_luma', return_value=luma), \
+            patch.object(frame_selector, 'laplacian_variance', return_value=300.0):
+            score = score_frame(b'jpeg')
+
+        assert score == 300.0 * 0.5
+
+
+    def test_score_frame_should_be_zero_for_broken_frame(self):
+        with patch.object(frame_selector, '_decode_luma', side_effect=OSError('broken')):
+            assert score_frame(b'\xff\xd8') == 0.0
@@ -0,0 +1,92 @@
+'''
+    PhotoPipeline with hand-built JPEG segments. Pillow isn't needed, decoding and
+    encoding are patched where a real image is used.
+'''
+import sys
+from unittest.mock import patch
+import pytest
+sys.path.append('drivers/usb_camera')
+from photo_pipeline import PhotoPipeline, strip_metadata
+
+
+def help_segment(marker, payload):
+    return bytes([0xFF, marker]) + (len(payload) + 2).to_bytes(2, 'big') + payload
+
+
+jfif = help_segment(0xE0, b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00')
+exif = help_segment(0xE1, b'Exif\x00\x00' + bytes(200))
+comment = help_segment(0xFE, b'fswebcam 2026-10-17 10:00')
+adobe = help_segment(0xEE, b'Adobe\x00\x64\x00\x00\x00\x00\x01')
+quantization = help_segment(0xDB, bytes(65))
+start_of_frame = help_segment(0xC0, b'\x08\x01\xe0\x02\x80\x01\x01\x11\x00')
+scan = help_segment(0xDA, b'\x01\x01\x00\x00\x3f\x00') + b'\x12\xff\x00\x34\xff\xd0\x56' \
+    + bytes(300) + b'\xff\xd9'
+test_photo = b'\xff\xd8' + jfif + exif + comment + adobe + quantization + start_of_frame + scan
+stripped_photo = b'\xff\xd8' + jfif + adobe + quantization + start_of_frame + scan
+
+
+def help_encoded_photo(scan_size, *metadata):
+    # like Pillow output: JFIF, (metadata), tables, frame and a scan of scan_size bytes
+    return b'\xff\xd8' + jfif + b''.join(metadata) + quantization + start_of_frame \
+        + help_segment(0xDA, b'\x01\x01\x00\x00\x3f\x00') + bytes(scan_size) + b'\xff\xd9'
+
+
+class TestPhotoPipeline:
+    def test_strip_metadata_should_keep_image_segments_and_scan(self):
+        assert strip_metadata(test_photo) == stripped_photo
+        assert strip_metadata(stripped_photo) == stripped_photo
+
+
+    def test_strip_metadata_should_raise_error_for_non_jpeg(self):
+        with pytest.raises(ValueError):
+            strip_metadata(b'\x89PNG\r\n')
+        with pytest.raises(ValueError):
+            strip_metadata(b'\xff\xd8' + b'\x00' * 8)
+
+
+    def test_process_should_only_strip_metadata_without_pillow(self):
+        pipeline = PhotoPipeline()
+
+        with patch.object(PhotoPipeline, '_load_image', return_value=None):
+            result = pipeline.process(test_photo)
+
+        assert result.photo == stripped_photo
+        assert result.original_size == len(test_photo)
+        assert result.size == len(stripped_photo)
+
+
+    def test_process_should_lower_quality_until_max_bytes(self):
+        pipeline = PhotoPipeline(max_bytes=len(help_encoded_photo(45)), quality=70,
+                                 min_quality=40)
+        # every quality step gives a smaller photo
+        help_encode = lambda image, quality: help_encoded_photo(quality, exif)
+
+        with patch.object(PhotoPipeline, '_load_image', return_value='image'), \
+            patch.object(PhotoPipeline, '_encode', side_effect=help_encode) as mock_encode:
+            result = pipeline.process(test_photo)
+
+        assert [call.args[1] for call in mock_encode.call_args_list] == [70, 60, 50, 40]
+        assert result.photo == help_encoded_photo(40)
+        assert result.size < pipeline.max_bytes
+        assert result.size < len(stripped_photo)
+
+
+    def test_process_should_keep_captured_photo_if_encoding_is_bigger(self):
+        pipeline = PhotoPipeline()
+
+        with patch.object(PhotoPipeline, '_load_image', return_value='image'), \
+            patch.object(PhotoPipeline, '_encode', return_value=help_encoded_photo(1000)):
+            result = pipeline.process(test_photo)
+
+        assert result.photo == stripped_photo
+
+
+    def test_process_should_keep_stripped_photo_if_encoding_is_broken(self):
+        pipeline = PhotoPipeline()
+
+        with patch.object(PhotoPipeline, '_load_image', return_value='image'), \
+            patch.object(PhotoPipeline, '_encode', return_value=b'\xff\xd8' + bytes(10)):
+            result = pipeline.process(test_photo)
+
+        assert result.photo == stripped_photo
+        assert result.size == len(stripped_photo)
@@ -0,0 +1,288 @@
+'''
+    V4l2Capture and UsbCamera 'v4l2' backend against a fake V4L2 device (ioctl, mmap
+    and select are patched). No camera hardware is needed.
+'''
+import errno
+import sys
+import time
+from collections import deque
+from unittest.mock import patch
+import pytest
+sys.path.append('drivers/usb_camera')
+import v4l2_capture
+from v4l2_capture import V4l2Capture, add_huffman_tables, DHT_SEGMENT, V4L2_PIX_FMT_MJPEG
+from usb_camera import UsbCamera
+
+
+test_device = '/dev/video0'
+test_fd = 1000
+buffer_length = 1024
+# SOI, SOF0 (short), SOS, scan data, EOI. No DHT like many usb cameras.
+mjpeg_frame_prefix = b'\xff\xd8\xff\xc0\x00\x02\xff\xda\x00\x02'
+
+
+def help_frame(number):
+    return mjpeg_frame_prefix + bytes([number]) + b'\xff\xd9'
+
+
+class FakeMmap(bytearray):
+    def close(self):
+        pass
+
+
+class FakeV4l2Device:
+    def __init__(self, pixelformat=V4L2_PIX_FMT_MJPEG):
+        self.pixelformat = pixelformat
+        self.queued = deque()
+        self.filled = deque()
+        self.maps = {}
+        self.frames_captured = 0
+        self.is_streaming = False
+        self.can_capture = True
+
+    def capture(self):
+        # camera fills the next queued buffer
+        if not self.queued or not self.can_capture:
+            return False
+        index = self.queued.popleft()
+        frame = help_frame(self.frames_captured)
+        self.maps[index][:len(frame)] = frame
+        self.filled.append((index, len(frame)))
+        self.frames_captured += 1
+        return True
+
+    def ioctl(self, fd, request, arg):
+        if request == v4l2_capture.VIDIOC_S_FMT:
+            arg.fmt.pix.pixelformat = self.pixelformat
+        elif request == v4l2_capture.VIDIOC_REQBUFS:
+            arg.count = min(arg.count, 4)
+        elif request == v4l2_capture.VIDIOC_QUERYBUF:
+            arg.length = buffer_length
+            arg.m.offset = arg.index * buffer_length
+        elif request == v4l2_capture.VIDIOC_QBUF:
+            self.queued.append(arg.index)
+        elif request == v4l2_capture.VIDIOC_DQBUF:
+            if not self.filled:
+                raise OSError(errno.EAGAIN, "Resource temporarily unavailable")
+            arg.index, arg.bytesused = self.filled.popleft()
+        elif request == v4l2_capture.VIDIOC_STREAMON:
+            self.is_streaming = True
+        elif request == v4l2_capture.VIDIOC_STREAMOFF:
+            self.is_streaming = False
+        return 0
+
+    def mmap(self, fd, length, flags, prot, offset=0):
+        self.maps[offset // buffer_length] = FakeMmap(length)
+        return self.maps[offset // buffer_length]
+
+    def select(self, readable, writable, exceptional, timeout):
+        return (readable, [], []) if self.capture() else ([], [], [])
+
+
+class TestV4l2Capture:
+    def set_up(self, warmup_frames=2, pixelformat=V4L2_PIX_FMT_MJPEG):
+        global capture, device
+        device = FakeV4l2Device(pixelformat)
+        patch('v4l2_capture.os.open', return_value=test_fd).start()
+        self.mock_os_close = patch('v4l2_capture.os.close').start()
+        patch('v4l2_capture.fcntl.ioctl', side_effect=device.ioctl).start()
+        patch('v4l2_capture.mmap.mmap', side_effect=device.mmap).start()
+        patch('v4l2_capture.select.select', side_effect=device.select).start()
+        capture = V4l2Capture(test_device, warmup_frames=warmup_frames)
+
+    def tear_down(self):
+        patch.stopall()
+
+
+    def test_open_should_map_buffers_stream_and_warm_up(self):
+        self.set_up()
+        capture.open()
+
+        assert capture.is_open()
+        assert len(device.maps) == 4
+        assert device.is_streaming
+        assert device.frames_captured == 2
+        assert len(device.queued) == 4 # every buffer is queued again
+
+        capture.close()
+        assert not device.is_streaming
+        self.mock_os_close.assert_called_once_with(test_fd)
+        self.tear_down()
+
+
+    def test_grab_frame_should_skip_stale_frames(self):
+        self.set_up(warmup_frames=0)
+        capture.open()
+        # frames captured while nobody was reading
+        device.capture()
+        device.capture()
+
+        frame = capture.grab_frame()
+
+        assert frame == add_huffman_tables(help_frame(2))
+        assert len(device.queued) == 4
+        self.tear_down()
+
+
+    def test_grab_frame_should_raise_error_without_frame(self):
+        self.set_up(warmup_frames=0)
+        capture.open()
+        device.can_capture = False
+
+        with pytest.raises(TimeoutError):
+            capture.grab_frame(timeout=0.01)
+        self.tear_down()
+
+
+    def test_open_should_raise_error_without_mjpeg(self):
+        self.set_up(pixelformat=v4l2_capture.fourcc('YUYV'))
+
+        with pytest.raises(OSError):
+            capture.open()
+        assert not capture.is_open()
+        self.mock_os_close.assert_called_once_with(test_fd)
+        self.tear_down()
+
+
+    def test_add_huffman_tables_should_insert_standard_tables_once(self):
+        frame = help_frame(7)
+        fixed_frame = add_huffman_tables(frame)
+
+        assert len(DHT_SEGMENT) == 420
+        assert fixed_frame == mjpeg_frame_prefix[:6] + DHT_SEGMENT + frame[6:]
+        assert add_huffman_tables(fixed_frame) == fixed_frame
+
+
+class TestUsbCameraV4l2:
+    def set_up(self, tmp_path):
+        global camera, device
+        device = FakeV4l2Device()
+        self.mock_os_open = patch('v4l2_capture.os.open', return_value=test_fd).start()
+        patch('v4l2_capture.os.close').start()
+        patch('v4l2_capture.fcntl.ioctl', side_effect=device.ioctl).start()
+        patch('v4l2_capture.mmap.mmap', side_effect=device.mmap).start()
+        patch('v4l2_capture.select.select', side_effect=device.select).start()
+        self.mock_subprocess_run = patch('subprocess.run').start()
+        camera = UsbCamera(test_device, 'v4l2')
+        camera.set_dir_saved_photo(str(tmp_path) + '/')
+
+    def tear_down(self):
+        patch.stopall()
+
+
+    def test_capture_photo_should_save_grabbed_frame(self, tmp_path):
+        self.set_up(tmp_path)
+        camera.open()
+
+        assert camera.capture_photo() == 0
+        assert camera.capture_photo() == 0
+
+        photos = list(tmp_path.iterdir())
+        assert len(photos) >= 1
+        assert photos[0].read_bytes().startswith(b'\xff\xd8')
+        self.mock_os_open.assert_called_once()
+        self.mock_subprocess_run.assert_not_called()
+        self.tear_down()
+
+
+    def test_capture_photo_should_fall_back_to_fswebcam(self, tmp_path):
+        self.set_up(tmp_path)
+        self.mock_os_open.side_effect = FileNotFoundError(errno.ENOENT, test_device)
+        self.mock_subprocess_run.return_value.returncode = 0
+
+        assert camera.capture_photo() == 0
+        self.mock_subprocess_run.assert_called_once_with(camera._get_cmd_capture_photo())
+        self.tear_down()
+
+
+    def test_capture_photo_should_keep_engine_open_on_disk_error(self, tmp_path):
+        self.set_up(tmp_path)
+        camera.open()
+        camera.set_dir_saved_photo(str(tmp_path) + '/missing/')
+
+        assert camera.capture_photo() == 1
+        assert camera._capture_engine.is_open()
+        self.mock_subprocess_run.assert_not_called()
+
+        camera.set_dir_saved_photo(str(tmp_path) + '/')
+        assert camera.capture_photo() == 0
+        self.mock_os_open.assert_called_once()
+        self.tear_down()
+
+
+    def test_capture_bytes_should_return_frame_without_file(self, tmp_path):
+        self.set_up(tmp_path)
+
+        photo = camera.capture_bytes()
+
+        assert photo == add_huffman_tables(help_frame(device.frames_captured - 1))
+        assert camera.last_photo_name.endswith('.jpg')
+        assert list(tmp_path.iterdir()) == []
+
+        camera.save_photo(photo, camera.last_photo_name)
+        assert (tmp_path / camera.last_photo_name).read_bytes() == photo
+        self.tear_down()
+
+
+    def test_capture_bytes_should_read_fswebcam_stdout(self, tmp_path):
+        self.set_up(tmp_path)
+        camera.capture_backend = 'fswebcam'
+        self.mock_subprocess_run.return_value.returncode = 0
+        self.mock_subprocess_run.return_value.stdout = help_frame(1)
+
+        assert camera.capture_bytes() == help_frame(1)
+        self.mock_subprocess_run.assert_called_once_with(
+            camera._get_cmd_capture_bytes(), capture_output=True)
+
+        self.mock_subprocess_run.return_value.returncode = 1
+        assert camera.capture_bytes() is None
+        self.tear_down()
+
+
+    def test_capture_bytes_should_keep_sharpest_frame_of_burst(self, tmp_path):
+        self.set_up(tmp_path)
+        camera.burst_frames = 4
+        camera.burst_time_budget = 1.0
+        # frame number is before EOI (5 warm up frames at open), 2nd frame of the burst is
+        # the sharpest
+        scores = {5: 5.0, 6: 9.0, 7: 1.0, 8: 7.0}
+        patch('usb_camera.score_frame', side_effect=lambda frame: scores[frame[-3]]).start()
+        camera.open()
+        first_frame = device.frames_captured
+
+        photo = camera.capture_bytes()
+
+        assert photo == add_huffman_tables(help_frame(first_frame + 1))
+        assert camera.last_burst_scores == [scores[first_frame + n] for n in range(4)]
+        self.tear_down()
+
+
+    def test_burst_should_stop_at_time_budget(self, tmp_path):
+        self.set_up(tmp_path)
+        camera.burst_frames = 30
+        camera.burst_time_budget = 0.15
+        frame_period = 0.03
+
+        def help_select_slow(*args):
+            time.sleep(frame_period)
+            return device.select(*args)
+
+        patch('v4l2_capture.select.select', side_effect=help_select_slow).start()
+        camera.open()
+
+        start_time = time.monotonic()
+        photo = camera.capture_bytes()
+        burst_time = time.monotonic() - start_time
+
+        assert photo.startswith(b'\xff\xd8')
+        assert 1 < len(camera.last_burst_scores) < 30
+        # budget starts after the first frame, the last frame can end a bit after the
+        # deadline (sleep jitter)
+        assert burst_time < camera.burst_time_budget + 3 * frame_period
+        print(f"\nBurst: {len(camera.last_burst_scores)} frames in {burst_time * 1000:.0f} ms")
+        self.tear_down()
+
+
+    def test_unknown_capture_backend_should_raise_error(self):
+        with pytest.raises(ValueError):
+            UsbCamera(test_device, 'gstreamer')
@@ -2,68 +2,95 @@
     This class is storing LCD payload for lcd thread and sound files name
     for playing sound.
 
+    LcdData attributes are ids of static LCD screens, the queue to lcd thread carries
+    only the id. Screens are in LcdData.SCREENS, lcd thread compiles them once at
+    startup. 'hold' (secs) is the min. time a message stays on LCD, newer messages
+    are shown after it (see lcd_thread.py).
+
 '''
 
 class LcdData:
-    TIMEOUT = {
-    'cmd': 'keypad',
-    'payload': ['INFO:', '-> WAKTU HABIS!']
-    }
-    ST_MSG = {
-        'cmd': 'routine',
-        'payload': ["Tekan keypad", "untuk memulai .."]
-    }
-    RESI_VALID = {
-        'cmd': 'keypad',
-        'payload': ["INFO:", "NO RESI VALID !."]
-    }
-    RESI_FAILED = {
-        'cmd': 'keypad',
-        'payload': ["STATUS:", "RESI TIDAK ADA"]
-    }
-    DOOR_ERROR = {
-        'cmd': 'routine',
-        'payload': ["WARNING:", "TUTUP PINTU!"]
-    }
-    NO_ITEM = {
-        'cmd': 'routine',
-        'payload': ["INFO:", "BRG TDK DISMPN !"]
-    }
-    THANKYOU = {
-        'cmd': 'routine',
-        'payload': ["  * DITERIMA *", "  Terima kasih!"]
-    }
-    NO_ITEM_RECEIVED = {
-        'cmd': 'routine',
-        'payload': ["WARNING:", "BRG TDK ADA!"]
-    }
-    ITEM_RECEIVED = {
-        'cmd': 'routine',
-        'payload': ['INFO:', '-> BOX SDH KOSONG']
-    }
-    NO_RESI_SUCCESS = {
-        'cmd': 'keypad',
-        'payload': ['STATUS:', ' RESI DITERIMA!']
-    }
-    GET_SUCCESS = {
-        'cmd': 'routine',
-        'payload': ['STATUS REQUEST:', ' Berhasil (200)!']
-    }
-    FISRT_INPUT_KEYPAD = {
-        'cmd': 'keypad',
-        'payload': ['Masukan resi:', '']
-    }
-    TAKING_ITEM = {
-        'cmd': 'keypad',
-        'payload': ['INFO:', '-> SILAKAN AMBIL']
-    }
-    AFTER_TAKING_ITEM = {
-        'cmd': 'keypad',
-        'payload': ['INFO:', '-> BRG DIAMBIL!']
-    }
-    ERROR_UNIVERSAL_PASSWORD = {
-        'cmd': 'routine',
-        'payload': ['ERROR:', 'Uni pass > 4 c!']
+    TIMEOUT = 'timeout'
+    ST_MSG = 'st_msg'
+    RESI_VALID = 'resi_valid'
+    RESI_FAILED = 'resi_failed'
+    DOOR_ERROR = 'door_error'
+    NO_ITEM = 'no_item'
+    THANKYOU = 'thankyou'
+    NO_ITEM_RECEIVED = 'no_item_received'
+    ITEM_RECEIVED = 'item_received'
+    NO_RESI_SUCCESS = 'no_resi_success'
+    GET_SUCCESS = 'get_success'
+    FISRT_INPUT_KEYPAD = 'fisrt_input_keypad'
+    TAKING_ITEM = 'taking_item'
+    AFTER_TAKING_ITEM = 'after_taking_item'
+    ERROR_UNIVERSAL_PASSWORD = 'error_universal_password'
+
+    SCREENS = {
+        TIMEOUT: {
+            'cmd': 'keypad',
+            'payload': ['INFO:', '-> WAKTU HABIS!'],
+            'hold': 2.0
+        },
+        ST_MSG: {
+            'cmd': 'routine',
+            'payload': ['Tekan keypad', 'untuk memulai ..']
+        },
+        RESI_VALID: {
+            'cmd': 'keypad',
+            'payload': ['INFO:', 'NO RESI VALID !.']
+        },
+        RESI_FAILED: {
+            'cmd': 'keypad',
+            'payload': ['STATUS:', 'RESI TIDAK ADA'],
+            'hold': 2.0
+        },
+        DOOR_ERROR: {
+            'cmd': 'routine',
+            'payload': ['WARNING:', 'TUTUP PINTU!']
+        },
+        NO_ITEM: {
+            'cmd': 'routine',
+            'payload': ['INFO:', 'BRG TDK DISMPN !']
+        },
+        THANKYOU: {
+            'cmd': 'routine',
+            'payload': ['  * DITERIMA *', '  Terima kasih!'],
+            'hold': 2.0
+        },
+        NO_ITEM_RECEIVED: {
+            'cmd': 'routine',
+            'payload': ['WARNING:', 'BRG TDK ADA!'],
+            'hold': 2.0
+        },
+        ITEM_RECEIVED: {
+            'cmd': 'routine',
+            'payload': ['INFO:', '->BOX SDH KOSONG']
+        },
+        NO_RESI_SUCCESS: {
+            'cmd': 'keypad',
+            'payload': ['STATUS:', ' RESI DITERIMA!']
+        },
+        GET_SUCCESS: {
+            'cmd': 'routine',
+            'payload': ['STATUS REQUEST:', ' Berhasil (200)!']
+        },
+        FISRT_INPUT_KEYPAD: {
+            'cmd': 'keypad',
+            'payload': ['Masukan resi:', '']
+        },
+        TAKING_ITEM: {
+            'cmd': 'keypad',
+            'payload': ['INFO:', '-> SILAKAN AMBIL']
+        },
+        AFTER_TAKING_ITEM: {
+            'cmd': 'keypad',
+            'payload': ['INFO:', '-> BRG DIAMBIL!']
+        },
+        ERROR_UNIVERSAL_PASSWORD: {
+            'cmd': 'routine',
+            'payload': ['ERROR:', 'Uni pass > 4 c!']
+        },
     }
 
 class SoundData: